@@ -1,8 +1,10 @@
 # admin.py
 from functools import wraps
-from flask import Blueprint, abort, render_template
+from flask import Blueprint, abort, render_template, jsonify
 from flask_login import current_user, login_required
 from models import User, Wedding
+import metrics
+from db_routing import replica_read
 
 admin_bp = Blueprint('admin', __name__, url_prefix='/admin')
 
@@ -17,6 +19,7 @@ def admin_required(f):
 @admin_bp.route('/users')
 @login_required
 @admin_required
+@replica_read
 def users():
     # Пользователи + количество свадеб
     rows = (
@@ -26,3 +29,10 @@ def users():
     )
     # В шаблоне посчитаем weddings|length
     return render_template('admin_users.html', users=rows)
+
+@admin_bp.route('/metrics')
+@login_required
+@admin_required
+def metrics_view():
+    # счётчики in-process (на воркер): кэши, hit ratio и т.п.
+    return jsonify(metrics.snapshot())
@@ -0,0 +1,282 @@
+# api_async.py
+"""
+Read-only JSON API на AsyncSession (SQLAlchemy 2.0 + async psycopg).
+
+ASGI-точка входа рядом с обычным WSGI `app`:
+    uvicorn api_async:asgi_app --workers 2
+
+/api/... обслуживается асинхронно (один процесс держит много
+polling-клиентов без потоков), всё остальное уходит во Flask через WsgiToAsgi.
+"""
+from __future__ import annotations
+
+import json
+import re
+from datetime import date
+
+from asgiref.wsgi import WsgiToAsgi
+from sqlalchemy import select, func, case
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
+
+from app import app
+from models import User, Wedding, Guest, Expense, Table, Task
+import finance_calc
+
+
+# ----------------------------
+# Движок / сессии
+# ----------------------------
+_ASYNC_DRIVERS = {
+    "postgresql": "postgresql+psycopg",
+    "postgresql+psycopg": "postgresql+psycopg",
+    "postgresql+psycopg2": "postgresql+psycopg",
+    "sqlite": "sqlite+aiosqlite",
+}
+
+
+def _async_url(url: str):
+    """DSN из конфига Flask -> async-драйвер (psycopg async / aiosqlite)."""
+    u = make_url(url)
+    return u.set(drivername=_ASYNC_DRIVERS.get(u.drivername, u.drivername))
+
+
+_engine = None
+_sessionmaker: async_sessionmaker[AsyncSession] | None = None
+
+
+def get_sessionmaker() -> async_sessionmaker[AsyncSession]:
+    global _engine, _sessionmaker
+    if _sessionmaker is None:
+        opts = {"pool_pre_ping": True}
+        if not app.config["SQLALCHEMY_DATABASE_URI"].startswith("sqlite"):
+            opts.update(pool_size=10, max_overflow=20)
+        _engine = create_async_engine(_async_url(app.config["SQLALCHEMY_DATABASE_URI"]), **opts)
+        _sessionmaker = async_sessionmaker(_engine, expire_on_commit=False)
+    return _sessionmaker
+
+
+async def dispose_engine():
+    global _engine, _sessionmaker
+    if _engine is not None:
+        await _engine.dispose()
+    _engine, _sessionmaker = None, None
+
+
+# ----------------------------
+# Авторизация: та же flask-сессия (cookie подписана SECRET_KEY)
+# ----------------------------
+def _session_user_id(headers: dict) -> int | None:
+    cookie_name = app.config.get("SESSION_COOKIE_NAME", "session")
+    raw = headers.get("cookie", "")
+    value = None
+    for part in raw.split(";"):
+        k, _, v = part.strip().partition("=")
+        if k == cookie_name:
+            value = v
+            break
+    if not value:
+        return None
+    serializer = app.session_interface.get_signing_serializer(app)
+    if serializer is None:
+        return None
+    try:
+        data = serializer.loads(value, max_age=int(app.permanent_session_lifetime.total_seconds()))
+        return int(data.get("_user_id"))
+    except Exception:
+        return None
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+async def _current_user(session: AsyncSession, headers: dict) -> tuple[int, bool]:
+    uid = _session_user_id(headers)
+    if uid is None:
+        raise HttpError(401, "unauthorized")
+    row = (await session.execute(select(User.id, User.is_admin).where(User.id == uid))).first()
+    if row is None:
+        raise HttpError(401, "unauthorized")
+    return row.id, bool(row.is_admin)
+
+
+async def _check_wedding(session: AsyncSession, user: tuple[int, bool], wedding_id: int):
+    """Как get_wedding_or_403: админ видит всё, пользователь — только свои."""
+    row = (await session.execute(
+        select(Wedding.id, Wedding.name, Wedding.date, Wedding.budget, Wedding.user_id)
+        .where(Wedding.id == wedding_id)
+    )).first()
+    if row is None:
+        raise HttpError(404, "not found")
+    uid, is_admin = user
+    if not is_admin and row.user_id != uid:
+        raise HttpError(403, "forbidden")
+    return row
+
+
+# ----------------------------
+# Хэндлеры (только чтение, без ORM-объектов — сразу кортежи колонок)
+# ----------------------------
+async def api_weddings(session, user):
+    uid, is_admin = user
+    q = select(Wedding.id, Wedding.name, Wedding.date, Wedding.budget)
+    if not is_admin:
+        q = q.where(Wedding.user_id == uid)
+    q = q.order_by(Wedding.date.desc().nullslast())
+    return [dict(r._mapping) for r in await session.execute(q)]
+
+
+async def api_wedding(session, user, wedding_id):
+    w = await _check_wedding(session, user, wedding_id)
+    guests = (await session.execute(
+        select(
+            func.count(Guest.id),
+            func.coalesce(func.sum(func.coalesce(Guest.family_count, 1)), 0),
+            func.count(case((Guest.status == "confirmed", 1))),
+            func.count(case((Guest.status == "declined", 1))),
+        ).where(Guest.wedding_id == wedding_id)
+    )).one()
+    rows = (await session.execute(
+        select(*[getattr(Expense, n) for n in finance_calc.INPUT]).where(Expense.wedding_id == wedding_id)
+    )).all()
+    expenses = finance_calc.aggregate(finance_calc.compute(
+        {n: [r[i] for r in rows] for i, n in enumerate(finance_calc.INPUT)}
+    ))
+    tasks = (await session.execute(
+        select(func.count(Task.id), func.count(case((Task.is_done.is_(True), 1))))
+        .where(Task.wedding_id == wedding_id)
+    )).one()
+    return {
+        "id": w.id, "name": w.name, "date": w.date, "budget": w.budget,
+        "guests": {"count": guests[0], "persons": guests[1], "confirmed": guests[2], "declined": guests[3]},
+        "expenses": expenses,
+        "tasks": {"count": tasks[0], "done": tasks[1]},
+    }
+
+
+async def api_guests(session, user, wedding_id):
+    await _check_wedding(session, user, wedding_id)
+    q = (
+        select(Guest.id, Guest.name, Guest.family_name, Guest.family_count, Guest.phone,
+               Guest.status, Guest.side, Guest.is_vip, Guest.is_child,
+               Guest.table_id, Guest.table_seat)
+        .where(Guest.wedding_id == wedding_id)
+        .order_by(Guest.id)
+    )
+    return [dict(r._mapping) for r in await session.execute(q)]
+
+
+async def api_expenses(session, user, wedding_id):
+    await _check_wedding(session, user, wedding_id)
+    q = (
+        select(Expense.id, Expense.category, Expense.item, Expense.quantity, Expense.unit_price,
+               Expense.total, Expense.plan, Expense.fact, Expense.prepayment, Expense.difference,
+               Expense.notes)
+        .where(Expense.wedding_id == wedding_id)
+        .order_by(Expense.id)
+    )
+    return [dict(r._mapping) for r in await session.execute(q)]
+
+
+async def api_tables(session, user, wedding_id):
+    await _check_wedding(session, user, wedding_id)
+    occupied = (
+        select(Guest.table_id, func.sum(func.coalesce(Guest.family_count, 1)).label("persons"))
+        .where(Guest.wedding_id == wedding_id, Guest.table_id.is_not(None))
+        .group_by(Guest.table_id)
+        .subquery()
+    )
+    q = (
+        select(Table.id, Table.name, Table.seats, Table.order,
+               func.coalesce(occupied.c.persons, 0).label("persons"))
+        .outerjoin(occupied, occupied.c.table_id == Table.id)
+        .where(Table.wedding_id == wedding_id)
+        .order_by(Table.order, Table.id)
+    )
+    return [dict(r._mapping) for r in await session.execute(q)]
+
+
+async def api_tasks(session, user, wedding_id):
+    await _check_wedding(session, user, wedding_id)
+    q = (
+        select(Task.id, Task.description, Task.is_done)
+        .where(Task.wedding_id == wedding_id)
+        .order_by(Task.position, Task.id)
+    )
+    return [dict(r._mapping) for r in await session.execute(q)]
+
+
+ROUTES = [
+    (re.compile(r"^/api/weddings/?$"), api_weddings),
+    (re.compile(r"^/api/weddings/(\d+)/?$"), api_wedding),
+    (re.compile(r"^/api/weddings/(\d+)/guests/?$"), api_guests),
+    (re.compile(r"^/api/weddings/(\d+)/expenses/?$"), api_expenses),
+    (re.compile(r"^/api/weddings/(\d+)/tables/?$"), api_tables),
+    (re.compile(r"^/api/weddings/(\d+)/tasks/?$"), api_tasks),
+]
+
+
+# ----------------------------
+# ASGI
+# ----------------------------
+def _json_default(o):
+    if isinstance(o, date):
+        return o.isoformat()
+    raise TypeError(type(o).__name__)
+
+
+async def _send_json(send, status: int, payload):
+    body = json.dumps(payload, ensure_ascii=False, default=_json_default).encode("utf-8")
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [
+            (b"content-type", b"application/json; charset=utf-8"),
+            (b"content-length", str(len(body)).encode()),
+            (b"cache-control", b"private, no-cache"),
+        ],
+    })
+    await send({"type": "http.response.body", "body": body})
+
+
+async def api_app(scope, receive, send):
+    path = scope["path"]
+    if scope["method"] not in ("GET", "HEAD"):
+        return await _send_json(send, 405, {"error": "method not allowed"})
+    for rx, handler in ROUTES:
+        m = rx.match(path)
+        if m:
+            break
+    else:
+        return await _send_json(send, 404, {"error": "not found"})
+
+    headers = {k.decode("latin-1"): v.decode("latin-1") for k, v in scope["headers"]}
+    try:
+        async with get_sessionmaker()() as session:
+            user = await _current_user(session, headers)
+            data = await handler(session, user, *(int(x) for x in m.groups()))
+    except HttpError as e:
+        return await _send_json(send, e.status, {"error": e.message})
+    await _send_json(send, 200, data)
+
+
+_wsgi = WsgiToAsgi(app)
+
+
+async def asgi_app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                await dispose_engine()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+    if scope["type"] == "http" and scope["path"].startswith("/api/"):
+        return await api_app(scope, receive, send)
+    return await _wsgi(scope, receive, send)
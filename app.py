@@ -4,11 +4,16 @@ from __future__ import annotations
 import os
 from datetime import datetime
 
+import click
+
 from flask import Flask, render_template, request, redirect, url_for, abort
-from flask_migrate import Migrate
 from flask_login import LoginManager, login_required, current_user
 
 from models import *
+from http_cache import etag_by_wedding
+from fragment_cache import init_fragment_cache
+from assets import init_assets
+import finance_calc
 
 # блюпринты
 from auth import auth_bp            # должен быть Blueprint('auth', __name__, url_prefix='/auth')
@@ -18,6 +23,11 @@ from tasks import tasks_bp
 from finance import finance_bp
 from invitations import invitations_bp
 from wedding_pages import wedding_pages
+from rsvp import rsvp_bp
+from events import events_bp
+from snapshot import snapshot_bp
+from archive import archived_read_only, restore_wedding
+from db_routing import init_routing, replica_read, use_primary
 
 
 # ----------------------------
@@ -26,7 +36,7 @@ from wedding_pages import wedding_pages
 # app.py (фрагмент)
 import os
 from flask import Flask
-from flask_migrate import Migrate
+from jinja2 import FileSystemBytecodeCache
 from models import db
 
 app = Flask(__name__)
@@ -47,10 +57,150 @@ app.config.update(
         "pool_size": 5,
         "max_overflow": 10,
     },
+    # скомпилированные шаблоны; каталог заполняет `flask --app app precompile`
+    JINJA_BYTECODE_CACHE_DIR=os.getenv(
+        "JINJA_BYTECODE_CACHE_DIR", os.path.join(os.path.dirname(__file__), ".jinja_cache")
+    ),
+    # /svodnaya/report: читать из куба report_cube (досчитывает cron: flask report-cube)
+    REPORTS_CUBE=os.getenv("REPORTS_CUBE", "1") == "1",
+    # RSVP: ответы гостей пишутся пачкой раз в N секунд или по набору M штук
+    RSVP_FLUSH_SECONDS=float(os.getenv("RSVP_FLUSH_SECONDS", "1.0")),
+    RSVP_FLUSH_MAX=int(os.getenv("RSVP_FLUSH_MAX", "200")),
+    # срок QR-токена RSVP: до дня свадьбы + N дней; свадьба без даты — N дней от выпуска
+    # (должен истекать раньше ARCHIVE_AFTER_DAYS — архивные свадьбы токеном не проверяются)
+    RSVP_CLOSE_AFTER_DAYS=int(os.getenv("RSVP_CLOSE_AFTER_DAYS", "1")),
+    RSVP_TOKEN_DAYS=int(os.getenv("RSVP_TOKEN_DAYS", "180")),
+    # SSE рассадки: мост LISTEN/NOTIFY для нескольких воркеров (прямой DSN, не пулер)
+    EVENTS_PG_DSN=os.getenv("EVENTS_PG_DSN"),
+    EVENTS_MAX_CLIENTS=int(os.getenv("EVENTS_MAX_CLIENTS", "200")),
+    # архив: свадьбы старше N дней уходят в *_archive (flask archive-weddings)
+    ARCHIVE_AFTER_DAYS=int(os.getenv("ARCHIVE_AFTER_DAYS", "365")),
+    ARCHIVE_RESTORE_GRACE_DAYS=int(os.getenv("ARCHIVE_RESTORE_GRACE_DAYS", "30")),
+    # реплика для read-only страниц (db_routing.replica_read); без URL — всё на основной
+    REPLICA_STICKY_SECONDS=float(os.getenv("REPLICA_STICKY_SECONDS", "10")),
+    REPLICA_MAX_LAG_SECONDS=float(os.getenv("REPLICA_MAX_LAG_SECONDS", "5")),
+    REPLICA_CHECK_SECONDS=float(os.getenv("REPLICA_CHECK_SECONDS", "2")),
+    # цена хэша пароля (passwords.py); смена — перехэш при следующем входе
+    PASSWORD_HASH_METHOD=os.getenv("PASSWORD_HASH_METHOD", "scrypt:32768:8:1"),
+    # вход: попыток с IP и неудачных на email за окно (секунды), дальше — 429 без хэширования
+    LOGIN_IP_LIMIT=int(os.getenv("LOGIN_IP_LIMIT", "20")),
+    LOGIN_IP_WINDOW=float(os.getenv("LOGIN_IP_WINDOW", "60")),
+    LOGIN_EMAIL_LIMIT=int(os.getenv("LOGIN_EMAIL_LIMIT", "5")),
+    LOGIN_EMAIL_WINDOW=float(os.getenv("LOGIN_EMAIL_WINDOW", "300")),
+    # сколько прокси перед приложением (nginx -> gunicorn: 1): их X-Forwarded-* — в
+    # request.remote_addr / scheme / host; 0 — заголовкам не верим (без прокси их подделает кто угодно)
+    PROXY_FIX_HOPS=int(os.getenv("PROXY_FIX_HOPS", "0")),
+    # размер тела запроса (загрузка снимка — snapshot.py), сверх — 413;
+    # и сколько строк раздела снимка принимает импорт
+    MAX_CONTENT_LENGTH=int(os.getenv("MAX_CONTENT_LENGTH", str(16 * 1024 * 1024))),
+    SNAPSHOT_MAX_ROWS=int(os.getenv("SNAPSHOT_MAX_ROWS", "50000")),
+    # склейка AJAX-записей свадьбы в одну транзакцию (writebehind.py): окно, мс (0 — выкл.;
+    # работает только на gthread/gevent-воркерах), максимум операций в пачке и сколько
+    # ждать чужой COMMIT, с (дальше — 202)
+    WRITE_COALESCE_MS=float(os.getenv("WRITE_COALESCE_MS", "0")),
+    WRITE_COALESCE_MAX=int(os.getenv("WRITE_COALESCE_MAX", "100")),
+    WRITE_COALESCE_TIMEOUT=float(os.getenv("WRITE_COALESCE_TIMEOUT", "10")),
 )
+if app.config["PROXY_FIX_HOPS"]:
+    # иначе за nginx у всех клиентов адрес прокси — лимит входа по IP (auth.py) общий на всех
+    from werkzeug.middleware.proxy_fix import ProxyFix
+    hops = app.config["PROXY_FIX_HOPS"]
+    app.wsgi_app = ProxyFix(app.wsgi_app, x_for=hops, x_proto=hops, x_host=hops)
+if os.getenv("DATABASE_REPLICA_URL"):
+    app.config["SQLALCHEMY_BINDS"] = {"replica": os.getenv("DATABASE_REPLICA_URL")}
 
 db.init_app(app)
-migrate = Migrate(app, db)
+
+# STARTUP_FAST=1 — режим для gunicorn-воркеров: без Flask-Migrate/alembic
+# (~0.4 с импорта), миграции всё равно запускаются отдельно `flask db upgrade`
+if os.getenv("STARTUP_FAST") != "1":
+    from flask_migrate import Migrate
+    migrate = Migrate(app, db)
+
+init_fragment_cache(app)
+# статика с отпечатками (flask --app app build-assets -> static/dist)
+init_assets(app)
+
+if os.path.isdir(app.config["JINJA_BYTECODE_CACHE_DIR"]):
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(app.config["JINJA_BYTECODE_CACHE_DIR"])
+
+
+@app.cli.command("precompile")
+def precompile_command():
+    """Компилирует все шаблоны в кэш байткода Jinja (быстрый первый запрос воркера)."""
+    cache_dir = app.config["JINJA_BYTECODE_CACHE_DIR"]
+    os.makedirs(cache_dir, exist_ok=True)
+    app.jinja_env.bytecode_cache = FileSystemBytecodeCache(cache_dir)
+    names = app.jinja_env.list_templates(extensions=("html",))
+    for name in names:
+        app.jinja_env.get_template(name)
+    print(f"[precompile] {len(names)} шаблонов -> {cache_dir}")
+
+
+@app.cli.command("build-assets")
+def build_assets_command():
+    """Собирает статику с отпечатками, .gz/.br и WebP в static/dist (при деплое)."""
+    import assets
+    assets.build(app.config["ASSETS_DIR"])
+    assets.load_manifest(app)
+
+
+@app.cli.command("report-cube")
+def report_cube_command():
+    """Досчитывает куб отчётов для изменившихся свадеб (можно гонять по cron)."""
+    import reports
+    print(f"[report-cube] пересчитано свадеб: {reports.refresh_cube()}")
+
+
+@app.cli.command("archive-weddings")
+@click.option("--older-than-days", type=int, help="по умолчанию ARCHIVE_AFTER_DAYS")
+@click.option("--batch", type=int, default=50, show_default=True, help="свадеб в транзакции")
+@click.option("--limit", type=int, help="не больше N свадеб за запуск")
+@click.option("--sleep", "pause", type=float, default=0.5, show_default=True, help="пауза между пачками, с")
+@click.option("--dry-run", is_flag=True, help="только показать кандидатов")
+def archive_weddings_command(older_than_days, batch, limit, pause, dry_run):
+    """Переносит старые свадьбы в архивные таблицы (гонять вне пиковых часов)."""
+    import archive
+    days = older_than_days if older_than_days is not None else app.config["ARCHIVE_AFTER_DAYS"]
+    if dry_run:
+        ids = archive.candidates(days, limit)
+        print(f"[archive] кандидатов: {len(ids)} {ids[:20]}{' …' if len(ids) > 20 else ''}")
+        return
+    print(f"[archive] заархивировано свадеб: {archive.run(days, batch, limit, pause)}")
+
+
+@app.cli.command("export-wedding")
+@click.argument("wedding_id", type=int)
+@click.argument("path", type=click.Path(dir_okay=False, writable=True))
+def export_wedding_command(wedding_id, path):
+    """Снимок свадьбы в файл (gzip JSON Lines, snapshot.py)."""
+    import snapshot
+    wedding = db.get_or_404(Wedding, wedding_id)
+    with open(path, "wb") as f:
+        for chunk in snapshot.dump(wedding):
+            f.write(chunk)
+    print(f"[snapshot] {path}: {os.path.getsize(path) / 1024:.1f} КБ")
+
+
+@app.cli.command("import-wedding")
+@click.argument("path", type=click.Path(exists=True, dir_okay=False))
+@click.option("--user-id", type=int, help="владелец новой свадьбы")
+@click.option("--name", help="название (по умолчанию — из снимка)")
+def import_wedding_command(path, user_id, name):
+    """Новая свадьба из снимка."""
+    import snapshot
+    with open(path, "rb") as f:
+        wedding = snapshot.load(snapshot.parse(f), user_id, name)
+    db.session.commit()
+    print(f"[snapshot] создана свадьба {wedding.id} «{wedding.name}»")
+
+
+@app.cli.command("restore-wedding")
+@click.argument("wedding_id", type=int)
+def restore_wedding_command(wedding_id):
+    """Возвращает архивную свадьбу в горячие таблицы."""
+    import archive
+    print("[archive] восстановлена" if archive.restore_wedding(wedding_id) else "[archive] свадьба не в архиве")
 
 
 # ----------------------------
@@ -80,6 +230,14 @@ app.register_blueprint(tasks_bp)
 app.register_blueprint(finance_bp)
 app.register_blueprint(invitations_bp)
 app.register_blueprint(wedding_pages)
+app.register_blueprint(rsvp_bp)
+app.register_blueprint(events_bp)
+app.register_blueprint(snapshot_bp)
+
+# чтение с реплики — раньше остальных before_request
+init_routing(app)
+# архивная свадьба по обычным URL — только для чтения, восстановление — POST restore
+app.before_request(archived_read_only)
 
 
 # ----------------------------
@@ -95,16 +253,55 @@ def get_wedding_or_403(wedding_id: int) -> Wedding:
     return w
 
 
+def card_counts(wedding_ids) -> dict:
+    """{wedding_id: гости/задачи/выполнено} для карточек — двумя GROUP BY вместо ленивых связей."""
+    counts = {wid: {"guests": 0, "tasks": 0, "done": 0} for wid in wedding_ids}
+    if not counts:
+        return counts
+    guests = (db.session.query(Guest.wedding_id, db.func.count())
+              .filter(Guest.wedding_id.in_(counts)).group_by(Guest.wedding_id))
+    for wid, n in guests:
+        counts[wid]["guests"] = n
+    done = db.func.sum(db.case((Task.is_done.is_(True), 1), else_=0))
+    tasks = (db.session.query(Task.wedding_id, db.func.count(), done)
+             .filter(Task.wedding_id.in_(counts)).group_by(Task.wedding_id))
+    for wid, n, n_done in tasks:
+        counts[wid]["tasks"], counts[wid]["done"] = n, n_done or 0
+    return counts
+
+
 @app.route("/")
 @login_required
+@replica_read
 def index():
     # админ — все свадьбы, пользователь — только свои
     q = Wedding.query
     if not current_user.is_admin:
         q = q.filter_by(user_id=current_user.id)
+    # по умолчанию — только горячие; ?archived=1 — архив
+    show_archived = request.args.get("archived") == "1"
+    archived_count = q.filter(Wedding.archived_at.is_not(None)).count()
+    q = q.filter(Wedding.archived_at.is_not(None) if show_archived else Wedding.archived_at.is_(None))
+    # проблемные бюджеты — по индексированному Wedding.budget_state, без пересчёта сумм
+    budget_counts = dict(
+        q.with_entities(Wedding.budget_state, db.func.count())
+        .filter(Wedding.budget_state != "ok").group_by(Wedding.budget_state).all()
+    )
+    budget_filter = request.args.get("budget")
+    if budget_filter in ("warn", "over"):
+        q = q.filter(Wedding.budget_state == budget_filter)
     # .nullslast() ок; для SQLite SQLAlchemy эмитит совместимый ORDER BY
     weddings = q.order_by(Wedding.date.desc().nullslast()).all()
-    return render_template("index.html", weddings=weddings)
+    if show_archived:
+        # расходы архивных лежат в expense_archive — берём бегущую сумму со свадьбы
+        figures = {w.id: {"spent": w.spent_total} for w in weddings}
+    else:
+        # расходы всех карточек — одним SELECT
+        figures = finance_calc.wedding_figures(w.id for w in weddings)
+    counts = card_counts([w.id for w in weddings])
+    return render_template("index.html", weddings=weddings, figures=figures, counts=counts,
+                           budget_counts=budget_counts, budget_filter=budget_filter,
+                           show_archived=show_archived, archived_count=archived_count)
 
 
 @app.route("/wedding/create", methods=["POST"])
@@ -127,11 +324,30 @@ def create_wedding():
 
 @app.route("/wedding/<int:wedding_id>")
 @login_required
+@etag_by_wedding
 def view_wedding(wedding_id: int):
     wedding = get_wedding_or_403(wedding_id)
     # если у тебя есть специальный шаблон-хаб, оставь его
     # иначе временно используем overview
-    return render_template("wedding_overview.html", wedding=wedding)
+    figures = finance_calc.wedding_figures([wedding.id])[wedding.id]
+    return render_template(
+        "wedding_overview.html",
+        wedding=wedding,
+        expenses_count=figures["count"],
+        total_expenses=figures["spent"],
+        done_tasks=sum(1 for t in wedding.tasks if t.is_done),
+    )
+
+
+@app.route("/wedding/<int:wedding_id>/restore", methods=["POST"])
+@login_required
+def restore_archived(wedding_id: int):
+    """Вернуть строки архивной свадьбы в горячие таблицы (владелец или админ)."""
+    get_wedding_or_403(wedding_id)
+    # запись и sticky-окно — на основной базе: реплика восстановленных строк ещё не видела
+    use_primary()
+    restore_wedding(wedding_id)
+    return redirect(url_for("wedding_pages.view_wedding", wedding_id=wedding_id))
 
 
 # ----------------------------
@@ -139,7 +355,12 @@ def view_wedding(wedding_id: int):
 # ----------------------------
 def ensure_db_and_seed_admin():
     """Создаёт таблицы и пользователя-админа, если ещё нет."""
+    fresh = not db.inspect(db.engine).has_table("wedding")
     db.create_all()  # создаст отсутствующие таблицы; существующие не тронет
+    if fresh and "migrate" in app.extensions:
+        # схема уже соответствует моделям — миграции применять не нужно
+        from flask_migrate import stamp
+        stamp(directory=os.path.join(app.root_path, "migrations"))
 
     admin_email = os.getenv("ADMIN_EMAIL", "admin@weddings.local")
     admin_pass  = os.getenv("ADMIN_PASSWORD", "admin123")
@@ -0,0 +1,150 @@
+# archive.py
+"""
+Архив старых свадеб.
+
+Свадьбы, прошедшие больше ARCHIVE_AFTER_DAYS назад (по Wedding.date),
+переносятся пачками: строки гостей, расходов, задач, столов и подарков
+уходят в таблицы *_archive (INSERT … SELECT + DELETE в одной транзакции на
+пачку), у свадьбы ставится archived_at. Сама строка wedding остаётся на
+месте — version, spent_total, budget_state и куб отчётов не меняются, а
+горячие таблицы и их индексы содержат только живые свадьбы.
+
+Архивная свадьба по тем же URL открывается только для чтения: before_request
+видит archived_at и вместо страниц отдаёт карточку «в архиве» (имя, дата,
+суммы со строки wedding, число строк в архиве), а запись отклоняет. Строки
+возвращает явный POST /wedding/<id>/restore владельца или админа
+(restore_wedding) — GET в базу не пишет. После восстановления архиватор не
+трогает свадьбу ARCHIVE_RESTORE_GRACE_DAYS.
+
+    flask --app app archive-weddings --batch 50 --sleep 1   # по cron ночью
+    flask --app app restore-wedding 123
+"""
+from __future__ import annotations
+
+import time
+from datetime import date, datetime, timedelta
+
+from flask import current_app, request, render_template, jsonify, flash, redirect, url_for
+from flask_login import current_user
+from sqlalchemy import select, insert, delete, update, or_, func
+
+from models import db, Wedding, ARCHIVED_MODELS, ARCHIVE_TABLES
+import metrics
+
+# POST, возвращающий строки архивной свадьбы (app.restore_archived)
+RESTORE_ENDPOINT = "restore_archived"
+
+
+def _move(conn, src, dst, wedding_ids) -> int:
+    cols = [c.name for c in src.columns]
+    conn.execute(insert(dst).from_select(cols, select(*[src.c[c] for c in cols]).where(src.c.wedding_id.in_(wedding_ids))))
+    return conn.execute(delete(src).where(src.c.wedding_id.in_(wedding_ids))).rowcount
+
+
+# ----------------------------
+# Архивация
+# ----------------------------
+def candidates(older_than_days: int, limit: int | None = None) -> list[int]:
+    now = datetime.utcnow()
+    grace = timedelta(days=current_app.config["ARCHIVE_RESTORE_GRACE_DAYS"])
+    stmt = (
+        select(Wedding.id)
+        .where(Wedding.archived_at.is_(None),
+               Wedding.date < date.today() - timedelta(days=older_than_days),
+               or_(Wedding.restored_at.is_(None), Wedding.restored_at < now - grace))
+        .order_by(Wedding.date, Wedding.id)
+    )
+    if limit:
+        stmt = stmt.limit(limit)
+    return list(db.session.scalars(stmt))
+
+
+def archive_weddings(wedding_ids: list[int]) -> int:
+    """Одна пачка — одна транзакция. Возвращает число перенесённых строк."""
+    conn = db.session.connection()
+    # строки свадеб блокируем: параллельный restore/архиватор подождёт или пропустит
+    ids = list(db.session.scalars(
+        select(Wedding.id).where(Wedding.id.in_(wedding_ids), Wedding.archived_at.is_(None))
+        .with_for_update(skip_locked=True)
+    ))
+    moved = 0
+    if ids:
+        # удаляем детей раньше родителей (guest.table_id -> table)
+        for model in reversed(ARCHIVED_MODELS):
+            moved += _move(conn, model.__table__, ARCHIVE_TABLES[model], ids)
+        conn.execute(update(Wedding.__table__).where(Wedding.__table__.c.id.in_(ids))
+                     .values(archived_at=datetime.utcnow()))
+    db.session.commit()
+    metrics.incr("archive.weddings", len(ids))
+    metrics.incr("archive.rows", moved)
+    return moved
+
+
+def run(older_than_days: int, batch: int = 50, limit: int | None = None, pause: float = 0.0, log=print) -> int:
+    """Архивирует кандидатов пачками, между пачками — пауза (не душим прод)."""
+    ids = candidates(older_than_days, limit)
+    done = 0
+    for i in range(0, len(ids), batch):
+        chunk = ids[i:i + batch]
+        rows = archive_weddings(chunk)
+        done += len(chunk)
+        log(f"[archive] {done}/{len(ids)} свадеб, строк в пачке: {rows}")
+        if pause and i + batch < len(ids):
+            time.sleep(pause)
+    return done
+
+
+# ----------------------------
+# Восстановление
+# ----------------------------
+def restore_wedding(wedding_id: int) -> bool:
+    """Возвращает строки свадьбы в горячие таблицы. False — уже не в архиве."""
+    conn = db.session.connection()
+    archived = db.session.scalar(
+        select(Wedding.archived_at).where(Wedding.id == wedding_id).with_for_update()
+    )
+    if archived is None:
+        db.session.rollback()
+        return False
+    for model in ARCHIVED_MODELS:
+        _move(conn, ARCHIVE_TABLES[model], model.__table__, [wedding_id])
+    conn.execute(update(Wedding.__table__).where(Wedding.__table__.c.id == wedding_id)
+                 .values(archived_at=None, restored_at=datetime.utcnow()))
+    db.session.commit()
+    metrics.incr("archive.restored")
+    return True
+
+
+def archived_counts(wedding_id: int) -> dict:
+    """{имя таблицы: строк в архиве} — для карточки архивной свадьбы."""
+    return {
+        model.__tablename__: db.session.scalar(
+            select(func.count()).select_from(ARCHIVE_TABLES[model])
+            .where(ARCHIVE_TABLES[model].c.wedding_id == wedding_id)
+        )
+        for model in ARCHIVED_MODELS
+    }
+
+
+def archived_read_only():
+    """before_request: архивная свадьба — только карточка «в архиве», запись — отказ.
+
+    Данные возвращает явный POST restore (владелец или админ), а не любой GET.
+    """
+    wedding_id = (request.view_args or {}).get("wedding_id")
+    if wedding_id is None or request.endpoint == RESTORE_ENDPOINT:
+        return
+    wedding = db.session.get(Wedding, wedding_id)
+    if wedding is None or wedding.archived_at is None:
+        return
+    can_restore = current_user.is_authenticated and (current_user.is_admin or wedding.user_id == current_user.id)
+    if request.method in ("GET", "HEAD"):
+        # SSE (events.py) подписываться не на что
+        if request.accept_mimetypes.best == "text/event-stream":
+            return jsonify({"ok": False, "archived": True}), 409
+        return render_template("wedding_archived.html", wedding=wedding,
+                               counts=archived_counts(wedding_id), can_restore=can_restore)
+    if request.is_json:
+        return jsonify({"ok": False, "archived": True}), 409
+    flash("Свадьба в архиве: сначала восстановите её", "error")
+    return redirect(url_for("wedding_pages.view_wedding", wedding_id=wedding_id))
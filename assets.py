@@ -0,0 +1,190 @@
+# assets.py
+"""
+Статика с отпечатками: сборка при деплое, вечный кэш в браузере.
+
+    flask --app app build-assets
+
+кладёт в static/dist/ копии файлов static/ с хэшем содержимого в имени
+(app.3f9c1a2b7e.css), рядом — .gz и .br (brotli, если установлен) для
+текстовых файлов, для JPG/PNG — WebP нужной ширины (превью фона в
+редакторе шаблона). Соответствие имён — static/dist/manifest.json.
+
+В шаблонах — asset_url('app.css'), asset_url('invite_bg.jpg', 480) для
+WebP-варианта. /assets/<имя> отдаёт файл с
+Cache-Control: immutable и сжатой копией по Accept-Encoding; новое
+содержимое — новое имя, так что повторный заход не качает ничего.
+Без сборки (локально) asset_url ведёт на обычный /static/.
+"""
+from __future__ import annotations
+
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+
+from flask import current_app, request, send_from_directory, url_for
+from flask.sessions import SecureCookieSessionInterface
+
+try:
+    import brotli
+except ImportError:  # .br просто не собираются
+    brotli = None
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+DIST = "dist"
+MANIFEST = "manifest.json"
+
+# сжимаем только текст: jpg/png/webp уже сжаты
+COMPRESS_EXT = {".css", ".js", ".svg", ".json", ".txt", ".html"}
+IMAGE_EXT = {".jpg", ".jpeg", ".png"}
+WEBP_WIDTHS = (480, 960)
+WEBP_QUALITY = 80
+
+
+# ----------------------------
+# Сборка
+# ----------------------------
+def _fingerprint(name: str, data: bytes) -> str:
+    root, ext = os.path.splitext(name)
+    return f"{root}.{hashlib.sha256(data).hexdigest()[:10]}{ext}"
+
+
+def _emit(out_dir: str, name: str, data: bytes, stats: dict) -> str:
+    hashed = _fingerprint(name, data)
+    path = os.path.join(out_dir, hashed)
+    if not os.path.exists(path):
+        with open(path, "wb") as f:
+            f.write(data)
+    stats[hashed] = {"raw": len(data)}
+    if os.path.splitext(name)[1] in COMPRESS_EXT:
+        variants = {"gz": gzip.compress(data, 9, mtime=0)}
+        if brotli is not None:
+            variants["br"] = brotli.compress(data, quality=11)
+        for ext, packed in variants.items():
+            if len(packed) < len(data):
+                with open(f"{path}.{ext}", "wb") as f:
+                    f.write(packed)
+                stats[hashed][ext] = len(packed)
+    return hashed
+
+
+def _webp(path: str, width: int) -> bytes | None:
+    from io import BytesIO
+    from PIL import Image
+
+    with Image.open(path) as img:
+        if img.width < width:
+            return None
+        img = img.convert("RGB")
+        img = img.resize((width, round(img.height * width / img.width)), Image.LANCZOS)
+        buf = BytesIO()
+        img.save(buf, "WEBP", quality=WEBP_QUALITY, method=6)
+        return buf.getvalue()
+
+
+def build(src_dir: str = STATIC_DIR, log=print) -> dict:
+    """Собирает dist/ и manifest; файлы прошлой сборки остаются (старые страницы в кэше)."""
+    out_dir = os.path.join(src_dir, DIST)
+    os.makedirs(out_dir, exist_ok=True)
+    manifest, stats = {}, {}
+    for name in sorted(os.listdir(src_dir)):
+        path = os.path.join(src_dir, name)
+        if not os.path.isfile(path) or name.startswith("."):
+            continue
+        with open(path, "rb") as f:
+            data = f.read()
+        manifest[name] = _emit(out_dir, name, data, stats)
+        root, ext = os.path.splitext(name)
+        if ext.lower() in IMAGE_EXT:
+            for width in WEBP_WIDTHS:
+                webp = _webp(path, width)
+                if webp is not None:
+                    manifest[f"{name}@{width}"] = _emit(out_dir, f"{root}.w{width}.webp", webp, stats)
+
+    # manifest пишем последним и атомарно — воркеры не увидят полсборки
+    tmp = os.path.join(out_dir, MANIFEST + ".tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    os.replace(tmp, os.path.join(out_dir, MANIFEST))
+
+    for key, hashed in manifest.items():
+        st = stats[hashed]
+        packed = ", ".join(f"{ext} {st[ext] / 1024:.1f} КБ" for ext in ("gz", "br") if ext in st)
+        log(f"[assets] {key:24} -> {hashed} ({st['raw'] / 1024:.1f} КБ{', ' + packed if packed else ''})")
+    if brotli is None:
+        log("[assets] brotli не установлен — только .gz")
+    return manifest
+
+
+# ----------------------------
+# Рантайм
+# ----------------------------
+def _manifest() -> dict:
+    return current_app.extensions["assets"]
+
+
+def asset_url(name: str, width: int | None = None) -> str:
+    """URL с отпечатком; width — WebP-вариант картинки (нет — оригинал)."""
+    manifest = _manifest()
+    hashed = manifest.get(f"{name}@{width}") if width else None
+    hashed = hashed or manifest.get(name)
+    if hashed is None:
+        return url_for("static", filename=name)
+    return url_for("assets", filename=hashed)
+
+
+def asset_srcset(name: str) -> str:
+    """srcset WebP-вариантов для <source type="image/webp">; пусто — вариантов нет."""
+    manifest = _manifest()
+    return ", ".join(
+        f"{url_for('assets', filename=manifest[key])} {w}w"
+        for w in WEBP_WIDTHS if (key := f"{name}@{w}") in manifest
+    )
+
+
+def serve_asset(filename):
+    out_dir = os.path.join(current_app.config["ASSETS_DIR"], DIST)
+    mimetype = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    encoding = None
+    for enc, ext in (("br", "br"), ("gzip", "gz")):
+        if enc in request.accept_encodings and os.path.isfile(os.path.join(out_dir, f"{filename}.{ext}")):
+            encoding, filename = enc, f"{filename}.{ext}"
+            break
+    resp = send_from_directory(out_dir, filename, mimetype=mimetype, max_age=current_app.config["ASSETS_MAX_AGE"])
+    if encoding:
+        resp.headers["Content-Encoding"] = encoding
+    resp.headers["Vary"] = "Accept-Encoding"
+    resp.cache_control.public = True
+    resp.cache_control.immutable = True
+    return resp
+
+
+class _SessionInterface(SecureCookieSessionInterface):
+    """Файлы /assets/ не зависят от cookie: без Set-Cookie и Vary: Cookie (кэш CDN/прокси)."""
+
+    def save_session(self, app, session, response):
+        if request.endpoint == "assets":
+            return
+        super().save_session(app, session, response)
+
+
+def load_manifest(app) -> dict:
+    path = os.path.join(app.config["ASSETS_DIR"], DIST, MANIFEST)
+    try:
+        with open(path, encoding="utf-8") as f:
+            manifest = json.load(f)
+    except FileNotFoundError:
+        manifest = {}
+    app.extensions["assets"] = manifest
+    return manifest
+
+
+def init_assets(app):
+    app.config.setdefault("ASSETS_DIR", STATIC_DIR)
+    app.config.setdefault("ASSETS_MAX_AGE", 365 * 24 * 3600)
+    load_manifest(app)
+    app.add_url_rule("/assets/<path:filename>", "assets", serve_asset)
+    if type(app.session_interface) is SecureCookieSessionInterface:
+        app.session_interface = _SessionInterface()
+    app.jinja_env.globals.update(asset_url=asset_url, asset_srcset=asset_srcset)
@@ -1,10 +1,36 @@
 # auth.py
-from flask import Blueprint, render_template, request, redirect, url_for, flash
+from flask import Blueprint, render_template, request, redirect, url_for, flash, current_app
 from flask_login import login_user, logout_user, login_required, current_user
 from models import db, User
+from ratelimit import SlidingWindowLimiter
+import passwords
+import metrics
 
 auth_bp = Blueprint('auth', __name__, url_prefix='/auth')
 
+
+# лимиты входа: по IP — все попытки, по email — неудачные; проверка до хэша.
+# IP — request.remote_addr: за nginx нужен PROXY_FIX_HOPS (app.py), иначе это адрес прокси
+@auth_bp.record_once
+def _init_login_limits(state):
+    cfg = state.app.config
+    state.app.extensions["login_limits"] = {
+        "ip": SlidingWindowLimiter(cfg["LOGIN_IP_LIMIT"], cfg["LOGIN_IP_WINDOW"]),
+        "email": SlidingWindowLimiter(cfg["LOGIN_EMAIL_LIMIT"], cfg["LOGIN_EMAIL_WINDOW"]),
+    }
+
+
+def _throttled(ip: str, email: str):
+    limits = current_app.extensions["login_limits"]
+    wait = max(limits["ip"].retry_after(ip), limits["email"].retry_after(email) if email else 0)
+    if not wait:
+        return None
+    metrics.incr("auth.login.throttled")
+    flash(f'Слишком много попыток входа. Попробуйте через {int(wait) + 1} с', 'error')
+    resp = current_app.make_response((render_template('auth_login.html'), 429))
+    resp.headers["Retry-After"] = str(int(wait) + 1)
+    return resp
+
 @auth_bp.route('/register', methods=['GET', 'POST'])
 def register():
     if request.method == 'POST':
@@ -32,10 +58,26 @@ def login():
     if request.method == 'POST':
         email = (request.form.get('email') or '').strip().lower()
         password = request.form.get('password') or ''
+        ip = request.remote_addr or '-'
+        throttled = _throttled(ip, email)
+        if throttled is not None:
+            return throttled
+        limits = current_app.extensions["login_limits"]
+        limits["ip"].add(ip)
+
         u = User.query.filter_by(email=email).first()
         if not u or not u.check_password(password):
+            limits["email"].add(email)
+            metrics.incr("auth.login.fail")
             flash('Неверный email или пароль', 'error')
             return redirect(url_for('auth.login'))
+        limits["email"].reset(email)
+        if passwords.needs_rehash(u.password_hash):
+            # сменили PASSWORD_HASH_METHOD — пароль в руках, перехэшируем
+            u.set_password(password)
+            db.session.commit()
+            metrics.incr("auth.login.rehash")
+        metrics.incr("auth.login.ok")
         login_user(u)
         return redirect(url_for('index'))
     return render_template('auth_login.html')
@@ -0,0 +1 @@
+# bench/ — бенчмарки и нагрузочные сценарии (запуск: python -m bench.<скрипт>)
@@ -0,0 +1,106 @@
+# bench/_http.py
+"""Минимальный asyncio HTTP/1.1 клиент с keep-alive (без внешних зависимостей)."""
+from __future__ import annotations
+
+import asyncio
+from urllib.parse import urlsplit, urlencode
+
+
+class HttpConnection:
+    def __init__(self, base_url: str, cookie: str | None = None):
+        u = urlsplit(base_url)
+        self.host = u.hostname or "127.0.0.1"
+        self.port = u.port or 80
+        self.cookie = cookie
+        self._reader = None
+        self._writer = None
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            try:
+                await self._writer.wait_closed()
+            except Exception:
+                pass
+        self._reader = self._writer = None
+
+    async def request(self, method: str, path: str, body: bytes = b"",
+                      headers: dict | None = None) -> tuple[int, dict, bytes]:
+        if self._writer is None:
+            await self._connect()
+        hdrs = {"Host": f"{self.host}:{self.port}", "Connection": "keep-alive",
+                "Content-Length": str(len(body))}
+        if self.cookie:
+            hdrs["Cookie"] = self.cookie
+        hdrs.update(headers or {})
+        head = f"{method} {path} HTTP/1.1\r\n" + "".join(f"{k}: {v}\r\n" for k, v in hdrs.items()) + "\r\n"
+        try:
+            self._writer.write(head.encode("latin-1") + body)
+            await self._writer.drain()
+            return await self._read_response()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            await self.close()
+            raise
+
+    async def _read_response(self):
+        status_line = await self._reader.readuntil(b"\r\n")
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            k, _, v = line.decode("latin-1").partition(":")
+            headers.setdefault(k.strip().lower(), []).append(v.strip())
+        if "chunked" in ",".join(headers.get("transfer-encoding", [])).lower():
+            chunks = []
+            while True:
+                size = int((await self._reader.readuntil(b"\r\n")).split(b";")[0], 16)
+                data = await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+                chunks.append(data[:-2])
+            body = b"".join(chunks)
+        elif "content-length" in headers:
+            body = await self._reader.readexactly(int(headers["content-length"][0]))
+        else:
+            body = await self._reader.read()
+            await self.close()
+        if "close" in ",".join(headers.get("connection", [])).lower():
+            await self.close()
+        return status, headers, body
+
+    async def get(self, path: str, headers: dict | None = None):
+        return await self.request("GET", path, headers=headers)
+
+    async def post_form(self, path: str, form: dict):
+        return await self.request(
+            "POST", path, urlencode(form).encode(),
+            {"Content-Type": "application/x-www-form-urlencoded"},
+        )
+
+    async def post_json(self, path: str, payload: bytes):
+        return await self.request("POST", path, payload, {"Content-Type": "application/json"})
+
+
+async def login(base_url: str, email: str, password: str) -> str:
+    """Логин через auth.login, возвращает строку Cookie для последующих запросов."""
+    conn = HttpConnection(base_url)
+    try:
+        status, headers, _ = await conn.post_form("/auth/login", {"email": email, "password": password})
+    finally:
+        await conn.close()
+    cookies = [c.split(";", 1)[0] for c in headers.get("set-cookie", [])]
+    if status != 302 or not cookies:
+        raise RuntimeError(f"login failed: HTTP {status}")
+    return "; ".join(cookies)
+
+
+def percentile(sorted_values: list[float], p: float) -> float:
+    if not sorted_values:
+        return 0.0
+    k = min(len(sorted_values) - 1, max(0, int(round(p / 100 * (len(sorted_values) - 1)))))
+    return sorted_values[k]
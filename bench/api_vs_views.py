@@ -0,0 +1,101 @@
+# bench/api_vs_views.py
+"""
+Нагрузочное сравнение: sync Flask-views (WSGI) vs async JSON API (ASGI).
+
+    gunicorn -w 2 -b 127.0.0.1:8000 app:app
+    uvicorn api_async:asgi_app --port 8001
+    python -m bench.api_vs_views --wsgi http://127.0.0.1:8000 --asgi http://127.0.0.1:8001 \
+        --wedding 1 --concurrency 50 --duration 15
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import time
+
+from bench._http import HttpConnection, login, percentile
+
+PAIRS = [
+    # (имя, sync view, async API)
+    ("guests",   "/wedding/{id}/guests",   "/api/weddings/{id}/guests"),
+    ("expenses", "/wedding/{id}/expenses", "/api/weddings/{id}/expenses"),
+    ("seating",  "/wedding/{id}/seating",  "/api/weddings/{id}/tables"),
+    ("tasks",    "/tasks/{id}",            "/api/weddings/{id}/tasks"),
+    ("overview", "/wedding/{id}",          "/api/weddings/{id}"),
+]
+
+
+async def _worker(base_url, cookie, path, deadline, latencies, errors):
+    conn = HttpConnection(base_url, cookie)
+    try:
+        while time.perf_counter() < deadline:
+            t0 = time.perf_counter()
+            try:
+                status, _, _ = await conn.get(path)
+            except Exception:
+                errors.append(1)
+                continue
+            if status >= 400:
+                errors.append(status)
+            latencies.append(time.perf_counter() - t0)
+    finally:
+        await conn.close()
+
+
+async def run_one(base_url, cookie, path, concurrency, duration):
+    latencies, errors = [], []
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        _worker(base_url, cookie, path, deadline, latencies, errors) for _ in range(concurrency)
+    ])
+    elapsed = time.perf_counter() - started
+    latencies.sort()
+    return {
+        "path": path,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 95) * 1000, 2),
+    }
+
+
+async def main_async(args):
+    email = args.email or os.getenv("ADMIN_EMAIL", "admin@weddings.local")
+    password = args.password or os.getenv("ADMIN_PASSWORD", "admin123")
+    # SECRET_KEY общий, поэтому cookie от WSGI подходит и для ASGI
+    cookie = await login(args.wsgi, email, password)
+
+    report = []
+    for name, sync_path, async_path in PAIRS:
+        sync_res = await run_one(args.wsgi, cookie, sync_path.format(id=args.wedding),
+                                 args.concurrency, args.duration)
+        async_res = await run_one(args.asgi, cookie, async_path.format(id=args.wedding),
+                                  args.concurrency, args.duration)
+        ratio = (async_res["rps"] / sync_res["rps"]) if sync_res["rps"] else 0.0
+        report.append({"name": name, "sync": sync_res, "async": async_res, "speedup": round(ratio, 2)})
+        print(f"{name:<10} sync {sync_res['rps']:>8} req/s  async {async_res['rps']:>8} req/s  x{ratio:.2f}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--wsgi", default="http://127.0.0.1:8000")
+    ap.add_argument("--asgi", default="http://127.0.0.1:8001")
+    ap.add_argument("--wedding", type=int, default=1)
+    ap.add_argument("--concurrency", type=int, default=50)
+    ap.add_argument("--duration", type=float, default=10.0)
+    ap.add_argument("--email")
+    ap.add_argument("--password")
+    ap.add_argument("--out", help="куда сохранить JSON-отчёт")
+    asyncio.run(main_async(ap.parse_args()))
+
+
+if __name__ == "__main__":
+    main()
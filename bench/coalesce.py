@@ -0,0 +1,139 @@
+# bench/coalesce.py
+"""
+Склейка AJAX-записей (writebehind.py): пересадки гостей от нескольких
+клиентов одной свадьбы с окном и без.
+
+    python -m bench.coalesce                                  # окна 0 / 5 / 20 мс
+    python -m bench.coalesce --clients 16 --commit-ms 40 --windows 0 10
+
+--commit-ms — искусственная задержка каждого COMMIT (как сетевой
+round-trip до Neon); на локальной SQLite он почти бесплатный, и выигрыш
+не виден. Каждый клиент — свой поток с test_client, двигает своих гостей
+по случайным столам (без конфликтов). В конце — проверка конфликта: два
+клиента одновременно тащат одного гостя с одного стола, один получает 409.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import threading
+import time
+
+from bench.seating_chart import ROOT, seed
+
+# клиенты — потоки одного процесса, как у gthread-воркера; без этого writebehind пишет без окна
+THREADED = {"wsgi.multithread": True}
+
+
+def _run(app, n_clients: int, moves: int, tables: int, per_client: list[list[int]], rnd_seed: int):
+    """(латентности успешных ходов, число ошибок — без окна SQLite иногда отвечает «database is locked»)."""
+    latencies, errors, lock = [], [], threading.Lock()
+    barrier = threading.Barrier(n_clients)
+
+    def client(i):
+        rnd = random.Random(rnd_seed + i)
+        c = app.test_client()
+        mine = per_client[i]
+        barrier.wait()
+        for _ in range(moves):
+            t0 = time.perf_counter()
+            r = c.post("/wedding/seating/assign", environ_overrides=THREADED,
+                       json={"guest_id": rnd.choice(mine), "table_id": rnd.randint(1, tables)})
+            with lock:
+                if r.status_code == 200:
+                    latencies.append(time.perf_counter() - t0)
+                else:
+                    errors.append(r.status_code)
+
+    threads = [threading.Thread(target=client, args=(i,)) for i in range(n_clients)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    return latencies, len(errors)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--clients", type=int, default=8)
+    ap.add_argument("--moves", type=int, default=25, help="пересадок на клиента")
+    ap.add_argument("--windows", type=float, nargs="+", default=[0, 5, 20], help="WRITE_COALESCE_MS")
+    ap.add_argument("--commit-ms", type=float, default=30)
+    ap.add_argument("--tables", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    url = f"sqlite:///{tmp.name}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("STARTUP_FAST", "1")
+    sys.path.insert(0, ROOT)
+    try:
+        from sqlalchemy import create_engine, event
+        n_guests = seed(create_engine(url), args.tables, 8, args.seed)
+
+        from app import app
+        import metrics
+        from models import db
+
+        commits = [0]
+        with app.app_context():
+            engine = db.engine
+
+        @event.listens_for(engine, "commit")
+        def _slow_commit(_conn):
+            commits[0] += 1
+            time.sleep(args.commit_ms / 1000)
+
+        ids = list(range(1, n_guests + 1))
+        per_client = [ids[i::args.clients] for i in range(args.clients)]
+
+        print(f"клиентов: {args.clients} x {args.moves} пересадок, COMMIT +{args.commit_ms:g} мс")
+        print(f"{'окно, мс':>8} {'всего, с':>9} {'ходов/с':>8} {'COMMIT':>7} {'пачка':>6} {'p50, мс':>8} {'p95, мс':>8} {'ошибок':>7}")
+        for window in args.windows:
+            app.config["WRITE_COALESCE_MS"] = window
+            commits[0] = 0
+            t0 = time.perf_counter()
+            lat, errors = _run(app, args.clients, args.moves, args.tables, per_client, args.seed)
+            lat.sort()
+            total = time.perf_counter() - t0
+            n = len(lat)
+            print(f"{window:8g} {total:9.2f} {n / total:8.1f} {commits[0]:7d} {n / max(1, commits[0]):6.1f} "
+                  f"{statistics.median(lat) * 1000:8.1f} {lat[int(n * 0.95) - 1] * 1000:8.1f} {errors:7d}")
+
+        # конфликт: оба клиента видели гостя за столом 1 и тащат его в разные столы
+        app.config["WRITE_COALESCE_MS"] = max(args.windows) or 20
+        with app.app_context():
+            from models import Guest
+            g = db.session.get(Guest, 1)
+            g.table_id = 1
+            db.session.commit()
+        codes, barrier = [], threading.Barrier(2)
+
+        def drag(to):
+            c = app.test_client()
+            barrier.wait()
+            r = c.post("/wedding/seating/assign", environ_overrides=THREADED,
+                       json={"guest_id": 1, "table_id": to, "from_table_id": 1})
+            codes.append((r.status_code, r.get_json().get("batch")))
+
+        threads = [threading.Thread(target=drag, args=(to,)) for to in (2, 3)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        print(f"\nконфликт (статус, пачка): {sorted(codes)}")
+        print("метрики:", {k: v for k, v in metrics.snapshot()["observed"].items() if k.startswith("writebehind")})
+        if sorted(c for c, _ in codes) != [200, 409]:
+            sys.exit(1)
+    finally:
+        os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+# bench/compare.py
+"""
+Сравнение двух JSON-отчётов bench.run (например, base-коммит и текущий).
+
+    python -m bench.compare base.json new.json --threshold 10
+
+Код возврата 1, если p50 или число запросов выросли больше порога (%).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import sys
+
+METRICS = ("p50_ms", "p95_ms", "queries", "peak_mem_kb")
+
+
+def _delta(old, new) -> float:
+    if not old:
+        return 0.0 if not new else 100.0
+    return (new - old) / old * 100
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("base")
+    ap.add_argument("new")
+    ap.add_argument("--threshold", type=float, default=10.0, help="допустимый рост, %%")
+    args = ap.parse_args()
+
+    with open(args.base, encoding="utf-8") as f:
+        base = json.load(f)
+    with open(args.new, encoding="utf-8") as f:
+        new = json.load(f)
+
+    print(f"base {base['meta'].get('commit')} -> new {new['meta'].get('commit')}")
+    regressions = 0
+    for dialect, run in new["runs"].items():
+        old_run = base["runs"].get(dialect)
+        if not old_run:
+            continue
+        print(f"\n[{dialect}]")
+        print(f"{'scenario':<16}" + "".join(f"{m:>22}" for m in METRICS))
+        for name, res in run["scenarios"].items():
+            old = old_run["scenarios"].get(name)
+            if not old:
+                continue
+            cells = []
+            for m in METRICS:
+                d = _delta(old[m], res[m])
+                flag = ""
+                if m in ("p50_ms", "queries") and d > args.threshold:
+                    flag = " !"
+                    regressions += 1
+                cells.append(f"{res[m]:>10} ({d:+6.1f}%){flag:2}")
+            print(f"{name:<16}" + "".join(f"{c:>22}" for c in cells))
+
+    sys.exit(1 if regressions else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,135 @@
+# bench/declension.py
+"""
+Склонение фамилий и приветствия: проверка на корпусе и замер.
+
+    python -m bench.declension                 # корпус + 10000 гостей
+    python -m bench.declension --guests 50000
+
+Корпус — ожидаемые формы для RU (родительный мн.) и UZ («…лар»), плюс
+приветствия по имени. Код возврата 1 при любом расхождении. Замер:
+приветствия для экспорта N гостей без кэша, с тёплым кэшем и чтение
+готовых строк (как теперь с Guest.greeting_ru / greeting_uz).
+"""
+from __future__ import annotations
+
+import argparse
+import random
+import sys
+import time
+
+from bench.seating_chart import ROOT
+
+# фамилия как ввели -> (RU «семья …», UZ «… оиласи»)
+FAMILIES = [
+    ("Ильины", "Ильиных", "Ильинлар"),
+    ("Ташевы", "Ташевых", "Ташевлар"),
+    ("Каримовы", "Каримовых", "Каримовлар"),
+    ("Юсуповы", "Юсуповых", "Юсуповлар"),
+    ("Соловьёвы", "Соловьёвых", "Соловьёвлар"),
+    ("Ильин", "Ильиных", "Ильинлар"),
+    ("Ташев", "Ташевых", "Ташевлар"),
+    ("Иванова", "Ивановых", "Ивановлар"),
+    ("Пушкина", "Пушкиных", "Пушкинлар"),
+    ("Вишневские", "Вишневских", "Вишневскийлар"),
+    ("Вишневский", "Вишневских", "Вишневскийлар"),
+    ("Вишневская", "Вишневских", "Вишневскийлар"),
+    ("Трубецкой", "Трубецких", "Трубецкойлар"),
+    ("Толстые", "Толстых", "Толстлар"),
+    ("Толстая", "Толстых", "Толстойлар"),
+    ("Горький", "Горьких", "Горькийлар"),
+    ("Петровы-Водкины", "Петровых-Водкиных", "Петровлар-Водкинлар"),
+    ("ИВАНОВЫ", "ИВАНОВЫХ", "ИВАНОВЛАР"),
+    ("Черных", "Черных", "Черныхлар"),
+    ("Долгих", "Долгих", "Долгихлар"),
+    ("Шевченко", "Шевченко", "Шевченколар"),
+    ("Цой", "Цой", "Цойлар"),
+    ("Ким", "Ким", "Кимлар"),
+    ("Ли", "Ли", "Лилар"),
+    ("Дарвин", "Дарвин", "Дарвинлар"),
+    ("Рахимов", "Рахимовых", "Рахимовлар"),
+    ("Юлдашевлар", "Юлдашевлар", "Юлдашевлар"),
+]
+# имя -> (RU, UZ)
+NAMES = [
+    ("Анна", "Дорогая Анна!", "Қадрли Анна!"),
+    ("Олег", "Дорогой Олег!", "Қадрли Олег!"),
+    ("Никита", "Дорогой Никита!", "Қадрли Никита!"),
+    ("Илья", "Дорогой Илья!", "Қадрли Илья!"),
+    ("Дилноза", "Дорогая Дилноза!", "Қадрли Дилноза!"),
+    ("Гульноз", "Дорогая Гульноз!", "Қадрли Гульноз!"),
+    ("Мохигул", "Дорогая Мохигул!", "Қадрли Мохигул!"),
+    ("Любовь", "Дорогая Любовь!", "Қадрли Любовь!"),
+    ("Азиз", "Дорогой Азиз!", "Қадрли Азиз!"),
+    ("Анна и Олег", "Дорогие Анна и Олег!", "Қадрли Анна и Олег!"),
+    ("", "Дорогие гости!", "Қадрли меҳмонлар!"),
+]
+
+
+def check(declension) -> list[str]:
+    errors = []
+    for fam, ru, uz in FAMILIES:
+        got = declension.greetings(None, fam)
+        want = (f"Дорогая семья {ru}!", f"Қадрли {uz} оиласи!")
+        if got != want:
+            errors.append(f"{fam}: {got} != {want}")
+    for name, ru, uz in NAMES:
+        got = declension.greetings(name, None)
+        if got != (ru, uz):
+            errors.append(f"{name!r}: {got} != {(ru, uz)}")
+    return errors
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--guests", type=int, default=10000)
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    sys.path.insert(0, ROOT)
+    import declension
+
+    errors = check(declension)
+    for e in errors:
+        print("MISMATCH", e)
+    print(f"корпус: {len(FAMILIES)} фамилий, {len(NAMES)} имён, расхождений: {len(errors)}")
+
+    rnd = random.Random(args.seed)
+    pool = [f for f, _, _ in FAMILIES] + [None] * 10
+    guests = [(rnd.choice(NAMES)[0], rnd.choice(pool)) for _ in range(args.guests)]
+
+    caches = (declension._ru_part, declension._uz_part, declension._gender)
+
+    def export(cold: bool):
+        # прежний экспорт: приветствия на каждую страницу (RU + UZ) заново
+        for name, fam in guests:
+            if cold:
+                for c in caches:
+                    c.cache_clear()
+            declension.ru_greeting(name, fam)
+            declension.uz_greeting(name, fam)
+
+    t0 = time.perf_counter()
+    export(cold=True)
+    cold = time.perf_counter() - t0
+    t0 = time.perf_counter()
+    export(cold=False)
+    warm = time.perf_counter() - t0
+
+    stored = [declension.greetings(n, f) for n, f in guests]
+    t0 = time.perf_counter()
+    for ru, uz in stored:
+        _ = ru, uz
+    read = time.perf_counter() - t0
+
+    n = len(guests)
+    print(f"гостей: {n}")
+    print(f"без кэша:     {cold * 1e6 / n:7.2f} мкс/гость")
+    print(f"тёплый кэш:   {warm * 1e6 / n:7.2f} мкс/гость")
+    print(f"из Guest:     {read * 1e6 / n:7.2f} мкс/гость")
+    print(f"кэш: RU {declension._ru_part.cache_info().currsize}, UZ {declension._uz_part.cache_info().currsize}")
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
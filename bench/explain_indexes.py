@@ -0,0 +1,93 @@
+# bench/explain_indexes.py
+"""
+EXPLAIN-проверка: каждый горячий запрос идёт по индексу на засеянных данных.
+
+    python -m bench.explain_indexes                        # временная SQLite
+    python -m bench.explain_indexes --db postgresql+psycopg://localhost/wm_bench --weddings 2000
+
+Код возврата 1, если хоть один запрос не использует ожидаемый индекс.
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import tempfile
+
+from sqlalchemy import create_engine, select, func
+
+from models import Wedding, Guest, Expense, Table, Task, SponsorGift
+from bench.datagen import generate
+
+def hot_queries(wedding_id: int, user_id: int, table_id: int):
+    """(имя, запрос, ожидаемый индекс или {диалект: индекс}) — те же фильтры, что во views.
+
+    Проверка по настоящим SQL страниц — tests/test_indexes.py.
+    """
+    return [
+        ("seating_page: гости стола",
+         select(Guest.id).where(Guest.wedding_id == wedding_id, Guest.table_id == table_id).order_by(Guest.id),
+         "ix_guest_wedding_table"),
+        ("seating_page: гости без стола",
+         select(Guest.id).where(Guest.wedding_id == wedding_id, Guest.table_id.is_(None)).order_by(Guest.id),
+         # SQLite предпочитает составной индекс (table_id IS NULL — тоже поиск по ключу)
+         {"postgresql": "ix_guest_wedding_unassigned", "sqlite": "ix_guest_wedding_table"}),
+        ("page_finance: расходы по категориям",
+         select(Expense.category, func.count()).where(Expense.wedding_id == wedding_id).group_by(Expense.category),
+         "ix_expense_wedding_category"),
+        ("page_finance: подарки",
+         select(SponsorGift.id).where(SponsorGift.wedding_id == wedding_id),
+         "ix_sponsor_gift_wedding_id"),
+        ("view_wedding: выполненные задачи",
+         select(func.count()).select_from(Task).where(Task.wedding_id == wedding_id, Task.is_done.is_(True)),
+         "ix_task_wedding_done"),
+        ("index: свадьбы пользователя",
+         select(Wedding.id).where(Wedding.user_id == user_id, Wedding.archived_at.is_(None))
+         .order_by(Wedding.date.desc().nullslast()),
+         "ix_wedding_user_date"),
+    ]
+
+
+def explain(conn, stmt) -> str:
+    sql = str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    if conn.dialect.name == "sqlite":
+        return "\n".join(r[-1] for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}"))
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {sql}").scalar()
+    return json.dumps(plan)
+
+
+def uses_index(plan: str, expected: str) -> bool:
+    return expected in plan and "Seq Scan" not in plan
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", help="URL базы (по умолчанию временная SQLite)")
+    ap.add_argument("--weddings", type=int, default=500)
+    ap.add_argument("--guests", type=int, default=100, help="гостей на свадьбу (в среднем)")
+    ap.add_argument("--seed", type=int, default=42)
+    args = ap.parse_args()
+
+    url = args.db or f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='wm-explain-'), 'explain.db')}"
+    engine = create_engine(url)
+    wedding_id = generate(engine, args.weddings, args.guests, args.seed)["showcase_wedding_id"]
+
+    failed = 0
+    with engine.connect() as conn:
+        user_id = conn.execute(select(Wedding.user_id).where(Wedding.id == wedding_id)).scalar()
+        table_id = conn.execute(select(Table.id).where(Table.wedding_id == wedding_id).limit(1)).scalar()
+        for name, stmt, expected in hot_queries(wedding_id, user_id, table_id):
+            if isinstance(expected, dict):
+                expected = expected[conn.dialect.name]
+            plan = explain(conn, stmt)
+            ok = uses_index(plan, expected)
+            failed += not ok
+            print(f"[{'OK' if ok else 'FAIL'}] {name}: ожидается {expected}")
+            if not ok:
+                print("       " + plan.replace("\n", "\n       "))
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
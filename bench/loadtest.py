@@ -0,0 +1,277 @@
+# bench/loadtest.py
+"""
+Нагрузочный прогон приложения под gunicorn реалистичной смесью запросов планировщиков.
+
+Виртуальный пользователь = планировщик из базы: логинится через auth.login и
+в цикле (с паузами «на подумать») делает случайное действие по весам:
+просмотр дашбордов, правка гостя, серия drag-and-drop seating_assign,
+изредка ZIP-выгрузка приглашений.
+
+    python -m bench.loadtest --db sqlite:////tmp/lt.db --generate --spawn --workers 4 \
+        --ramp 10,25,50,100 --duration 20
+    python -m bench.loadtest --url http://127.0.0.1:8000 --db postgresql+psycopg://... --users 50
+
+--ramp прогоняет ступени нагрузки и показывает, где упираемся (пул 5+10
+соединений, PDF-экспорт): пропускная способность перестаёт расти, p95
+растёт или появляются ошибки.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import socket
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from sqlalchemy import create_engine, select
+
+from bench._http import HttpConnection, login, percentile
+from models import User, Wedding, Guest, Table
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# действие: вес
+MIX = {
+    "dashboard": 55,
+    "guest_edit": 20,
+    "seating_burst": 20,
+    "zip_export": 1,
+    "finance": 4,
+}
+
+
+class Stats:
+    def __init__(self):
+        self.latencies = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, endpoint: str, seconds: float, ok: bool):
+        self.latencies[endpoint].append(seconds)
+        if not ok:
+            self.errors[endpoint] += 1
+
+    def summary(self, elapsed: float) -> dict:
+        out = {}
+        total = sum(len(v) for v in self.latencies.values())
+        for ep, lat in sorted(self.latencies.items()):
+            lat.sort()
+            out[ep] = {
+                "requests": len(lat),
+                "rps": round(len(lat) / elapsed, 2),
+                "error_rate": round(self.errors[ep] / len(lat), 4),
+                "p50_ms": round(percentile(lat, 50) * 1000, 1),
+                "p95_ms": round(percentile(lat, 95) * 1000, 1),
+                "p99_ms": round(percentile(lat, 99) * 1000, 1),
+            }
+        all_lat = sorted(x for v in self.latencies.values() for x in v)
+        errors = sum(self.errors.values())
+        return {
+            "total": {
+                "requests": total,
+                "rps": round(total / elapsed, 2) if elapsed else 0.0,
+                "error_rate": round(errors / total, 4) if total else 0.0,
+                "p50_ms": round(percentile(all_lat, 50) * 1000, 1),
+                "p95_ms": round(percentile(all_lat, 95) * 1000, 1),
+                "p99_ms": round(percentile(all_lat, 99) * 1000, 1),
+            },
+            "endpoints": out,
+        }
+
+
+def load_planners(db_url: str, limit: int, password: str) -> list[dict]:
+    """Планировщики и их свадьбы (id гостей и столов) прямо из базы."""
+    engine = create_engine(db_url)
+    planners = []
+    with engine.connect() as conn:
+        users = conn.execute(
+            select(User.id, User.email).where(User.is_admin.is_(False)).order_by(User.id).limit(limit)
+        ).all()
+        for uid, email in users:
+            weddings = []
+            for (wid,) in conn.execute(select(Wedding.id).where(Wedding.user_id == uid).limit(5)):
+                guests = [g for (g,) in conn.execute(select(Guest.id).where(Guest.wedding_id == wid))]
+                tables = [t for (t,) in conn.execute(select(Table.id).where(Table.wedding_id == wid))]
+                if guests:
+                    weddings.append({"id": wid, "guests": guests, "tables": tables})
+            if weddings:
+                planners.append({"email": email, "password": password, "weddings": weddings})
+    engine.dispose()
+    return planners
+
+
+async def _timed(stats, conn, endpoint, coro_fn):
+    t0 = time.perf_counter()
+    try:
+        status, _, _ = await coro_fn()
+        ok = status < 400
+    except Exception:
+        ok = False
+    stats.record(endpoint, time.perf_counter() - t0, ok)
+
+
+async def virtual_user(base_url, planner, deadline, stats, think: tuple[float, float], rnd: random.Random):
+    t0 = time.perf_counter()
+    try:
+        cookie = await login(base_url, planner["email"], planner["password"])
+        stats.record("auth.login", time.perf_counter() - t0, True)
+    except Exception:
+        stats.record("auth.login", time.perf_counter() - t0, False)
+        return
+    conn = HttpConnection(base_url, cookie)
+    actions, weights = zip(*MIX.items())
+    try:
+        while time.perf_counter() < deadline:
+            w = rnd.choice(planner["weddings"])
+            action = rnd.choices(actions, weights)[0]
+            if action == "dashboard":
+                path, ep = rnd.choice([
+                    ("/", "index"),
+                    (f"/wedding/{w['id']}", "view_wedding"),
+                    (f"/wedding/{w['id']}/guests", "wedding_guests"),
+                    (f"/wedding/{w['id']}/expenses", "wedding_expenses"),
+                    (f"/wedding/{w['id']}/seating", "seating_page"),
+                ])
+                await _timed(stats, conn, ep, lambda: conn.get(path))
+            elif action == "finance":
+                await _timed(stats, conn, "page_finance", lambda: conn.get(f"/finance/{w['id']}"))
+            elif action == "guest_edit":
+                gid = rnd.choice(w["guests"])
+                form = {"name": f"Гость {gid}", "status": rnd.choice(["invited", "confirmed", "declined"]),
+                        "family_count": str(rnd.randint(1, 4)), "phone": "+998900000000"}
+                await _timed(stats, conn, "edit_guest",
+                             lambda: conn.post_form(f"/wedding/guests/{gid}/edit", form))
+            elif action == "seating_burst":
+                # drag-and-drop: несколько быстрых перестановок подряд без пауз
+                for _ in range(rnd.randint(3, 12)):
+                    payload = json.dumps({
+                        "guest_id": rnd.choice(w["guests"]),
+                        "table_id": rnd.choice(w["tables"] + [None]) if w["tables"] else None,
+                    }).encode()
+                    await _timed(stats, conn, "seating_assign",
+                                 lambda: conn.post_json("/wedding/seating/assign", payload))
+            elif action == "zip_export":
+                await _timed(stats, conn, "invitations_zip",
+                             lambda: conn.get(f"/invitations/{w['id']}/all_pdfs.zip"))
+            await asyncio.sleep(rnd.uniform(*think))
+    finally:
+        await conn.close()
+
+
+async def run_stage(base_url, planners, users: int, duration: float, think, seed: int) -> dict:
+    stats = Stats()
+    rnd = random.Random(seed)
+    deadline = time.perf_counter() + duration
+    started = time.perf_counter()
+    await asyncio.gather(*[
+        virtual_user(base_url, planners[i % len(planners)], deadline, stats, think, random.Random(rnd.random()))
+        for i in range(users)
+    ])
+    return stats.summary(time.perf_counter() - started)
+
+
+def _wait_port(host, port, timeout=30.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            with socket.create_connection((host, port), timeout=1):
+                return
+        except OSError:
+            time.sleep(0.2)
+    raise SystemExit(f"gunicorn не поднялся на {host}:{port}")
+
+
+def spawn_gunicorn(db_url: str, workers: int, threads: int, port: int) -> subprocess.Popen:
+    env = {**os.environ, "DATABASE_URL": db_url, "STARTUP_FAST": "1"}
+    proc = subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-w", str(workers), "--threads", str(threads),
+         "-b", f"127.0.0.1:{port}", "--log-level", "warning", "app:app"],
+        cwd=ROOT, env=env,
+    )
+    _wait_port("127.0.0.1", port)
+    return proc
+
+
+def print_stage(users: int, res: dict):
+    t = res["total"]
+    print(f"\n=== {users} VU: {t['rps']} req/s, errors {t['error_rate']:.2%}, "
+          f"p50 {t['p50_ms']} ms, p95 {t['p95_ms']} ms, p99 {t['p99_ms']} ms")
+    print(f"{'endpoint':<18}{'req':>7}{'req/s':>9}{'err':>8}{'p50':>9}{'p95':>9}{'p99':>9}")
+    for ep, r in res["endpoints"].items():
+        print(f"{ep:<18}{r['requests']:>7}{r['rps']:>9}{r['error_rate']:>8.1%}"
+              f"{r['p50_ms']:>9}{r['p95_ms']:>9}{r['p99_ms']:>9}")
+
+
+def find_saturation(stages: list[tuple[int, dict]]) -> int | None:
+    """Первая ступень, где throughput почти не вырос, p95 удвоился или ошибок > 1%."""
+    for (u0, r0), (u1, r1) in zip(stages, stages[1:]):
+        t0, t1 = r0["total"], r1["total"]
+        if (t1["error_rate"] > 0.01
+                or t1["rps"] < t0["rps"] * 1.05
+                or t1["p95_ms"] > 2 * max(t0["p95_ms"], 1)):
+            return u1
+    return None
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", required=True, help="та же база, что у приложения (для списка планировщиков)")
+    ap.add_argument("--url", default="http://127.0.0.1:8000")
+    ap.add_argument("--generate", action="store_true", help="засеять базу через bench.datagen")
+    ap.add_argument("--weddings", type=int, default=500)
+    ap.add_argument("--guests-mean", type=int, default=150)
+    ap.add_argument("--spawn", action="store_true", help="поднять gunicorn самостоятельно")
+    ap.add_argument("--workers", type=int, default=4)
+    ap.add_argument("--threads", type=int, default=1)
+    ap.add_argument("--port", type=int, default=8000)
+    ap.add_argument("--users", type=int, default=20, help="виртуальных пользователей (без --ramp)")
+    ap.add_argument("--ramp", help="ступени VU через запятую, например 10,25,50,100")
+    ap.add_argument("--duration", type=float, default=20.0, help="секунд на ступень")
+    ap.add_argument("--think", default="0.2,1.5", help="пауза между действиями, мин,макс секунд")
+    ap.add_argument("--password", default="bench")
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="куда сохранить JSON-отчёт")
+    args = ap.parse_args()
+
+    if args.generate:
+        from bench.datagen import generate
+        print(generate(create_engine(args.db), args.weddings, args.guests_mean, args.seed))
+
+    planners = load_planners(args.db, 200, args.password)
+    if not planners:
+        raise SystemExit("в базе нет планировщиков со свадьбами (см. bench.datagen)")
+
+    proc = None
+    base_url = args.url
+    if args.spawn:
+        proc = spawn_gunicorn(args.db, args.workers, args.threads, args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+
+    think = tuple(float(x) for x in args.think.split(","))
+    levels = [int(x) for x in args.ramp.split(",")] if args.ramp else [args.users]
+    stages = []
+    try:
+        for users in levels:
+            res = asyncio.run(run_stage(base_url, planners, users, args.duration, think, args.seed))
+            stages.append((users, res))
+            print_stage(users, res)
+    finally:
+        if proc is not None:
+            proc.terminate()
+            proc.wait(timeout=10)
+
+    saturation = find_saturation(stages) if len(stages) > 1 else None
+    if len(stages) > 1:
+        print(f"\nНасыщение: {saturation} VU" if saturation else "\nНасыщение не достигнуто")
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"stages": [{"users": u, **r} for u, r in stages], "saturation_users": saturation},
+                      f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+# bench/login.py
+"""
+Цена входа: сколько логинов в секунду выдерживает одно ядро.
+
+    python -m bench.login                      # методы по умолчанию
+    python -m bench.login --methods scrypt:16384:8:1 pbkdf2:sha256:600000 --runs 20
+
+Для каждого метода (PASSWORD_HASH_METHOD):
+    hash   — только check_password_hash, мс и логинов/с на ядро;
+    login  — POST /auth/login через test_client на временной SQLite
+             (хэш + запрос пользователя + сессия).
+Отдельно — отказ по лимиту (429): до хэширования дело не доходит, это
+и есть цена одной попытки перебора после порога.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from bench.seating_chart import ROOT
+
+METHODS = ("scrypt:32768:8:1", "scrypt:16384:8:1", "pbkdf2:sha256:600000", "pbkdf2:sha256:200000")
+EMAIL, PASSWORD = "bench@login.local", "correct horse battery staple"
+
+
+def _timed(fn, runs: int) -> float:
+    """Среднее время вызова, с (первый вызов — прогрев)."""
+    fn()
+    t0 = time.perf_counter()
+    for _ in range(runs):
+        fn()
+    return (time.perf_counter() - t0) / runs
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--methods", nargs="+", default=list(METHODS))
+    ap.add_argument("--runs", type=int, default=10)
+    ap.add_argument("--throttled", type=int, default=2000, help="сколько отказов 429 мерить")
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    os.environ["DATABASE_URL"] = f"sqlite:///{tmp.name}"
+    os.environ.setdefault("STARTUP_FAST", "1")
+    sys.path.insert(0, ROOT)
+    try:
+        from werkzeug.security import check_password_hash
+        from app import app
+        from models import db, User
+
+        with app.app_context():
+            db.create_all()
+            db.session.add(User(email=EMAIL, name="bench", password_hash=""))
+            db.session.commit()
+        # лимиты созданы при регистрации blueprint — для замера снимаем их
+        limits = app.extensions["login_limits"]
+        limits["ip"].limit = limits["email"].limit = 10 ** 9
+
+        print(f"{'метод':24} {'hash, мс':>9} {'hash/с':>8} {'login, мс':>10} {'login/с':>8}")
+        for method in args.methods:
+            app.config["PASSWORD_HASH_METHOD"] = method
+            with app.app_context():
+                u = User.query.filter_by(email=EMAIL).one()
+                u.set_password(PASSWORD)
+                db.session.commit()
+                stored = u.password_hash
+
+            hash_s = _timed(lambda: check_password_hash(stored, PASSWORD), args.runs)
+            client = app.test_client()
+
+            def login():
+                r = client.post("/auth/login", data={"email": EMAIL, "password": PASSWORD})
+                assert r.status_code == 302, r.status_code
+
+            login_s = _timed(login, args.runs)
+            print(f"{method:24} {hash_s * 1000:9.1f} {1 / hash_s:8.1f} {login_s * 1000:10.1f} {1 / login_s:8.1f}")
+
+        # отказ по лимиту: email уже за порогом
+        limits["email"].limit = 1
+        limits["email"].add(EMAIL)
+        client = app.test_client()
+
+        def throttled():
+            r = client.post("/auth/login", data={"email": EMAIL, "password": "wrong"})
+            assert r.status_code == 429, r.status_code
+
+        rej_s = _timed(throttled, args.throttled)
+        print(f"\nотказ 429 (без хэширования): {rej_s * 1e6:.0f} мкс, {1 / rej_s:.0f}/с на ядро")
+    finally:
+        os.unlink(tmp.name)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+# bench/place_cards.py
+"""
+Бенчмарк карточек гостей: один N-up PDF против отдельного документа на гостя.
+
+    python -m bench.place_cards                            # 500 гостей, 2x5
+    python -m bench.place_cards --guests 1000 --layout 3x7 --out cards.pdf
+
+Отдельные документы меряются на выборке (--sample) и экстраполируются:
+у каждого свои копии шрифтов и фона.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from bench.seating_chart import ROOT, seed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--guests", type=int, default=500)
+    ap.add_argument("--layout", default="2x5")
+    ap.add_argument("--sample", type=int, default=20)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--out", help="сохранить PDF")
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    url = f"sqlite:///{tmp.name}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("STARTUP_FAST", "1")
+    sys.path.insert(0, ROOT)
+    try:
+        from sqlalchemy import create_engine
+        per_table = 10
+        n_guests = seed(create_engine(url), max(1, args.guests // per_table - 1), per_table, args.seed)
+
+        from app import app
+        from models import db, Wedding
+        from invitations import gen_place_cards_pdf, place_card_rows
+
+        with app.app_context():
+            wedding = db.session.get(Wedding, 1)
+            gen_place_cards_pdf(wedding, place_card_rows(1, "guests")[:1], args.layout)  # прогрев шрифтов
+
+            t0 = time.perf_counter()
+            cards = place_card_rows(1, "guests")
+            batch = gen_place_cards_pdf(wedding, cards, args.layout).getvalue()
+            batch_s = time.perf_counter() - t0
+
+            sample = cards[:args.sample]
+            t0 = time.perf_counter()
+            single_bytes = sum(len(gen_place_cards_pdf(wedding, [c], args.layout).getvalue()) for c in sample)
+            single_s = (time.perf_counter() - t0) / len(sample) * len(cards)
+            single_bytes = single_bytes / len(sample) * len(cards)
+    finally:
+        os.unlink(tmp.name)
+
+    if args.out:
+        with open(args.out, "wb") as f:
+            f.write(batch)
+    print(f"гостей: {n_guests}, карточек: {len(cards)} (без отказавшихся), раскладка {args.layout}")
+    print(f"один PDF:      {batch_s * 1000:7.0f} мс, {len(batch) / 1024:8.0f} КБ")
+    print(f"по документу:  {single_s * 1000:7.0f} мс, {single_bytes / 1024:8.0f} КБ (оценка по {len(sample)})")
+
+
+if __name__ == "__main__":
+    main()
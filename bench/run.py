@@ -0,0 +1,207 @@
+# bench/run.py
+"""
+End-to-end бенчмарк горячих путей: латентность, число SQL-запросов, пиковая память.
+
+    python -m bench.run                                    # временная SQLite + datagen
+    python -m bench.run --db sqlite:///bench.db --db postgresql+psycopg://localhost/wm_bench \
+        --generate --weddings 2000 --guests-mean 150 --out report.json
+    python -m bench.compare base.json report.json
+
+Каждая база прогоняется в отдельном процессе (DATABASE_URL читается при импорте app).
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# имя: (метод, путь-шаблон, итераций по умолчанию)
+SCENARIOS = {
+    "index":           ("GET",  "/", 20),
+    "svodnaya":        ("GET",  "/svodnaya/", 10),
+    "page_finance":    ("GET",  "/finance/{wedding_id}", 20),
+    "seating_page":    ("GET",  "/wedding/{wedding_id}/seating", 20),
+    "seating_auto":    ("POST", "/wedding/{wedding_id}/seating/auto", 10),
+    "seating_assign":  ("JSON", "/wedding/seating/assign", 50),
+    "invitation_pdf":  ("GET",  "/invitations/{wedding_id}/{guest_id}/pdf", 10),
+    "invitations_zip": ("GET",  "/invitations/{wedding_id}/all_pdfs.zip", 2),
+}
+
+
+def _git_commit() -> str | None:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except Exception:
+        return None
+
+
+def _pick_wedding(db, Wedding, Guest):
+    """Свадьба со средним (медианным) числом гостей."""
+    from sqlalchemy import func
+    rows = (db.session.query(Guest.wedding_id, func.count(Guest.id))
+            .group_by(Guest.wedding_id).order_by(func.count(Guest.id)).all())
+    return rows[len(rows) // 2][0] if rows else Wedding.query.first().id
+
+
+def run_single(args) -> dict:
+    """Прогон всех сценариев против одной базы (в этом процессе)."""
+    os.environ["DATABASE_URL"] = args.db[0]
+    sys.path.insert(0, ROOT)
+    dataset = None
+    if args.generate:
+        from sqlalchemy import create_engine
+        from bench.datagen import generate
+        dataset = generate(create_engine(args.db[0]), args.weddings, args.guests_mean, args.seed)
+
+    import logging
+    logging.disable(logging.WARNING)
+    import warnings
+    warnings.filterwarnings("ignore")
+
+    from sqlalchemy import event
+    from app import app
+    from models import db, Wedding, Guest, Table
+
+    counter = {"n": 0}
+    with app.app_context():
+        event.listen(db.engine, "before_cursor_execute", lambda *a, **k: counter.__setitem__("n", counter["n"] + 1))
+        wedding_id = args.wedding or (dataset or {}).get("showcase_wedding_id") or _pick_wedding(db, Wedding, Guest)
+        wedding = db.session.get(Wedding, wedding_id)
+        owner_email = wedding.user.email if wedding.user else None
+        guest_ids = [g for (g,) in db.session.query(Guest.id).filter_by(wedding_id=wedding_id).order_by(Guest.id)]
+        table_ids = [t for (t,) in db.session.query(Table.id).filter_by(wedding_id=wedding_id)]
+        guests_n = len(guest_ids)
+        dialect = db.engine.dialect.name
+        db.session.remove()
+
+    client = app.test_client()
+    resp = client.post("/auth/login", data={"email": args.email or owner_email, "password": args.password})
+    if resp.status_code != 302:
+        raise SystemExit(f"login failed: HTTP {resp.status_code}")
+
+    assign_state = {"i": 0}
+
+    def call(name):
+        method, path, _ = SCENARIOS[name]
+        url = path.format(wedding_id=wedding_id, guest_id=guest_ids[0] if guest_ids else 0)
+        if method == "GET":
+            return client.get(url)
+        if method == "POST":
+            return client.post(url)
+        # seating_assign: гоняем гостей по столам по кругу
+        i = assign_state["i"] = assign_state["i"] + 1
+        return client.post(url, json={
+            "guest_id": guest_ids[i % len(guest_ids)],
+            "table_id": table_ids[i % len(table_ids)] if table_ids else None,
+        })
+
+    selected = args.scenario or list(SCENARIOS)
+    results = {}
+    for name in selected:
+        iterations = args.iterations or SCENARIOS[name][2]
+        call(name)  # прогрев
+        latencies, queries, errors = [], [], 0
+        for _ in range(iterations):
+            counter["n"] = 0
+            t0 = time.perf_counter()
+            r = call(name)
+            latencies.append(time.perf_counter() - t0)
+            queries.append(counter["n"])
+            errors += r.status_code >= 400
+        tracemalloc.start()
+        call(name)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        latencies.sort()
+        results[name] = {
+            "iterations": iterations,
+            "errors": errors,
+            "mean_ms": round(statistics.mean(latencies) * 1000, 3),
+            "p50_ms": round(latencies[len(latencies) // 2] * 1000, 3),
+            "p95_ms": round(latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))] * 1000, 3),
+            "min_ms": round(latencies[0] * 1000, 3),
+            "queries": round(statistics.mean(queries), 1),
+            "peak_mem_kb": round(peak / 1024, 1),
+        }
+        r = results[name]
+        print(f"  {name:<16} p50 {r['p50_ms']:>9.2f} ms  p95 {r['p95_ms']:>9.2f} ms  "
+              f"queries {r['queries']:>6}  peak {r['peak_mem_kb']:>9.1f} KB  errors {r['errors']}",
+              file=sys.stderr)
+
+    return {
+        "dialect": dialect,
+        "wedding_id": wedding_id,
+        "wedding_guests": guests_n,
+        "dataset": dataset,
+        "scenarios": results,
+    }
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--db", action="append", help="URL базы; можно несколько (SQLite и Postgres)")
+    ap.add_argument("--generate", action="store_true", help="заполнить базу через bench.datagen")
+    ap.add_argument("--weddings", type=int, default=500)
+    ap.add_argument("--guests-mean", type=int, default=150)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--wedding", type=int, help="id свадьбы для сценариев (по умолчанию — медианная)")
+    ap.add_argument("--email", help="логин (по умолчанию владелец свадьбы)")
+    ap.add_argument("--password", default="bench")
+    ap.add_argument("--scenario", action="append", choices=list(SCENARIOS))
+    ap.add_argument("--iterations", type=int)
+    ap.add_argument("--single", action="store_true", help=argparse.SUPPRESS)
+    ap.add_argument("--out", help="куда сохранить JSON-отчёт")
+    args = ap.parse_args()
+
+    if not args.db:
+        args.db = [f"sqlite:///{os.path.join(tempfile.mkdtemp(prefix='wm-bench-'), 'bench.db')}"]
+        args.generate = True
+
+    if args.single:
+        print(json.dumps(run_single(args), ensure_ascii=False, default=str))
+        return
+
+    runs = {}
+    for url in args.db:
+        print(f"[bench] {url.split('@')[-1]}", file=sys.stderr)
+        cmd = [sys.executable, "-m", "bench.run", "--single", "--db", url, "--password", args.password,
+               "--weddings", str(args.weddings), "--guests-mean", str(args.guests_mean), "--seed", str(args.seed)]
+        for flag, value in (("--wedding", args.wedding), ("--email", args.email), ("--iterations", args.iterations)):
+            if value:
+                cmd += [flag, str(value)]
+        for s in args.scenario or []:
+            cmd += ["--scenario", s]
+        if args.generate:
+            cmd.append("--generate")
+        out = subprocess.run(cmd, cwd=ROOT, stdout=subprocess.PIPE, text=True, check=True).stdout
+        result = json.loads(out.strip().splitlines()[-1])
+        runs[result["dialect"]] = result
+
+    report = {
+        "meta": {
+            "commit": _git_commit(),
+            "created_at": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+        },
+        "runs": runs,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"[bench] отчёт: {args.out}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+# bench/seating_chart.py
+"""
+Бенчмарк PDF-схемы рассадки: свадьба на N столов, холодный и тёплый прогон.
+
+    python -m bench.seating_chart                          # 100 столов, временная SQLite
+    python -m bench.seating_chart --tables 150 --per-table 9 --repeat 10 --out chart.pdf
+
+Холодный прогон включает импорт fpdf и разбор шрифтов; тёплый — медиана
+следующих. Код возврата 1, если тёплая медиана дольше --budget секунд.
+"""
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+FAMILIES = ["Ильины", "Ташевы", "Каримовы", "Юсуповы", "Рахимовы", "Петровы", "Алиевы", "Садыковы"]
+NAMES = ["Азиз", "Анна", "Бахтиёр", "Дилноза", "Елена", "Жасур", "Мария", "Шахзод"]
+
+
+def seed(engine, tables: int, per_table: int, seed: int) -> int:
+    from sqlalchemy import insert
+    from models import db, User, Wedding, Table, Guest
+
+    rnd = random.Random(seed)
+    db.metadata.create_all(engine)
+    with engine.begin() as conn:
+        conn.execute(insert(User), [{"id": 1, "email": "bench@local", "name": "Bench", "password_hash": "-"}])
+        conn.execute(insert(Wedding), [{"id": 1, "name": "Свадьба Азиза и Дилнозы", "version": 1, "user_id": 1}])
+        conn.execute(insert(Table), [{"id": t, "wedding_id": 1, "name": f"Стол {t}", "seats": 12, "order": t}
+                                     for t in range(1, tables + 1)])
+        guests, gid = [], 0
+        for t in range(1, tables + 2):  # последний «стол» — гости без стола
+            for _ in range(per_table):
+                gid += 1
+                family = rnd.random() < 0.4
+                guests.append({
+                    "id": gid, "wedding_id": 1, "table_id": t if t <= tables else None,
+                    "name": None if family else rnd.choice(NAMES),
+                    "family_name": rnd.choice(FAMILIES) if family else None,
+                    "family_count": rnd.choice([2, 3, 4]) if family else None,
+                    "status": rnd.choice(["invited", "confirmed", "confirmed", "declined"]),
+                })
+        conn.execute(insert(Guest), guests)
+    return gid
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--tables", type=int, default=100)
+    ap.add_argument("--per-table", type=int, default=8)
+    ap.add_argument("--repeat", type=int, default=5)
+    ap.add_argument("--seed", type=int, default=42)
+    ap.add_argument("--budget", type=float, default=1.0, help="лимит тёплой медианы, с")
+    ap.add_argument("--out", help="сохранить PDF")
+    args = ap.parse_args()
+
+    tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+    tmp.close()
+    url = f"sqlite:///{tmp.name}"
+    os.environ["DATABASE_URL"] = url
+    os.environ.setdefault("STARTUP_FAST", "1")
+    sys.path.insert(0, ROOT)
+    try:
+        from sqlalchemy import create_engine
+        n_guests = seed(create_engine(url), args.tables, args.per_table, args.seed)
+
+        from app import app
+        from models import db, Wedding
+
+        with app.app_context():
+            wedding = db.session.get(Wedding, 1)
+            t0 = time.perf_counter()
+            from seating_chart import gen_seating_chart_pdf
+            pdf = gen_seating_chart_pdf(wedding).getvalue()
+            cold = time.perf_counter() - t0
+
+            warm = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                pdf = gen_seating_chart_pdf(wedding).getvalue()
+                warm.append(time.perf_counter() - t0)
+    finally:
+        os.unlink(tmp.name)
+
+    if args.out:
+        with open(args.out, "wb") as f:
+            f.write(pdf)
+    median = statistics.median(warm)
+    print(f"столов: {args.tables}, гостей: {n_guests}, PDF: {len(pdf) / 1024:.0f} КБ, "
+          f"страниц: {pdf.count(b'/Type /Page') - pdf.count(b'/Type /Pages')}")
+    print(f"холодный: {cold * 1000:.0f} мс, тёплый: медиана {median * 1000:.0f} мс, "
+          f"max {max(warm) * 1000:.0f} мс (x{args.repeat})")
+    if median > args.budget:
+        print(f"FAIL: дольше {args.budget:.2f} с")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
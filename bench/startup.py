@@ -0,0 +1,109 @@
+# bench/startup.py
+"""
+Время старта воркера: импорт `app` + латентность первого запроса.
+
+Каждый замер — отдельный чистый процесс python. Сравниваются режимы:
+    cold     — как раньше (Flask-Migrate импортируется, шаблоны компилируются на лету)
+    fast     — STARTUP_FAST=1 (без alembic), шаблоны компилируются на лету
+    fast+bc  — STARTUP_FAST=1 + кэш байткода после `flask precompile`
+
+    python -m bench.startup --runs 5
+    DATABASE_URL=postgresql+psycopg://... python -m bench.startup
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# код дочернего процесса: печатает JSON с замерами
+CHILD = r"""
+import json, sys, time
+t0 = time.perf_counter()
+import app as app_module
+import_s = time.perf_counter() - t0
+heavy = sorted(m for m in ("fpdf", "qrcode", "PIL", "alembic") if m in sys.modules)
+
+app = app_module.app
+client = app.test_client()
+client.post("/auth/login", data={"email": sys.argv[1], "password": sys.argv[2]})
+first = {}
+for path in sys.argv[3:]:
+    t1 = time.perf_counter()
+    status = client.get(path).status_code
+    first[path] = {"status": status, "ms": round((time.perf_counter() - t1) * 1000, 2)}
+print(json.dumps({"import_ms": round(import_s * 1000, 2), "heavy_modules": heavy, "first_request": first}))
+"""
+
+SEED = r"""
+import app as app_module
+from models import db, Wedding
+with app_module.app.app_context():
+    app_module.ensure_db_and_seed_admin()
+    if not Wedding.query.first():
+        db.session.add(Wedding(name="Startup bench"))
+        db.session.commit()
+    print(Wedding.query.first().id)
+"""
+
+
+def _run(code, env, *args):
+    out = subprocess.run(
+        [sys.executable, "-c", code, *args], cwd=ROOT, env=env,
+        capture_output=True, text=True, check=True,
+    )
+    return out.stdout.strip().splitlines()[-1]
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--runs", type=int, default=5)
+    ap.add_argument("--email", default=os.getenv("ADMIN_EMAIL", "admin@weddings.local"))
+    ap.add_argument("--password", default=os.getenv("ADMIN_PASSWORD", "admin123"))
+    ap.add_argument("--out", help="куда сохранить JSON-отчёт")
+    args = ap.parse_args()
+
+    tmp = tempfile.mkdtemp(prefix="wm-startup-")
+    base_env = dict(os.environ)
+    base_env.setdefault("DATABASE_URL", f"sqlite:///{os.path.join(tmp, 'bench.db')}")
+    wedding_id = _run(SEED, base_env)
+    paths = ["/", f"/wedding/{wedding_id}", f"/wedding/{wedding_id}/guests", f"/wedding/{wedding_id}/expenses"]
+
+    bc_empty = os.path.join(tmp, "bc-empty-missing")      # каталога нет -> кэш выключен
+    bc_dir = os.path.join(tmp, "bc")
+    subprocess.run([sys.executable, "-m", "flask", "--app", "app", "precompile"], cwd=ROOT,
+                   env={**base_env, "JINJA_BYTECODE_CACHE_DIR": bc_dir}, check=True, capture_output=True)
+
+    modes = {
+        "cold": {"JINJA_BYTECODE_CACHE_DIR": bc_empty},
+        "fast": {"JINJA_BYTECODE_CACHE_DIR": bc_empty, "STARTUP_FAST": "1"},
+        "fast+bc": {"JINJA_BYTECODE_CACHE_DIR": bc_dir, "STARTUP_FAST": "1"},
+    }
+    report = {}
+    for mode, extra in modes.items():
+        env = {**base_env, **extra}
+        runs = [json.loads(_run(CHILD, env, args.email, args.password, *paths)) for _ in range(args.runs)]
+        report[mode] = {
+            "import_ms_median": statistics.median(r["import_ms"] for r in runs),
+            "first_request_ms_median": {
+                p: statistics.median(r["first_request"][p]["ms"] for r in runs) for p in paths
+            },
+            "heavy_modules_after_import": runs[-1]["heavy_modules"],
+        }
+        total_first = sum(report[mode]["first_request_ms_median"].values())
+        print(f"{mode:<8} import {report[mode]['import_ms_median']:>8.1f} ms   "
+              f"first requests {total_first:>8.1f} ms   heavy: {', '.join(report[mode]['heavy_modules_after_import']) or '-'}")
+
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,157 @@
+# db_routing.py
+"""
+Чтение с реплики для read-only страниц.
+
+Реплика подключается bind'ом "replica" (DATABASE_REPLICA_URL ->
+SQLALCHEMY_BINDS). View, помеченный @replica_read, на GET читает с реплики:
+RoutingSession отдаёт ей обычные SELECT, а flush, INSERT/UPDATE/DELETE,
+SELECT … FOR UPDATE и text() идут на основную базу. Всё остальное — только
+основная база.
+
+Read-your-writes: после POST (и любого не-GET) сессия пользователя
+REPLICA_STICKY_SECONDS читает с основной базы — свою правку видно сразу.
+
+Отставание: раз в REPLICA_CHECK_SECONDS процесс читает строку
+replica_heartbeat на основной базе и на реплике и обновляет её на основной;
+реплика без прошлой отметки отстаёт на (сейчас - её отметка).
+Отстала больше REPLICA_MAX_LAG_SECONDS или недоступна — читаем с основной.
+Проверяется и на двух SQLite-файлах: скопируйте базу как реплику — пока
+копию не обновляют, отставание растёт и чтения уходят на основную.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from datetime import datetime
+
+from flask import current_app, g, has_app_context, request, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import Select, DateTime, Integer, table, column, select, insert, update
+
+import metrics
+
+REPLICA = "replica"
+_STICKY_KEY = "rw_until"
+
+# models.ReplicaHeartbeat без импорта models (модуль нужен ему для db)
+_heartbeat = table("replica_heartbeat", column("id", Integer), column("at", DateTime))
+
+
+# ----------------------------
+# Сессия
+# ----------------------------
+class RoutingSession(Session):
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if (bind is None and not self._flushing and isinstance(clause, Select)
+                and clause._for_update_arg is None and has_app_context() and g.get("db_replica")):
+            engine = self._db.engines.get(REPLICA)
+            if engine is not None:
+                return engine
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def replica_read(view):
+    """Пометить view: на GET можно читать с реплики."""
+    view.replica_read = True
+    return view
+
+
+def use_primary() -> None:
+    """До конца запроса (и на sticky-окно) читать с основной базы."""
+    g.db_replica = False
+    _stick()
+
+
+def _stick():
+    if REPLICA in current_app.extensions["sqlalchemy"].engines:
+        session[_STICKY_KEY] = time.time() + current_app.config["REPLICA_STICKY_SECONDS"]
+
+
+# ----------------------------
+# Отставание реплики
+# ----------------------------
+class LagMonitor:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._checked = 0.0
+        self._ok = False
+        self.lag: float | None = None
+
+    def ok(self, app) -> bool:
+        if time.monotonic() - self._checked < app.config["REPLICA_CHECK_SECONDS"]:
+            return self._ok
+        # проверяет один поток, остальные берут прошлый результат
+        if not self._lock.acquire(blocking=False):
+            return self._ok
+        try:
+            self.lag = self.measure(app)
+            self._ok = self.lag is not None and self.lag <= app.config["REPLICA_MAX_LAG_SECONDS"]
+        finally:
+            self._checked = time.monotonic()
+            self._lock.release()
+        return self._ok
+
+    @staticmethod
+    def measure(app) -> float | None:
+        """Отставание в секундах или None (реплика недоступна)."""
+        engines = app.extensions["sqlalchemy"].engines
+        read = select(_heartbeat.c.at).where(_heartbeat.c.id == 1)
+        try:
+            # отметку на основной пишем, даже если реплика лежит
+            with engines[None].begin() as conn:
+                primary_at = conn.execute(read).scalar()
+                now = datetime.utcnow()
+                if primary_at is None:
+                    conn.execute(insert(_heartbeat).values(id=1, at=now))
+                else:
+                    conn.execute(update(_heartbeat).where(_heartbeat.c.id == 1).values(at=now))
+            with engines[REPLICA].connect() as conn:
+                replica_at = conn.execute(read).scalar()
+        except Exception:
+            app.logger.warning("replica lag check failed", exc_info=True)
+            metrics.incr("db.replica.down")
+            return None
+        if primary_at is None:
+            return 0.0
+        if replica_at is None:
+            return None
+        # реплика видела прошлую отметку — догнала; иначе отстаёт минимум с replica_at
+        if replica_at >= primary_at:
+            return 0.0
+        return (now - replica_at).total_seconds()
+
+
+monitor = LagMonitor()
+
+
+# ----------------------------
+# Маршрутизация запроса
+# ----------------------------
+def route_request():
+    g.db_replica = False
+    if request.method not in ("GET", "HEAD"):
+        return
+    view = current_app.view_functions.get(request.endpoint)
+    if not getattr(view, "replica_read", False):
+        return
+    if REPLICA not in current_app.extensions["sqlalchemy"].engines:
+        return
+    if session.get(_STICKY_KEY, 0) > time.time():
+        metrics.incr("db.route.primary_sticky")
+        return
+    if not monitor.ok(current_app._get_current_object()):
+        metrics.incr("db.route.primary_lag")
+        return
+    g.db_replica = True
+    metrics.incr("db.route.replica")
+
+
+def stick_after_write(response):
+    if request.method not in ("GET", "HEAD", "OPTIONS") and response.status_code < 400:
+        _stick()
+    return response
+
+
+def init_routing(app):
+    app.before_request(route_request)
+    app.after_request(stick_after_write)
@@ -0,0 +1,174 @@
+# declension.py
+"""
+Склонение фамилий и приветствия в приглашениях (RU / UZ-кириллица).
+
+RU: «Дорогая семья Ильиных!» — фамилия в родительном падеже мн. числа.
+Семью вводят как угодно: «Ильины», «Ильин», «Ильина», «Вишневские»,
+«Петровы-Водкины» — правила ниже сводят всё к одной форме. UZ: «Қадрли
+Ташевлар оиласи!» — основа фамилии + «лар».
+
+Правила — таблицы (суффикс -> замена), самый длинный суффикс первым;
+что правилами не ловится (корейские «Цой», «Ким», иностранные «-ин»),
+лежит в исключениях. Результат по нормализованной части фамилии
+мемоизирован: на свадьбе десятки одинаковых фамилий, на экспорте — сотни.
+
+Готовые приветствия хранятся на Guest (greeting_ru / greeting_uz) и
+пересчитываются только при смене имени или фамилии (listener в models.py).
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+# ----------------------------
+# Таблицы правил
+# ----------------------------
+# RU, родительный мн.: «Ильины» -> «Ильиных», «Вишневская» -> «Вишневских»
+RU_GEN_PL = (
+    # множественное число, как обычно вводят семью
+    ("овы", "овых"), ("евы", "евых"), ("ёвы", "ёвых"), ("ины", "иных"), ("ыны", "ыных"),
+    ("ые", "ых"), ("ие", "их"),
+    # единственное, мужская и женская форма
+    ("ов", "овых"), ("ев", "евых"), ("ёв", "ёвых"), ("ин", "иных"), ("ын", "ыных"),
+    ("ова", "овых"), ("ева", "евых"), ("ёва", "ёвых"), ("ина", "иных"), ("ына", "ыных"),
+    # прилагательные: «Вишневский», «Тверской», «Толстая», «Горький»
+    ("ский", "ских"), ("цкий", "цких"), ("ской", "ских"), ("цкой", "цких"),
+    ("ская", "ских"), ("цкая", "цких"),
+    ("кая", "ких"), ("гая", "гих"), ("хая", "хих"),
+    ("ий", "их"), ("ый", "ых"), ("ой", "ых"), ("ая", "ых"), ("яя", "их"),
+)
+
+# UZ: основа для «…лар» — русские окончания снимаем
+UZ_STEM = (
+    ("ские", "ский"), ("цкие", "цкий"), ("ская", "ский"), ("цкая", "цкий"),
+    ("овы", "ов"), ("евы", "ев"), ("ёвы", "ёв"), ("ины", "ин"), ("ыны", "ын"),
+    ("ова", "ов"), ("ева", "ев"), ("ёва", "ёв"), ("ина", "ин"), ("ына", "ын"),
+    ("ая", "ой"), ("яя", "ий"),
+    ("ые", ""), ("ие", ""), ("ы", ""), ("и", ""),
+)
+
+# короче — не суффикс, а сама фамилия («Цой», «Шин», «Ли»)
+MIN_STEM = 2
+
+# нормализованная часть фамилии -> форма (без учёта регистра)
+RU_EXCEPTIONS = {
+    # иностранные на -ин/-ов: не склоняются во мн. как русские
+    "дарвин": "дарвин", "чаплин": "чаплин", "франклин": "франклин",
+    "кронин": "кронин", "ханин": "ханин",
+    # корейские и прочие короткие
+    "цой": "цой", "ким": "ким", "пак": "пак", "ли": "ли", "тен": "тен", "хан": "хан", "шин": "шин",
+}
+UZ_EXCEPTIONS = {
+    "цой": "цой", "ким": "ким", "пак": "пак", "ли": "ли", "тен": "тен", "хан": "хан",
+}
+
+# мужские имена на -а/-я и женские на согласную (RU и UZ)
+MALE_NAMES = frozenset((
+    "никита", "илья", "фома", "лука", "кузьма", "савва", "данила", "гаврила",
+    "миша", "дима", "ваня", "петя", "коля", "толя", "гоша", "гриша", "лёша", "леша",
+    "паша", "слава", "вова", "лёва", "лева", "сёма", "сема", "боря", "юра", "вася",
+    "федя", "стёпа", "степа", "тоха", "мустафа", "муса", "иса", "яхья", "хамза", "зиё",
+))
+FEMALE_NAMES = frozenset(("любовь", "нинель", "юдифь", "руфь", "асель", "айгерим", "гульнур", "дильнур"))
+# узбекские женские окончания
+FEMALE_ENDINGS = ("гул", "ноз", "бону", "бану", "ниса", "нисо", "ой")
+
+
+# ----------------------------
+# Склонение
+# ----------------------------
+def _edit(word: str, form: str) -> tuple[int, str]:
+    """(сколько букв отрезать, что дописать) — так сохраняется регистр ввода."""
+    n = 0
+    while n < min(len(word), len(form)) and word[n] == form[n]:
+        n += 1
+    return len(word) - n, form[n:]
+
+
+def _by_rules(word: str, rules, exceptions) -> tuple[int, str]:
+    if word in exceptions:
+        return _edit(word, exceptions[word])
+    for suffix, repl in rules:
+        if word.endswith(suffix) and len(word) - len(suffix) >= MIN_STEM:
+            return len(suffix), repl
+    return 0, ""
+
+
+@lru_cache(maxsize=4096)
+def _ru_part(word: str) -> tuple[int, str]:
+    return _by_rules(word, RU_GEN_PL, RU_EXCEPTIONS)
+
+
+@lru_cache(maxsize=4096)
+def _uz_part(word: str) -> tuple[int, str]:
+    if word.endswith("лар"):
+        return 0, ""
+    cut, add = _by_rules(word, UZ_STEM, UZ_EXCEPTIONS)
+    return cut, add + "лар"
+
+
+def _apply(fam: str, part) -> str:
+    out = []
+    for p in (fam or "").split("-"):
+        w = p.strip()
+        if not w:
+            continue
+        cut, add = part(w.lower())
+        if w.isupper() and len(w) > 1:
+            add = add.upper()
+        out.append(w[:len(w) - cut] + add)
+    return "-".join(out)
+
+
+def ru_family_genitive(fam: str) -> str:
+    """«Ильины» -> «Ильиных», «Петровы-Водкины» -> «Петровых-Водкиных»."""
+    return _apply(fam, _ru_part)
+
+
+def uz_family_plural(fam: str) -> str:
+    """«Ташевы» -> «Ташевлар»."""
+    return _apply(fam, _uz_part)
+
+
+@lru_cache(maxsize=4096)
+def _gender(first: str) -> str:
+    if first in MALE_NAMES:
+        return "m"
+    if first in FEMALE_NAMES or first.endswith(FEMALE_ENDINGS):
+        return "f"
+    return "f" if first.endswith(("а", "я")) else "m"
+
+
+def guess_gender(name: str) -> str:
+    """'m' | 'f' | 'n' (пусто) по первому слову имени."""
+    words = (name or "").split()
+    return _gender(words[0].lower()) if words else "n"
+
+
+# ----------------------------
+# Приветствия
+# ----------------------------
+def _is_couple(name: str) -> bool:
+    return " и " in name or "," in name
+
+
+def ru_greeting(name: str | None, family_name: str | None) -> str:
+    if family_name and family_name.strip():
+        return f"Дорогая семья {ru_family_genitive(family_name)}!"
+    name = (name or "").strip()
+    if not name:
+        return "Дорогие гости!"
+    if _is_couple(name):
+        return f"Дорогие {name}!"
+    return f"Дорогая {name}!" if guess_gender(name) == "f" else f"Дорогой {name}!"
+
+
+def uz_greeting(name: str | None, family_name: str | None) -> str:
+    if family_name and family_name.strip():
+        return f"Қадрли {uz_family_plural(family_name)} оиласи!"
+    name = (name or "").strip()
+    return f"Қадрли {name}!" if name else "Қадрли меҳмонлар!"
+
+
+def greetings(name: str | None, family_name: str | None) -> tuple[str, str]:
+    """(RU, UZ) — то, что хранится на Guest."""
+    return ru_greeting(name, family_name), uz_greeting(name, family_name)
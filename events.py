@@ -0,0 +1,223 @@
+# events.py
+"""
+Живые обновления рассадки и RSVP через Server-Sent Events.
+
+Каждая открытая вкладка рассадки держит GET /wedding/<id>/events и получает
+компактные дельты вместо перезагрузки страницы:
+    assign — гость пересел: {guest_id, table_id, tables: [{table_id, persons, seats}]}
+    rsvp   — гость ответил: {guest_id, status, family_count}
+    reset  — массовое изменение (авторассадка, очистка): клиент перечитывает страницу
+
+События копятся в session.info и уходят подписчикам только после commit
+(откат ничего не публикует). Внутри процесса — очередь на подписчика.
+При нескольких воркерах задайте EVENTS_PG_DSN (прямое подключение, не через
+pgbouncer — LISTEN через пулер транзакций не работает): тогда событие идёт
+через pg_notify в той же транзакции, а поток LISTEN в каждом воркере
+раздаёт его своим подписчикам.
+
+Поток SSE занимает поток воркера на всё время подключения — gunicorn
+запускать с --worker-class gthread --threads N; лимит на процесс —
+EVENTS_MAX_CLIENTS.
+"""
+from __future__ import annotations
+
+import json
+import queue
+import threading
+
+from flask import Blueprint, Response, current_app, abort
+from flask_login import current_user, login_required
+from sqlalchemy import event, text
+
+from models import db, Wedding
+import metrics
+
+events_bp = Blueprint("events_bp", __name__, url_prefix="/wedding")
+
+CHANNEL = "wedding_events"
+HEARTBEAT_SECONDS = 15
+_QUEUE_SIZE = 256
+_PENDING = "pending_events"
+
+
+# ----------------------------
+# Pub/sub внутри процесса
+# ----------------------------
+class Hub:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subs: dict[int, set[queue.Queue]] = {}
+
+    def subscribe(self, wedding_id: int) -> queue.Queue:
+        q = queue.Queue(maxsize=_QUEUE_SIZE)
+        with self._lock:
+            self._subs.setdefault(wedding_id, set()).add(q)
+        return q
+
+    def unsubscribe(self, wedding_id: int, q: queue.Queue) -> None:
+        with self._lock:
+            subs = self._subs.get(wedding_id)
+            if subs is not None:
+                subs.discard(q)
+                if not subs:
+                    del self._subs[wedding_id]
+
+    def weddings(self) -> list[int]:
+        with self._lock:
+            return list(self._subs)
+
+    def clients(self) -> int:
+        with self._lock:
+            return sum(len(s) for s in self._subs.values())
+
+    def dispatch(self, wedding_id: int, kind: str, data: dict) -> None:
+        with self._lock:
+            subs = list(self._subs.get(wedding_id, ()))
+        for q in subs:
+            try:
+                q.put_nowait((kind, data))
+            except queue.Full:
+                # клиент не успевает читать — пусть перечитает страницу целиком
+                _drain(q)
+                q.put_nowait(("reset", {}))
+                metrics.incr("events.overflow")
+        metrics.incr("events.dispatched", len(subs))
+
+
+def _drain(q: queue.Queue) -> None:
+    try:
+        while True:
+            q.get_nowait()
+    except queue.Empty:
+        pass
+
+
+hub = Hub()
+
+
+# ----------------------------
+# Публикация (после commit)
+# ----------------------------
+def publish(wedding_id: int, kind: str, data: dict | None = None) -> None:
+    """Поставить событие в текущую транзакцию db.session."""
+    data = data or {}
+    if _bridge_dsn():
+        # NOTIFY транзакционный: дойдёт до слушателей только после COMMIT
+        payload = json.dumps({"w": wedding_id, "k": kind, "d": data}, separators=(",", ":"))
+        db.session.execute(text("SELECT pg_notify(:ch, :payload)"), {"ch": CHANNEL, "payload": payload})
+    else:
+        db.session.info.setdefault(_PENDING, []).append((wedding_id, kind, data))
+    metrics.incr(f"events.published.{kind}")
+
+
+@event.listens_for(db.session, "after_commit")
+def _events_after_commit(session):
+    for wedding_id, kind, data in session.info.pop(_PENDING, None) or ():
+        hub.dispatch(wedding_id, kind, data)
+
+
+@event.listens_for(db.session, "after_rollback")
+def _events_after_rollback(session):
+    session.info.pop(_PENDING, None)
+
+
+# ----------------------------
+# Мост Postgres LISTEN/NOTIFY
+# ----------------------------
+def _bridge_dsn() -> str | None:
+    dsn = current_app.config.get("EVENTS_PG_DSN")
+    if not dsn or not dsn.startswith("postgresql"):
+        return None
+    return dsn
+
+
+class PgBridge:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def ensure_started(self, app) -> None:
+        dsn = _bridge_dsn()
+        if dsn is None:
+            return
+        with self._lock:
+            if self._thread is None:
+                # поток создаётся в самом воркере (после fork)
+                self._thread = threading.Thread(target=self._run, args=(app, dsn),
+                                                name="events-listen", daemon=True)
+                self._thread.start()
+
+    @staticmethod
+    def _run(app, dsn):
+        import time
+        import psycopg
+
+        # psycopg понимает libpq-DSN, без драйверного суффикса SQLAlchemy
+        dsn = dsn.replace("postgresql+psycopg://", "postgresql://", 1)
+        while True:
+            try:
+                with psycopg.connect(dsn, autocommit=True) as conn:
+                    conn.execute(f"LISTEN {CHANNEL}")
+                    # за время переподключения события могли потеряться
+                    for wid in hub.weddings():
+                        hub.dispatch(wid, "reset", {})
+                    for note in conn.notifies():
+                        try:
+                            msg = json.loads(note.payload)
+                            hub.dispatch(int(msg["w"]), msg["k"], msg.get("d") or {})
+                        except (ValueError, KeyError, TypeError):
+                            metrics.incr("events.bad_payload")
+            except Exception:
+                app.logger.exception("events LISTEN connection lost")
+                metrics.incr("events.reconnects")
+                time.sleep(2)
+
+
+bridge = PgBridge()
+
+
+# ----------------------------
+# SSE endpoint
+# ----------------------------
+def _sse(kind: str, data: dict) -> str:
+    return f"event: {kind}\ndata: {json.dumps(data, separators=(',', ':'))}\n\n"
+
+
+@events_bp.route("/<int:wedding_id>/events")
+@login_required
+def wedding_events(wedding_id):
+    # в потоке — имена гостей и ответы: только владельцу и админу
+    wedding = db.session.get(Wedding, wedding_id)
+    if wedding is None:
+        abort(404)
+    if not current_user.is_admin and wedding.user_id != current_user.id:
+        abort(403)
+    # соединение с базой не держим на всё время потока
+    db.session.remove()
+
+    if hub.clients() >= current_app.config["EVENTS_MAX_CLIENTS"]:
+        # на не-200 EventSource закрывается; страница переподключится по таймеру
+        return Response("retry: 10000\n\n", status=503, mimetype="text/event-stream")
+
+    bridge.ensure_started(current_app._get_current_object())
+    q = hub.subscribe(wedding_id)
+    metrics.incr("events.connects")
+
+    def stream():
+        try:
+            yield "retry: 3000\n\n"
+            while True:
+                try:
+                    kind, data = q.get(timeout=HEARTBEAT_SECONDS)
+                except queue.Empty:
+                    # комментарий-пинг: держит прокси и выявляет закрытые вкладки
+                    yield ": ping\n\n"
+                    continue
+                yield _sse(kind, data)
+        finally:
+            hub.unsubscribe(wedding_id, q)
+
+    return Response(stream(), mimetype="text/event-stream", headers={
+        "Cache-Control": "no-cache",
+        "X-Accel-Buffering": "no",  # nginx: не буферизовать поток
+    })
@@ -1,23 +1,22 @@
 # finance.py
 
 from flask import Blueprint, render_template, request, redirect, url_for, flash
-from models import db, Wedding, Expense, SponsorGift, Guest
-from collections import defaultdict
+from models import db, Wedding, Expense, SponsorGift, Guest, BudgetCap, recalc_budget, touch_wedding
+import finance_calc
+from http_cache import etag_by_wedding
 
 finance_bp = Blueprint('finance_bp', __name__, url_prefix='/finance')
 
 @finance_bp.route('/<int:wedding_id>')
+@etag_by_wedding
 def page_finance(wedding_id):
     wedding = Wedding.query.get_or_404(wedding_id)
-    total_expenses = sum((e.total or 0) for e in wedding.expenses)
+    figures = finance_calc.wedding_figures([wedding_id])[wedding_id]
 
     # Расходы по категориям (для pie chart)
-    cat_totals = defaultdict(float)
-    for e in wedding.expenses:
-        if e.category:
-            cat_totals[e.category] += e.total or 0
-    expense_categories = list(cat_totals.keys())
-    expense_amounts = list(cat_totals.values())
+    by_category = {c: f for c, f in finance_calc.category_figures(wedding_id).items() if c}
+    expense_categories = list(by_category.keys())
+    expense_amounts = [f["spent"] for f in by_category.values()]
 
     # Все гости для селекта
     guests = wedding.guests
@@ -28,11 +27,14 @@ def page_finance(wedding_id):
     return render_template(
         'finance.html',
         wedding=wedding,
-        total_expenses=total_expenses,
+        figures=figures,
+        total_expenses=figures["spent"],
         expense_categories=expense_categories,
         expense_amounts=expense_amounts,
         guests=guests,
         sponsors=sponsors,
+        caps=sorted(wedding.budget_caps, key=lambda c: c.category),
+        alerts=[a for a in wedding.budget_alerts if a.resolved_at is None],
     )
 
 @finance_bp.route('/<int:wedding_id>/budget', methods=['POST'])
@@ -62,3 +64,30 @@ def delete_sponsor(wedding_id, sponsor_id):
     db.session.delete(sponsor)
     db.session.commit()
     return redirect(url_for('finance_bp.page_finance', wedding_id=wedding_id))
+
+@finance_bp.route('/<int:wedding_id>/caps', methods=['POST'])
+def set_cap(wedding_id):
+    """Лимит на категорию; пустая сумма — снять лимит."""
+    Wedding.query.get_or_404(wedding_id)
+    category = (request.form.get('category') or '').strip()
+    try:
+        cap = float(request.form.get('cap') or 0)
+    except ValueError:
+        cap = 0
+    if not category:
+        return redirect(url_for('finance_bp.page_finance', wedding_id=wedding_id))
+
+    row = BudgetCap.query.filter_by(wedding_id=wedding_id, category=category).first()
+    if cap > 0:
+        if row is None:
+            row = BudgetCap(wedding_id=wedding_id, category=category, cap=cap)
+            db.session.add(row)
+        row.cap = cap
+    elif row is not None:
+        db.session.delete(row)
+    db.session.flush()
+    # новый лимит: сумма по категории считается один раз, дальше — бегущая
+    recalc_budget(db.session.connection(), [wedding_id])
+    touch_wedding(wedding_id)
+    db.session.commit()
+    return redirect(url_for('finance_bp.page_finance', wedding_id=wedding_id))
@@ -0,0 +1,154 @@
+# finance_calc.py
+"""
+Единый расчёт финансов по расходам — одни правила для форм, listener'а,
+хаба, финансов, сводной и отчётов:
+
+    total      = quantity * unit_price, если заданы оба; иначе unit_price или 0
+    spent      = fact, если задан; иначе total          («израсходовано»)
+    difference = spent - plan
+
+Считаем по колонкам: на вход — списки значений, как они пришли из одного
+SELECT (по одной или сразу по многим свадьбам), на выход — колонки и суммы.
+"""
+from __future__ import annotations
+
+from collections import defaultdict
+
+# входные колонки расхода
+INPUT = ("quantity", "unit_price", "plan", "fact", "prepayment")
+# суммы, которые отдаём наружу
+SUMS = ("plan", "fact", "prepayment", "total", "spent", "difference")
+
+
+# ----------------------------
+# Построчные правила
+# ----------------------------
+def calc_total(quantity, unit_price) -> float:
+    if quantity is not None and unit_price is not None:
+        return quantity * unit_price
+    return unit_price or 0.0
+
+
+def calc_spent(total, fact) -> float:
+    return fact if fact is not None else (total or 0.0)
+
+
+def calc_difference(total, plan, fact) -> float:
+    return calc_spent(total, fact) - (plan or 0.0)
+
+
+# ----------------------------
+# Колонки
+# ----------------------------
+def compute(cols: dict) -> dict:
+    """Дописывает в cols колонки total, spent, difference (списки той же длины)."""
+    total = [q * p if (q is not None and p is not None) else (p or 0.0)
+             for q, p in zip(cols["quantity"], cols["unit_price"])]
+    spent = [f if f is not None else t for t, f in zip(total, cols["fact"])]
+    cols["total"] = total
+    cols["spent"] = spent
+    cols["difference"] = [s - (p or 0.0) for s, p in zip(spent, cols["plan"])]
+    return cols
+
+
+def aggregate(cols: dict) -> dict:
+    """Суммы по уже посчитанным колонкам (None -> 0)."""
+    out = {"count": len(cols["total"])}
+    for name in SUMS:
+        out[name] = float(sum(v for v in cols[name] if v is not None))
+    return out
+
+
+def empty() -> dict:
+    return {"count": 0, **{name: 0.0 for name in SUMS}}
+
+
+def group_by(keys: list, cols: dict) -> dict:
+    """Суммы по ключу (свадьба, категория, …) за один проход."""
+    out = defaultdict(empty)
+    series = [(name, cols[name]) for name in SUMS]
+    for i, key in enumerate(keys):
+        acc = out[key]
+        acc["count"] += 1
+        for name, values in series:
+            v = values[i]
+            if v is not None:
+                acc[name] += v
+    return dict(out)
+
+
+def columns_from_rows(rows, extra: tuple = ()) -> dict:
+    """Строки (объекты Expense, Row или dict) -> колонки INPUT + extra."""
+    names = INPUT + tuple(extra)
+    cols = {name: [] for name in names}
+    for r in rows:
+        get = r.get if isinstance(r, dict) else (lambda n, r=r: getattr(r, n))
+        for name in names:
+            cols[name].append(get(name))
+    return cols
+
+
+def apply_to_rows(rows: list[dict]) -> list[dict]:
+    """Проставляет total и difference в dict-строки (для bulk INSERT/UPDATE)."""
+    cols = compute(columns_from_rows(rows))
+    for r, t, d in zip(rows, cols["total"], cols["difference"]):
+        r["total"] = t
+        r["difference"] = d
+    return rows
+
+
+# ----------------------------
+# Загрузка из базы
+# ----------------------------
+def load(wedding_ids=None, extra: tuple = ("wedding_id",)) -> dict:
+    """Колонки расходов одним SELECT (по списку свадеб или по всем)."""
+    from models import db, Expense
+
+    names = INPUT + tuple(extra)
+    stmt = db.select(*[getattr(Expense, n) for n in names])
+    if wedding_ids is not None:
+        stmt = stmt.where(Expense.wedding_id.in_(list(wedding_ids)))
+    rows = db.session.execute(stmt).all()
+    cols = {name: [r[i] for r in rows] for i, name in enumerate(names)}
+    return compute(cols)
+
+
+def wedding_figures(wedding_ids) -> dict:
+    """{wedding_id: суммы} для набора свадеб; свадьбы без расходов — нули."""
+    wedding_ids = list(wedding_ids)
+    if not wedding_ids:
+        return {}
+    cols = load(wedding_ids)
+    grouped = group_by(cols["wedding_id"], cols)
+    return {wid: grouped.get(wid) or empty() for wid in wedding_ids}
+
+
+def category_figures(wedding_id: int) -> dict:
+    """{категория: суммы} по одной свадьбе."""
+    cols = load([wedding_id], extra=("category",))
+    return group_by(cols["category"], cols)
+
+
+def figures_of(expenses) -> dict:
+    """Суммы по уже загруженным объектам Expense (гибриды Wedding)."""
+    return aggregate(compute(columns_from_rows(expenses)))
+
+
+# ----------------------------
+# SQL-эквиваленты (агрегаты в базе, reports.py)
+# ----------------------------
+def sql_columns() -> dict:
+    """Выражения по строке Expense; total в базе уже посчитан listener'ом по calc_total."""
+    from sqlalchemy import func
+    from models import Expense
+
+    plan = func.coalesce(Expense.plan, 0)
+    spent = func.coalesce(Expense.fact, Expense.total, 0)
+    return {
+        "plan": plan,
+        "fact": func.coalesce(Expense.fact, 0),
+        "prepayment": func.coalesce(Expense.prepayment, 0),
+        "total": func.coalesce(Expense.total, 0),
+        "spent": spent,
+        "difference": spent - plan,
+    }
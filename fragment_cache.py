@@ -0,0 +1,139 @@
+# fragment_cache.py
+"""
+Кэш отрендеренных фрагментов шаблонов: {% cache "имя", ключ1, ключ2 %}...{% endcache %}
+
+Ключ обычно включает wedding.id и wedding.version, поэтому неизменённые
+таблицы строк не рендерятся вовсе. Бэкенд выбирается конфигом:
+    FRAGMENT_CACHE = "lru" (по умолчанию) | "file" | "null"
+    FRAGMENT_CACHE_SIZE = 512            # для lru
+    FRAGMENT_CACHE_DIR = "/tmp/wm-fragments"  # для file
+"""
+import hashlib
+import os
+import tempfile
+from collections import OrderedDict
+from threading import Lock
+
+from jinja2 import nodes
+from jinja2.ext import Extension
+from markupsafe import Markup
+
+import metrics
+from http_cache import TEMPLATES_STAMP
+
+
+# ----------------------------
+# Бэкенды
+# ----------------------------
+class NullBackend:
+    def get(self, key):
+        return None
+
+    def set(self, key, value):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUBackend:
+    """In-process LRU (на воркер)."""
+
+    def __init__(self, maxsize: int = 512):
+        self.maxsize = maxsize
+        self._data: OrderedDict[str, str] = OrderedDict()
+        self._lock = Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._data.get(key)
+            if value is not None:
+                self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class FileBackend:
+    """Локальные файлы — общий кэш для всех воркеров одной машины."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, key):
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".html")
+
+    def get(self, key):
+        try:
+            with open(self._path(key), encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def set(self, key, value):
+        fd, tmp = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        with os.fdopen(fd, "w", encoding="utf-8") as f:
+            f.write(value)
+        os.replace(tmp, self._path(key))
+
+    def clear(self):
+        for name in os.listdir(self.directory):
+            if name.endswith(".html"):
+                os.remove(os.path.join(self.directory, name))
+
+
+def make_backend(config):
+    kind = config.get("FRAGMENT_CACHE", "lru")
+    if kind == "file":
+        return FileBackend(config.get("FRAGMENT_CACHE_DIR") or os.path.join(tempfile.gettempdir(), "wm-fragments"))
+    if kind == "null":
+        return NullBackend()
+    return LRUBackend(int(config.get("FRAGMENT_CACHE_SIZE", 512)))
+
+
+# ----------------------------
+# Jinja-расширение
+# ----------------------------
+class FragmentCacheExtension(Extension):
+    tags = {"cache"}
+
+    def __init__(self, environment):
+        super().__init__(environment)
+        environment.extend(fragment_cache=NullBackend())
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        args = [parser.parse_expression()]
+        while parser.stream.skip_if("comma"):
+            args.append(parser.parse_expression())
+        body = parser.parse_statements(["name:endcache"], drop_needle=True)
+        return nodes.CallBlock(
+            self.call_method("_cache_support", [args[0], nodes.List(args[1:])]), [], [], body
+        ).set_lineno(lineno)
+
+    def _cache_support(self, name, key_parts, caller):
+        key = "|".join([TEMPLATES_STAMP, str(name), *map(str, key_parts)])
+        backend = self.environment.fragment_cache
+        value = backend.get(key)
+        if value is not None:
+            metrics.incr(f"fragment_cache.hit.{name}")
+            return Markup(value)
+        metrics.incr(f"fragment_cache.miss.{name}")
+        value = caller()
+        backend.set(key, str(value))
+        return value
+
+
+def init_fragment_cache(app):
+    app.jinja_env.add_extension(FragmentCacheExtension)
+    app.jinja_env.fragment_cache = make_backend(app.config)
@@ -0,0 +1,62 @@
+# http_cache.py
+"""
+HTTP-кэширование страниц свадьбы: слабый ETag из Wedding.version.
+
+Проверка If-None-Match делает один лёгкий SELECT version/user_id и отвечает
+304 до тяжёлых запросов и рендера шаблона — только админу или владельцу
+свадьбы; остальным ETag не выдаётся, и доступ проверяет сам view.
+"""
+import os
+from functools import wraps
+
+from flask import request, session, abort, make_response
+from flask_login import current_user
+from models import db, Wedding
+
+TEMPLATES_DIR = os.path.join(os.path.dirname(__file__), "templates")
+
+
+def templates_stamp() -> str:
+    """Меняется при деплое новых шаблонов -> старые ETag становятся невалидными."""
+    try:
+        return str(int(max(
+            os.path.getmtime(os.path.join(TEMPLATES_DIR, f)) for f in os.listdir(TEMPLATES_DIR)
+        )))
+    except (OSError, ValueError):
+        return "0"
+
+
+TEMPLATES_STAMP = templates_stamp()
+
+
+def wedding_etag(wedding_id: int) -> str | None:
+    """ETag страницы; None — аноним или чужая свадьба (304 не положен). Нет свадьбы — 404."""
+    row = db.session.query(Wedding.version, Wedding.user_id).filter(Wedding.id == wedding_id).first()
+    if row is None:
+        abort(404)
+    # 304 только тому, кто видит страницу: админу или владельцу
+    if not current_user.is_authenticated:
+        return None
+    if not current_user.is_admin and row.user_id != current_user.id:
+        return None
+    # страница зависит и от пользователя (шапка base.html)
+    return f"w{wedding_id}-v{row.version}-u{current_user.get_id()}-t{TEMPLATES_STAMP}"
+
+
+def etag_by_wedding(view):
+    """Декоратор для GET-страниц с параметром wedding_id."""
+    @wraps(view)
+    def wrap(*args, **kwargs):
+        tag = wedding_etag(kwargs["wedding_id"])
+        if tag is None:
+            # анонимам и чужим — без ETag и 304: доступ решает сам view
+            return view(*args, **kwargs)
+        # flash-сообщения одноразовые — такую страницу отдаём целиком
+        if "_flashes" not in session and request.if_none_match.contains_weak(tag):
+            resp = make_response("", 304)
+        else:
+            resp = make_response(view(*args, **kwargs))
+        resp.set_etag(tag, weak=True)
+        resp.headers["Cache-Control"] = "private, no-cache"
+        return resp
+    return wrap
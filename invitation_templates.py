@@ -0,0 +1,260 @@
+# invitation_templates.py
+"""
+Шаблоны приглашений свадьбы: декларативная разметка в базе (JSON в
+InvitationTemplate.spec) вместо захардкоженных set_xy/cell.
+
+    {
+      "page": {"w": 148, "h": 210, "margin": 12},
+      "background": "invite_bg.jpg",            # файл из static/, null — без фона
+      "vars": {"venue": "ресторан «Мумтоз»", ...},
+      "pages": [{"lang": "ru", "blocks": [
+          {"text": "{wedding}", "y": "+11", "h": 12, "font": ["Playfair", "I", 28], "color": [60, 45, 35]},
+          {"text": "{date}, {venue}", "when": "date", ...},
+          {"qr": true, "x": 102, "y": 164, "size": 34}
+      ]}]
+    }
+
+Блок: text, x / w (по умолчанию — ширина страницы без полей), y (число —
+от верха, "+N" — от конца предыдущего блока), h, font, color, align
+(L / C / R), multiline, when (date / !date / family / !family).
+Поля: {greeting} {persons} {wedding} {date} + vars шаблона; {x!c} — с
+заглавной буквы.
+
+Шаблон компилируется один раз в план — кортеж операций: vars уже
+подставлены, текст разобран на куски, повторные font/color выкинуты.
+План кэшируется в процессе по свадьбе с отметкой (id шаблона, version,
+updated_at): id и version после сброса шаблона (строка удаляется) могут
+повториться у другой свадьбы, updated_at — нет. Рендер гостя только
+проходит план и подставляет поля гостя и свадьбы (invitations.py).
+"""
+from __future__ import annotations
+
+import copy
+import json
+import os
+import threading
+from string import Formatter
+
+STATIC_DIR = os.path.join(os.path.dirname(__file__), "static")
+
+FONT_FAMILIES = {"Playfair": ("", "I"), "Montserrat": ("", "B")}
+GUEST_FIELDS = {"greeting", "persons", "wedding", "date"}
+CONDITIONS = {"date", "family"}
+ALIGNS = {"L", "C", "R"}
+
+DEFAULT_SPEC = {
+    "page": {"w": 148, "h": 210, "margin": 12},
+    "background": "invite_bg.jpg",
+    "vars": {
+        "venue": "ресторан «Мумтоз»",
+        "start": "17:00",
+        "address_ru": "г. Навои, ул. Любая, 123",
+        "address_uz": "Навоий ш., Любая кўч., 123",
+    },
+    "pages": [
+        {"lang": lang, "blocks": [
+            {"text": title, "y": 58, "h": 7, "font": ["Montserrat", "", 13], "color": [70, 70, 90]},
+            {"text": "{wedding}", "y": "+11", "h": 12, "font": ["Playfair", "I", 28], "color": [60, 45, 35]},
+            {"text": "{date}, {venue}", "when": "date", "y": "+16", "h": 6,
+             "font": ["Montserrat", "", 12], "color": [85, 85, 85]},
+            {"text": "{venue!c}", "when": "!date", "y": "+16", "h": 6,
+             "font": ["Montserrat", "", 12], "color": [85, 85, 85]},
+            {"text": "{greeting}", "y": "+12", "h": 10, "font": ["Montserrat", "B", 20], "color": [182, 140, 36]},
+            {"text": body, "y": "+14", "h": 6, "multiline": True, "font": ["Montserrat", "", 12], "color": [75, 75, 75]},
+            {"text": start, "y": "+6", "h": 6},
+            {"text": address, "y": "+7", "h": 6},
+            {"text": persons, "when": "family", "y": "+7", "h": 6},
+            {"qr": True, "x": 102, "y": 164, "size": 34},
+        ]}
+        for lang, title, body, start, address, persons in (
+            ("ru", "ПРИГЛАШЕНИЕ НА СВАДЬБУ", "Мы будем очень рады видеть Вас на нашем торжестве!",
+             "Начало: {start}", "Адрес: {address_ru}", "Количество персон: {persons}"),
+            ("uz", "ТЎЙГА ТАКЛИФНОМА", "Бизнинг тантанамизда сизларни кўришдан жуда мамнун бўламиз!",
+             "Бошланиши: {start}", "Манзил: {address_uz}", "Кишилар сони: {persons}"),
+        )
+    ],
+}
+
+
+class TemplateError(ValueError):
+    """Шаблон не компилируется — текст ошибки показываем в форме."""
+
+
+# ----------------------------
+# Компиляция
+# ----------------------------
+def _num(block, key, default=None):
+    val = block.get(key, default)
+    if not isinstance(val, (int, float)) or isinstance(val, bool):
+        raise TemplateError(f"{key}: нужно число, а не {val!r}")
+    return float(val)
+
+
+def _text(src: str, consts: dict) -> tuple:
+    """Текст -> кортеж кусков: строка (константа) или (поле, с заглавной)."""
+    parts, buf = [], ""
+    try:
+        parsed = list(Formatter().parse(src))
+    except ValueError as e:
+        raise TemplateError(f"текст {src!r}: {e}") from None
+    for literal, field, _spec, conv in parsed:
+        buf += literal
+        if field is None:
+            continue
+        if conv not in (None, "c"):
+            raise TemplateError(f"{{{field}!{conv}}}: есть только !c")
+        if field in consts:
+            val = str(consts[field])
+            buf += val[:1].upper() + val[1:] if conv == "c" else val
+        elif field in GUEST_FIELDS:
+            if buf:
+                parts.append(buf)
+                buf = ""
+            parts.append((field, conv == "c"))
+        else:
+            raise TemplateError(f"неизвестное поле {{{field}}}")
+    if buf:
+        parts.append(buf)
+    return tuple(parts)
+
+
+def _when(block):
+    cond = block.get("when")
+    if cond is None:
+        return None
+    neg = cond.startswith("!")
+    name = cond.lstrip("!")
+    if name not in CONDITIONS:
+        raise TemplateError(f"when: {cond!r}, можно {', '.join(sorted(CONDITIONS))} или с «!»")
+    return name, neg
+
+
+def _compile_page(page: dict, spec: dict, consts: dict, pw: float, ph: float, margin: float) -> tuple:
+    ops = []
+    bg = spec.get("background")
+    if bg:
+        ops.append(("image", os.path.join(STATIC_DIR, bg), 0.0, 0.0, pw, ph))
+
+    state = {}  # текущие font/color — повторы не пишем
+    for i, block in enumerate(page.get("blocks") or []):
+        if not isinstance(block, dict):
+            raise TemplateError(f"блок {i + 1}: нужен объект")
+        when = _when(block)
+        body = []
+        y = block.get("y", "+0")
+        if isinstance(y, str):
+            try:
+                y = ("+", float(y.lstrip("+")))
+            except ValueError:
+                raise TemplateError(f"блок {i + 1}: y {y!r}") from None
+        else:
+            y = _num(block, "y")
+
+        if block.get("qr"):
+            size = _num(block, "size", 34)
+            body.append(("qr", _num(block, "x", pw - margin - size), y, size))
+        else:
+            if "font" in block:
+                font = block["font"]
+                if (not isinstance(font, list) or len(font) != 3 or font[0] not in FONT_FAMILIES
+                        or font[1] not in FONT_FAMILIES[font[0]]):
+                    raise TemplateError(f"блок {i + 1}: font {font!r}, есть {FONT_FAMILIES}")
+                font = (font[0], font[1], _num({"font": font[2]}, "font"))
+                if state.get("font") != font:
+                    body.append(("font",) + font)
+                    state["font"] = font
+            if "color" in block:
+                color = block["color"]
+                if not isinstance(color, list) or len(color) != 3 or not all(isinstance(c, int) for c in color):
+                    raise TemplateError(f"блок {i + 1}: color — три числа 0..255")
+                color = tuple(color)
+                if state.get("color") != color:
+                    body.append(("color",) + color)
+                    state["color"] = color
+            if "font" not in state:
+                raise TemplateError(f"блок {i + 1}: не задан font")
+            align = block.get("align", "C")
+            if align not in ALIGNS:
+                raise TemplateError(f"блок {i + 1}: align {align!r}")
+            x = _num(block, "x", margin)
+            w = _num(block, "w", pw - x - margin)
+            kind = "multi" if block.get("multiline") else "cell"
+            body.append((kind, x, y, w, _num(block, "h", 6), _text(str(block.get("text", "")), consts), align))
+
+        if when is None:
+            ops.extend(body)
+        else:
+            ops.append(("when",) + when + (tuple(body),))
+            # блок может не отрисоваться — его font/color дальше не считаем текущими
+            state.clear()
+    return tuple(ops)
+
+
+def compile_spec(spec: dict) -> tuple:
+    """spec -> план: ((w, h), ((lang, ops), ...)). TemplateError, если что-то не так."""
+    if not isinstance(spec, dict) or not spec.get("pages"):
+        raise TemplateError("нужен объект с pages")
+    geo = spec.get("page") or {}
+    pw, ph, margin = _num(geo, "w", 148), _num(geo, "h", 210), _num(geo, "margin", 12)
+    bg = spec.get("background")
+    if bg and (os.path.basename(bg) != bg or not os.path.isfile(os.path.join(STATIC_DIR, bg))):
+        raise TemplateError(f"фон {bg!r}: нужен файл из static/")
+    consts = {k: v for k, v in (spec.get("vars") or {}).items() if k not in GUEST_FIELDS}
+    plan = []
+    for page in spec["pages"]:
+        if not isinstance(page, dict):
+            raise TemplateError("pages: нужен список объектов")
+        lang = page.get("lang", "ru")
+        if lang not in ("ru", "uz"):
+            raise TemplateError(f"lang {lang!r}: ru или uz")
+        plan.append((lang, _compile_page(page, spec, consts, pw, ph, margin)))
+    return (pw, ph), tuple(plan)
+
+
+def parse(text: str) -> dict:
+    """JSON из формы -> spec (проверяется компиляцией)."""
+    try:
+        spec = json.loads(text)
+    except ValueError as e:
+        raise TemplateError(f"JSON: {e}") from None
+    compile_spec(spec)
+    return spec
+
+
+def default_spec() -> dict:
+    return copy.deepcopy(DEFAULT_SPEC)
+
+
+# ----------------------------
+# Кэш планов
+# ----------------------------
+# wedding_id -> (отметка шаблона, план); None -> (None, план по умолчанию), общий для всех
+_PLANS: dict = {}
+_PLANS_LOCK = threading.Lock()
+
+
+def plan_for(wedding_id: int) -> tuple:
+    """План приглашения свадьбы: один SELECT шаблона, компиляция — только на новую версию."""
+    from models import db, InvitationTemplate
+    from sqlalchemy import select
+
+    row = db.session.execute(
+        select(InvitationTemplate.id, InvitationTemplate.version, InvitationTemplate.updated_at)
+        .where(InvitationTemplate.wedding_id == wedding_id)
+    ).first()
+    key, stamp = (wedding_id, tuple(row)) if row else (None, None)
+    hit = _PLANS.get(key)
+    if hit is not None and hit[0] == stamp:
+        return hit[1]
+    with _PLANS_LOCK:
+        hit = _PLANS.get(key)
+        if hit is None or hit[0] != stamp:
+            if row is None:
+                spec = DEFAULT_SPEC
+            else:
+                spec = json.loads(db.session.scalar(
+                    select(InvitationTemplate.spec).where(InvitationTemplate.id == row.id)
+                ))
+            hit = (stamp, compile_spec(spec))
+            _PLANS[key] = hit
+    return hit[1]
@@ -1,10 +1,22 @@
 # invitations.py
-from flask import Blueprint, send_file, url_for
-from models import Wedding, Guest
-from fpdf import FPDF
-import qrcode, tempfile, os, zipfile, re
+from __future__ import annotations
+
+from typing import TYPE_CHECKING
+from flask import Blueprint, send_file, request, abort, render_template, redirect, url_for, flash
+from models import db, Wedding, Guest, InvitationTemplate
+from rsvp import rsvp_url
+from db_routing import replica_read
+import declension
+from invitation_templates import plan_for, parse, default_spec, TemplateError, STATIC_DIR
+import json
+import os, zipfile, re, copy, threading
 from io import BytesIO
 
+# fpdf/qrcode/PIL тяжёлые (~0.3 с импорта) — грузим при первом рендере PDF,
+# чтобы воркеры, которые PDF не рисуют, стартовали быстрее
+if TYPE_CHECKING:
+    from fpdf import FPDF
+
 invitations_bp = Blueprint("invitations_bp", __name__, url_prefix="/invitations")
 
 BASE_DIR = os.path.dirname(__file__)
@@ -19,193 +31,228 @@ def _safe_filename(s: str, ext: str = ".pdf") -> str:
     s = re.sub(r"[\\/:*?\"<>|\n\r\t]+", "_", s)
     return (s or "file") + ext
 
-def _add_font(pdf: FPDF, family: str, style: str, path: str, uni=True):
-    if os.path.exists(path):
-        pdf.add_font(family, style, path, uni=uni)
-
-def _guess_gender_by_name(name: str) -> str:
-    n = (name or "").strip().lower()
-    if not n:
-        return "n"
-    return "f" if n.endswith(("а", "я")) else "m"
-
-# RU: «Ташевы» -> «Ташевых», «Ильины» -> «Ильиных» и т.п.
-def _ru_family_gen_pl_genitive(fam: str) -> str:
-    if not fam:
-        return ""
-    parts, out = fam.split("-"), []
-    for p in parts:
-        w = p.strip()
-        lw = w.lower()
-        if lw.endswith("ы"):
-            out.append(w[:-1] + "ых")
-        elif lw.endswith("и"):
-            out.append(w[:-1] + "х") if not (lw.endswith("ины") or lw.endswith("ыны")) else out.append(w[:-1] + "х")  # «Ильиных»
-            if lw.endswith("ины") or lw.endswith("ыны"):
-                out[-1] = w[:-1] + "х".replace("х", "ных")  # корректируем на «-ных»
-        elif lw.endswith(("ов", "ев", "ёв")):
-            out.append(w + "ых")
-        else:
-            out.append(w)
-    return "-".join(out)
-
-# UZ (кириллица): фамилия -> «...лар»
-# Если введено во мн. числе по-русски («Ташевы») — убираем финальную «ы/и» и добавляем «лар».
-def _uz_family_plural(fam: str) -> str:
-    if not fam:
-        return ""
-    parts, out = fam.split("-"), []
-    for p in parts:
-        w = p.strip()
-        lw = w.lower()
-        stem = w
-        for suf in ("ые", "ие"):
-            if lw.endswith(suf):
-                stem = w[:-2]
-                break
-        else:
-            if lw.endswith(("ы", "и")):
-                stem = w[:-1]
-        out.append(stem + "лар")
-    return "-".join(out)
-
-def _ru_greeting(guest: Guest) -> str:
-    if getattr(guest, "family_name", None):
-        fam = _ru_family_gen_pl_genitive(guest.family_name)
-        return f"Дорогая семья {fam}!"
-    name = (guest.name or "").strip()
-    if not name:
-        return "Дорогие гости!"
-    return f"Дорогая {name}!" if _guess_gender_by_name(name) == "f" else f"Дорогой {name}!"
-
-def _uz_greeting(guest: Guest) -> str:
-    if getattr(guest, "family_name", None):
-        fam = _uz_family_plural(guest.family_name)
-        return f"Қадрли {fam} оиласи!"
-    name = (guest.name or "").strip()
-    return f"Қадрли {name}!" if name else "Қадрли меҳмонлар!"
-
-
-# --------- рисуем страницу (RU / UZ) ---------
-
-def _draw_page(pdf: FPDF, wedding: Wedding, guest: Guest, lang: str):
-    """
-    lang: 'ru' | 'uz'
-    """
+# Разбор TTF (cmap, ширины глифов) стоит ~15 мс на начертание — делаем его
+# один раз на процесс. В документ идёт копия шаблонного TTFFont со своим
+# ttfont (fpdf subset'ит его на месте при output) и своим SubsetMap.
+# Поля TTFFont — внутренности fpdf2: копия проверена только на FPDF2_PINNED
+# (он же в requirements.txt, tests/test_invitation_fonts.py сверяет PDF с
+# публичным add_font). На другой версии — публичный add_font, без кэша.
+FPDF2_PINNED = "2.8.9"
+_FONT_CACHE: dict = {}
+_FONT_LOCK = threading.Lock()
+
+FONTS = (
+    ("Playfair", "", "PlayfairDisplay-Regular.ttf"),
+    ("Playfair", "I", "PlayfairDisplay-Italic.ttf"),
+    ("Montserrat", "", "Montserrat-Regular.ttf"),
+    ("Montserrat", "B", "Montserrat-Bold.ttf"),
+)
+
+
+def _add_font(pdf: FPDF, family: str, style: str, path: str):
+    if not os.path.exists(path):
+        return
+    fontkey = f"{family.lower()}{style}"
+    if fontkey in pdf.fonts:
+        return
+    from fpdf import FPDF, __version__ as fpdf_version
+    if fpdf_version != FPDF2_PINNED:
+        pdf.add_font(family, style, path)
+        return
+    from fpdf.fonts import SubsetMap
+    from fontTools import ttLib
+
+    with _FONT_LOCK:
+        cached = _FONT_CACHE.get((path, style))
+        if cached is None:
+            proto = FPDF()
+            proto.add_font(family, style, path)
+            with open(path, "rb") as f:
+                cached = _FONT_CACHE[(path, style)] = (f.read(), proto.fonts[fontkey])
+    data, proto = cached
+    font = copy.copy(proto)
+    font.i = len(pdf.fonts) + 1
+    font.fontkey = fontkey
+    font.ttfont = ttLib.TTFont(BytesIO(data), recalcTimestamp=False, lazy=True)
+    font.subset = SubsetMap(font)
+    font.biggest_size_pt = 0
+    font.missing_glyphs = []
+    font._hbfont = None
+    pdf.fonts[fontkey] = font
+
+
+def add_fonts(pdf: FPDF):
+    """Playfair + Montserrat (кириллица/узбекская кириллица) из кэша процесса."""
+    for family, style, fname in FONTS:
+        _add_font(pdf, family, style, os.path.join(FONT_DIR, fname))
+
+def _greeting(guest: Guest, lang: str) -> str:
+    """Приветствие, сохранённое на госте; у строк, вставленных мимо ORM, — считаем."""
+    stored = guest.greeting_ru if lang == "ru" else guest.greeting_uz
+    if stored:
+        return stored
+    return (declension.ru_greeting if lang == "ru" else declension.uz_greeting)(guest.name, guest.family_name)
+
+
+# --------- рисуем по плану шаблона (invitation_templates) ---------
+
+def _guest_fields(wedding: Wedding, guest: Guest) -> dict:
+    fields = {
+        "wedding": wedding.name,
+        "date": wedding.date.strftime("%d.%m.%Y") if wedding.date else "",
+        "persons": str(guest.family_count or 1),
+        "family": bool(guest.family_name),
+    }
+    for lang in ("ru", "uz"):
+        fields["greeting_" + lang] = _greeting(guest, lang)
+    return fields
+
+
+def _run_ops(pdf: FPDF, ops: tuple, fields: dict, qr_img):
+    for op in ops:
+        kind = op[0]
+        if kind == "font":
+            pdf.set_font(op[1], op[2], op[3])
+        elif kind == "color":
+            pdf.set_text_color(op[1], op[2], op[3])
+        elif kind == "cell" or kind == "multi":
+            _, x, y, w, h, parts, align = op
+            if isinstance(y, tuple):
+                y = pdf.get_y() + y[1]
+            text = "".join(
+                p if isinstance(p, str) else (fields[p[0]][:1].upper() + fields[p[0]][1:] if p[1] else fields[p[0]])
+                for p in parts
+            )
+            pdf.set_xy(x, y)
+            if kind == "cell":
+                pdf.cell(w, h, text, align=align)
+            else:
+                pdf.multi_cell(w, h, text, align=align)
+        elif kind == "when":
+            _, cond, neg, body = op
+            if bool(fields[cond]) != neg:
+                _run_ops(pdf, body, fields, qr_img)
+        elif kind == "image":
+            if os.path.exists(op[1]):
+                pdf.image(op[1], x=op[2], y=op[3], w=op[4], h=op[5])
+        elif kind == "qr":
+            _, x, y, size = op
+            if isinstance(y, tuple):
+                y = pdf.get_y() + y[1]
+            pdf.image(qr_img, x=x, y=y, w=size, h=size)
+
+
+def _draw_guest(pdf: FPDF, plan: tuple, wedding: Wedding, guest: Guest):
+    """Все страницы плана (RU + UZ) для одного гостя."""
+    fields = _guest_fields(wedding, guest)
+    # QR: ссылка на RSVP с подписанным токеном гостя — камера телефона сразу
+    # открывает форму ответа; одна картинка на обе страницы
+    import qrcode
+    qr_img = qrcode.make(rsvp_url(guest)).get_image()
+    for lang, ops in plan[1]:
+        fields["greeting"] = fields["greeting_" + lang]
+        pdf.add_page()
+        _run_ops(pdf, ops, fields, qr_img)
+
+
+# --------- генерация PDF (страницы шаблона: RU + UZ) ---------
+
+def gen_invitation_pdf(wedding: Wedding, guest: Guest, plan: tuple | None = None) -> BytesIO:
+    from fpdf import FPDF
+    plan = plan or plan_for(wedding.id)
+    pdf = FPDF(format=plan[0], orientation="P", unit="mm")
     pdf.set_auto_page_break(False)
-    pdf.add_page()
-
-    # фон
-    if os.path.exists(BG_PATH):
-        pdf.image(BG_PATH, x=0, y=0, w=148, h=210)
-
-    # шрифты (поддержка кириллицы/узбек. кириллицы)
-    _add_font(pdf, "Playfair", "", os.path.join(FONT_DIR, "PlayfairDisplay-Regular.ttf"))
-    _add_font(pdf, "Playfair", "I", os.path.join(FONT_DIR, "PlayfairDisplay-Italic.ttf"))
-    _add_font(pdf, "Montserrat", "", os.path.join(FONT_DIR, "Montserrat-Regular.ttf"))
-    _add_font(pdf, "Montserrat", "B", os.path.join(FONT_DIR, "Montserrat-Bold.ttf"))
-
-    MARGIN_X = 12
-    WIDTH = 148 - 2 * MARGIN_X
-    y = 58
-
-    # заголовки
-    pdf.set_xy(MARGIN_X, y)
-    pdf.set_font("Montserrat", "", 13)
-    pdf.set_text_color(70, 70, 90)
-    pdf.cell(WIDTH, 7,
-             "ПРИГЛАШЕНИЕ НА СВАДЬБУ" if lang == "ru" else "ТЎЙГА ТАКЛИФНОМА",
-             align="C")
-    y += 11
-
-    # название свадьбы
-    pdf.set_xy(MARGIN_X, y)
-    pdf.set_font("Playfair", "I", 28)
-    pdf.set_text_color(60, 45, 35)
-    pdf.cell(WIDTH, 12, wedding.name, align="C")
-    y += 16
-
-    # дата/место
-    pdf.set_xy(MARGIN_X, y)
-    pdf.set_font("Montserrat", "", 12)
-    pdf.set_text_color(85, 85, 85)
-    if wedding.date:
-        if lang == "ru":
-            pdf.cell(WIDTH, 6, f"{wedding.date.strftime('%d.%m.%Y')}, ресторан «Мумтоз»", align="C")
-        else:
-            pdf.cell(WIDTH, 6, f"{wedding.date.strftime('%d.%m.%Y')}, ресторан «Мумтоз»", align="C")
-    else:
-        pdf.cell(WIDTH, 6, "Ресторан «Мумтоз»" if lang == "ru" else "Ресторан «Мумтоз»", align="C")
-    y += 12
-
-    # приветствие
-    greeting = _ru_greeting(guest) if lang == "ru" else _uz_greeting(guest)
-    pdf.set_xy(MARGIN_X, y)
-    pdf.set_font("Montserrat", "B", 20)
-    pdf.set_text_color(182, 140, 36)
-    pdf.cell(WIDTH, 10, greeting, align="C")
-    y += 14
-
-    # основной текст
-    pdf.set_xy(MARGIN_X, y)
-    pdf.set_font("Montserrat", "", 12)
-    pdf.set_text_color(75, 75, 75)
-    pdf.multi_cell(
-        WIDTH, 6,
-        "Мы будем очень рады видеть Вас на нашем торжестве!" if lang == "ru"
-        else "Бизнинг тантанамизда сизларни кўришдан жуда мамнун бўламиз!",
-        align="C"
-    )
-    y = pdf.get_y() + 6
-
-    # детали
-    pdf.set_xy(MARGIN_X, y)
-    pdf.cell(WIDTH, 6, "Начало: 17:00" if lang == "ru" else "Бошланиши: 17:00", align="C")
-    y += 7
-    pdf.set_xy(MARGIN_X, y)
-    pdf.cell(WIDTH, 6,
-             "Адрес: г. Навои, ул. Любая, 123" if lang == "ru" else "Манзил: Навоий ш., Любая кўч., 123",
-             align="C")
-    y += 7
-
-    if getattr(guest, "family_name", None):
-        persons = guest.family_count or 1
-        pdf.set_xy(MARGIN_X, y)
-        pdf.cell(WIDTH, 6,
-                 f"Количество персон: {persons}" if lang == "ru" else f"Кишилар сони: {persons}",
-                 align="C")
-        y += 7
-
-    # QR (внизу справа)
-    invite_url = url_for("wedding_pages.view_wedding", wedding_id=wedding.id, _external=True)
-    qr_payload = (
-        (f"Приглашение на свадьбу «{wedding.name}»\n" if lang == "ru" else f"«{wedding.name}» тўйига таклифнома\n") +
-        (f"Семья: {guest.family_name} (персон: {guest.family_count or 1})\n"
-         if guest.family_name else
-         (f"Гость: {guest.name}\n" if lang == "ru" else f"Меҳмон: {guest.name}\n")) +
-        (f"Страница: {invite_url}" if lang == "ru" else f"Саҳифа: {invite_url}")
-    )
-    qr_img = qrcode.make(qr_payload)
-    with tempfile.NamedTemporaryFile(suffix=".png", delete=False) as tmp:
-        qr_path = tmp.name
-        qr_img.save(qr_path)
-    try:
-        pdf.image(qr_path, x=148 - MARGIN_X - 34, y=210 - 34 - 12, w=34, h=34)
-    finally:
-        os.remove(qr_path)
-
-
-# --------- генерация PDF (2 страницы: RU + UZ) ---------
-
-def gen_invitation_pdf(wedding: Wedding, guest: Guest) -> BytesIO:
-    pdf = FPDF(format="A5", orientation="P", unit="mm")
-    # рисуем 2 страницы
-    _draw_page(pdf, wedding, guest, "ru")
-    _draw_page(pdf, wedding, guest, "uz")
-
-    out = pdf.output(dest="S")
-    pdf_bytes = bytes(out)
-    bio = BytesIO(pdf_bytes)
+    add_fonts(pdf)
+    _draw_guest(pdf, plan, wedding, guest)
+
+    bio = BytesIO(bytes(pdf.output()))
+    bio.seek(0)
+    return bio
+
+
+# --------- карточки (N-up на A4) ---------
+# Рассадочные карточки гостей и номера столов: много карточек на лист A4,
+# один документ на всю свадьбу. Шрифты встраиваются один раз (subset по
+# всем карточкам), фон — один image XObject, на который ссылается каждая
+# карточка (fpdf кэширует картинку по пути в пределах документа).
+
+A4_W, A4_H = 210, 297
+CARD_LAYOUTS = {"2x4": (2, 4), "2x5": (2, 5), "3x7": (3, 7)}
+
+
+def place_card_rows(wedding_id: int, kind: str) -> list[tuple[str, str]]:
+    """(крупная строка, подпись) одним запросом; отказавшиеся не печатаются."""
+    from models import db, Table
+    from sqlalchemy import select, func
+
+    if kind == "tables":
+        rows = db.session.execute(
+            select(Table.name, Table.id).where(Table.wedding_id == wedding_id).order_by(Table.order, Table.id)
+        ).all()
+        return [(name or f"Стол {tid}", "") for name, tid in rows]
+    rows = db.session.execute(
+        select(Guest.name, Guest.family_name, Guest.family_count, Table.name)
+        .outerjoin(Table, Table.id == Guest.table_id)
+        .where(Guest.wedding_id == wedding_id, func.coalesce(Guest.status, "") != "declined")
+        .order_by(Table.order, Table.id, Guest.id)
+    ).all()
+    out = []
+    for name, family_name, family_count, table_name in rows:
+        title = family_name or name or "Гость"
+        sub = table_name or ""
+        if family_name and family_count:
+            sub = f"{sub} · {family_count} перс." if sub else f"{family_count} перс."
+        out.append((title, sub))
+    return out
+
+
+def gen_place_cards_pdf(wedding: Wedding, cards: list[tuple[str, str]], layout: str = "2x5") -> BytesIO:
+    from fpdf import FPDF
+    cols, rows = CARD_LAYOUTS[layout]
+    card_w, card_h = A4_W / cols, A4_H / rows
+    per_page = cols * rows
+    has_bg = os.path.exists(BG_PATH)
+    # фон приглашения — A5 (148×210): масштаб по ширине карточки, центр по высоте
+    bg_h = card_w * 210 / 148
+    big = min(22, card_h * 0.45 * 72 / 25.4 / 1.2)
+
+    pdf = FPDF(format="A4", orientation="P", unit="mm")
+    pdf.set_auto_page_break(False)
+    add_fonts(pdf)
+
+    for i, (title, sub) in enumerate(cards):
+        if i % per_page == 0:
+            pdf.add_page()
+            # линии реза — одна сетка на лист
+            pdf.set_draw_color(210, 210, 210)
+            pdf.set_line_width(0.1)
+            for c in range(1, cols):
+                pdf.line(c * card_w, 0, c * card_w, A4_H)
+            for r in range(1, rows):
+                pdf.line(0, r * card_h, A4_W, r * card_h)
+        n = i % per_page
+        x, y = (n % cols) * card_w, (n // cols) * card_h
+        if has_bg:
+            with pdf.rect_clip(x, y, card_w, card_h):
+                pdf.image(BG_PATH, x=x, y=y - (bg_h - card_h) / 2, w=card_w, h=bg_h)
+
+        pdf.set_font("Playfair", "I", big)
+        width = pdf.get_string_width(title)
+        if width > card_w - 8:
+            # длинное имя — уменьшаем кегль, а не переносим
+            pdf.set_font_size(big * (card_w - 8) / width)
+        pdf.set_text_color(60, 45, 35)
+        pdf.set_xy(x + 4, y + card_h * 0.30)
+        pdf.cell(card_w - 8, card_h * 0.25, title, align="C")
+        pdf.set_font("Montserrat", "", max(7, big * 0.5))
+        pdf.set_text_color(110, 90, 60)
+        pdf.set_xy(x + 4, y + card_h * 0.58)
+        pdf.cell(card_w - 8, card_h * 0.12, sub or wedding.name, align="C")
+
+    if not cards:
+        pdf.add_page()
+
+    bio = BytesIO(bytes(pdf.output()))
     bio.seek(0)
     return bio
 
@@ -213,6 +260,7 @@ def gen_invitation_pdf(wedding: Wedding, guest: Guest) -> BytesIO:
 # --------- endpoints ---------
 
 @invitations_bp.route("/<int:wedding_id>/<int:guest_id>/pdf")
+@replica_read
 def invitation_pdf(wedding_id, guest_id):
     wedding = Wedding.query.get_or_404(wedding_id)
     guest = Guest.query.get_or_404(guest_id)
@@ -222,14 +270,17 @@ def invitation_pdf(wedding_id, guest_id):
 
 
 @invitations_bp.route("/<int:wedding_id>/all_pdfs.zip")
+@replica_read
 def invitations_zip(wedding_id):
     wedding = Wedding.query.get_or_404(wedding_id)
     guests = Guest.query.filter_by(wedding_id=wedding_id).all()
 
+    plan = plan_for(wedding_id)
+
     zip_buffer = BytesIO()
     with zipfile.ZipFile(zip_buffer, "w", compression=zipfile.ZIP_DEFLATED) as zf:
         for g in guests:
-            pdf_bytes = gen_invitation_pdf(wedding, g).getvalue()
+            pdf_bytes = gen_invitation_pdf(wedding, g, plan).getvalue()
             name = _safe_filename(g.family_name or g.name)
             zf.writestr(name, pdf_bytes)
     zip_buffer.seek(0)
@@ -239,3 +290,74 @@ def invitations_zip(wedding_id):
         download_name=_safe_filename(f"Приглашения_{wedding.name}", ext=".zip"),
         mimetype="application/zip",
     )
+
+
+@invitations_bp.route("/<int:wedding_id>/cards.pdf")
+@replica_read
+def place_cards_pdf(wedding_id):
+    """?kind=guests|tables&layout=2x4|2x5|3x7 — все карточки свадьбы одним PDF."""
+    wedding = Wedding.query.get_or_404(wedding_id)
+    kind = request.args.get("kind", "guests")
+    layout = request.args.get("layout", "2x5")
+    if kind not in ("guests", "tables") or layout not in CARD_LAYOUTS:
+        abort(400)
+    pdf_buf = gen_place_cards_pdf(wedding, place_card_rows(wedding_id, kind), layout)
+    return send_file(
+        pdf_buf,
+        as_attachment=False,
+        download_name=_safe_filename(f"Карточки_{wedding.name}"),
+        mimetype="application/pdf",
+    )
+
+
+# --------- шаблон приглашения свадьбы ---------
+
+def _backgrounds() -> list[str]:
+    return sorted(f for f in os.listdir(STATIC_DIR) if f.lower().endswith((".jpg", ".jpeg", ".png")))
+
+
+@invitations_bp.route("/<int:wedding_id>/template", methods=["GET", "POST"])
+def invitation_template(wedding_id):
+    wedding = Wedding.query.get_or_404(wedding_id)
+    tpl = wedding.invitation_template
+    if request.method == "POST":
+        text = request.form.get("spec", "")
+        try:
+            spec = parse(text)
+        except TemplateError as e:
+            flash(f"Шаблон не сохранён: {e}", "error")
+            return render_template("invitation_template.html", wedding=wedding, tpl=tpl,
+                                   spec_text=text, backgrounds=_backgrounds()), 400
+        if tpl is None:
+            tpl = InvitationTemplate(wedding_id=wedding.id, version=0)
+            db.session.add(tpl)
+        tpl.spec = json.dumps(spec, ensure_ascii=False, indent=2)
+        tpl.version += 1  # новый план скомпилируется при следующем рендере
+        db.session.commit()
+        flash("Шаблон сохранён", "success")
+        return redirect(url_for("invitations_bp.invitation_template", wedding_id=wedding.id))
+
+    spec_text = tpl.spec if tpl else json.dumps(default_spec(), ensure_ascii=False, indent=2)
+    return render_template("invitation_template.html", wedding=wedding, tpl=tpl,
+                           spec_text=spec_text, backgrounds=_backgrounds())
+
+
+@invitations_bp.post("/<int:wedding_id>/template/reset")
+def invitation_template_reset(wedding_id):
+    wedding = Wedding.query.get_or_404(wedding_id)
+    if wedding.invitation_template is not None:
+        db.session.delete(wedding.invitation_template)
+        db.session.commit()
+    flash("Вернули шаблон по умолчанию", "success")
+    return redirect(url_for("invitations_bp.invitation_template", wedding_id=wedding.id))
+
+
+@invitations_bp.route("/<int:wedding_id>/template/preview.pdf")
+def invitation_template_preview(wedding_id):
+    """Сохранённый шаблон на первом госте (или на примере семьи)."""
+    wedding = Wedding.query.get_or_404(wedding_id)
+    guest = Guest.query.filter_by(wedding_id=wedding_id).order_by(Guest.id).first()
+    if guest is None:
+        guest = Guest(id=0, wedding_id=wedding_id, family_name="Ильины", family_count=2)
+    return send_file(gen_invitation_pdf(wedding, guest), mimetype="application/pdf",
+                     download_name=_safe_filename("Шаблон"))
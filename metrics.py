@@ -0,0 +1,54 @@
+# metrics.py
+"""Простые in-process метрики (счётчики и наблюдения). Снимок отдаётся через admin.metrics."""
+from collections import defaultdict
+from threading import Lock
+
+_lock = Lock()
+_counters: dict[str, int] = defaultdict(int)
+# имя -> [count, sum, min, max]
+_observed: dict[str, list] = {}
+
+
+def incr(name: str, n: int = 1) -> None:
+    with _lock:
+        _counters[name] += n
+
+
+def observe(name: str, value: float) -> None:
+    """Наблюдение величины (размер пачки, латентность): count / avg / min / max."""
+    with _lock:
+        s = _observed.get(name)
+        if s is None:
+            _observed[name] = [1, value, value, value]
+        else:
+            s[0] += 1
+            s[1] += value
+            s[2] = min(s[2], value)
+            s[3] = max(s[3], value)
+
+
+def snapshot() -> dict:
+    with _lock:
+        counters = dict(_counters)
+        observed = {k: list(v) for k, v in _observed.items()}
+    return {
+        "counters": counters,
+        "ratios": _hit_ratios(counters),
+        "observed": {
+            k: {"count": n, "avg": round(total / n, 3), "min": lo, "max": hi}
+            for k, (n, total, lo, hi) in observed.items()
+        },
+    }
+
+
+def _hit_ratios(counters: dict) -> dict:
+    """Для пар '<x>.hit.<name>' / '<x>.miss.<name>' считаем долю попаданий."""
+    out = {}
+    for key, hits in counters.items():
+        prefix, sep, name = key.partition(".hit.")
+        if not sep:
+            continue
+        misses = counters.get(f"{prefix}.miss.{name}", 0)
+        total = hits + misses
+        out[f"{prefix}.{name}"] = round(hits / total, 4) if total else 0.0
+    return out
@@ -0,0 +1,26 @@
+"""wedding.version — счётчик версий данных свадьбы (ETag)
+
+Revision ID: 0001_wedding_version
+Revises:
+Create Date: 2026-10-19 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0001_wedding_version'
+down_revision = None
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('wedding') as batch_op:
+        batch_op.add_column(sa.Column('version', sa.Integer(), nullable=False, server_default='1'))
+
+
+def downgrade():
+    with op.batch_alter_table('wedding') as batch_op:
+        batch_op.drop_column('version')
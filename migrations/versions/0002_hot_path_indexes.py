@@ -0,0 +1,44 @@
+"""индексы под горячие запросы: рассадка, финансы, задачи, список свадеб
+
+Revision ID: 0002_hot_path_indexes
+Revises: 0001_wedding_version
+Create Date: 2026-10-19 12:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0002_hot_path_indexes'
+down_revision = '0001_wedding_version'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # дубликат ix_guest_table_id (Guest.table_id index=True)
+    op.drop_index('ix_guest_table', table_name='guest')
+
+    op.create_index('ix_guest_wedding_table', 'guest', ['wedding_id', 'table_id'])
+    op.create_index(
+        'ix_guest_wedding_unassigned', 'guest', ['wedding_id', 'id'],
+        postgresql_where=sa.text('table_id IS NULL'),
+        sqlite_where=sa.text('table_id IS NULL'),
+    )
+    op.create_index('ix_expense_wedding_category', 'expense', ['wedding_id', 'category'])
+    op.create_index('ix_task_wedding_done', 'task', ['wedding_id', 'is_done'])
+
+    if op.get_bind().dialect.name == 'postgresql':
+        op.create_index('ix_wedding_user_date', 'wedding', ['user_id', sa.text('date DESC NULLS LAST')])
+    else:
+        op.create_index('ix_wedding_user_date', 'wedding', ['user_id', sa.text('date DESC')])
+
+
+def downgrade():
+    op.drop_index('ix_wedding_user_date', table_name='wedding')
+    op.drop_index('ix_task_wedding_done', table_name='task')
+    op.drop_index('ix_expense_wedding_category', table_name='expense')
+    op.drop_index('ix_guest_wedding_unassigned', table_name='guest')
+    op.drop_index('ix_guest_wedding_table', table_name='guest')
+    op.create_index('ix_guest_table', 'guest', ['table_id'])
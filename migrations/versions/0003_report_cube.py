@@ -0,0 +1,50 @@
+"""куб отчётов: суммы расходов по (свадьба, категория) + состояние пересчёта
+
+Revision ID: 0003_report_cube
+Revises: 0002_hot_path_indexes
+Create Date: 2026-10-19 14:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0003_report_cube'
+down_revision = '0002_hot_path_indexes'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'report_cube',
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('user_id', sa.Integer(), nullable=True),
+        sa.Column('ym', sa.Integer(), nullable=True),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('plan', sa.Float(), nullable=False),
+        sa.Column('fact', sa.Float(), nullable=False),
+        sa.Column('prepayment', sa.Float(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.Column('difference', sa.Float(), nullable=False),
+        sa.PrimaryKeyConstraint('wedding_id', 'category'),
+    )
+    op.create_index('ix_report_cube_ym', 'report_cube', ['ym'])
+    op.create_index('ix_report_cube_user', 'report_cube', ['user_id'])
+    # куб заполнится при первом /svodnaya/report или `flask --app app report-cube`
+    op.create_table(
+        'report_cube_state',
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), nullable=False),
+        sa.PrimaryKeyConstraint('wedding_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('report_cube_state')
+    op.drop_index('ix_report_cube_user', table_name='report_cube')
+    op.drop_index('ix_report_cube_ym', table_name='report_cube')
+    op.drop_table('report_cube')
@@ -0,0 +1,74 @@
+"""бюджет: бегущая сумма и состояние на wedding, лимиты по категориям, алерты
+
+Revision ID: 0004_budget_alerts
+Revises: 0003_report_cube
+Create Date: 2026-10-19 16:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0004_budget_alerts'
+down_revision = '0003_report_cube'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('wedding') as batch_op:
+        batch_op.add_column(sa.Column('spent_total', sa.Float(), nullable=False, server_default='0'))
+        batch_op.add_column(sa.Column('budget_state', sa.String(length=10), nullable=False, server_default='ok'))
+        batch_op.create_index('ix_wedding_budget_state', ['budget_state'])
+
+    op.create_table(
+        'budget_cap',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('cap', sa.Float(), nullable=False),
+        sa.Column('spent', sa.Float(), nullable=False, server_default='0'),
+        sa.Column('exceeded', sa.Boolean(), nullable=False, server_default=sa.false()),
+        sa.ForeignKeyConstraint(['wedding_id'], ['wedding.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ux_budget_cap_wedding_category', 'budget_cap', ['wedding_id', 'category'], unique=True)
+
+    op.create_table(
+        'budget_alert',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+        sa.Column('kind', sa.String(length=20), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=True),
+        sa.Column('spent', sa.Float(), nullable=False),
+        sa.Column('limit', sa.Float(), nullable=False),
+        sa.Column('created_at', sa.DateTime(), nullable=False),
+        sa.Column('resolved_at', sa.DateTime(), nullable=True),
+        sa.ForeignKeyConstraint(['wedding_id'], ['wedding.id']),
+        sa.PrimaryKeyConstraint('id'),
+    )
+    op.create_index('ix_budget_alert_wedding_open', 'budget_alert', ['wedding_id', 'resolved_at'])
+
+    # стартовые суммы и состояние (правила — finance_calc / models.budget_state_for)
+    op.execute(
+        "UPDATE wedding SET spent_total = COALESCE("
+        "(SELECT SUM(COALESCE(expense.fact, expense.total, 0)) FROM expense WHERE expense.wedding_id = wedding.id), 0)"
+    )
+    op.execute(
+        "UPDATE wedding SET budget_state = CASE "
+        "WHEN budget > 0 AND spent_total >= budget THEN 'over' "
+        "WHEN budget > 0 AND spent_total >= 0.8 * budget THEN 'warn' "
+        "ELSE 'ok' END"
+    )
+
+
+def downgrade():
+    op.drop_index('ix_budget_alert_wedding_open', table_name='budget_alert')
+    op.drop_table('budget_alert')
+    op.drop_index('ux_budget_cap_wedding_category', table_name='budget_cap')
+    op.drop_table('budget_cap')
+    with op.batch_alter_table('wedding') as batch_op:
+        batch_op.drop_index('ix_wedding_budget_state')
+        batch_op.drop_column('budget_state')
+        batch_op.drop_column('spent_total')
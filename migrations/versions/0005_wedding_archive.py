@@ -0,0 +1,94 @@
+"""архив старых свадеб: wedding.archived_at/restored_at и таблицы *_archive
+
+Revision ID: 0005_wedding_archive
+Revises: 0004_budget_alerts
+Create Date: 2026-10-19 19:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0005_wedding_archive'
+down_revision = '0004_budget_alerts'
+branch_labels = None
+depends_on = None
+
+
+# копии горячих таблиц без FK и умолчаний (models.ARCHIVE_TABLES)
+ARCHIVE = {
+    'table_archive': [
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=50), nullable=True),
+        sa.Column('seats', sa.Integer(), nullable=False),
+        sa.Column('order', sa.Integer(), nullable=False),
+    ],
+    'guest_archive': [
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+        sa.Column('name', sa.String(length=120), nullable=True),
+        sa.Column('family_name', sa.String(length=120), nullable=True),
+        sa.Column('family_count', sa.Integer(), nullable=True),
+        sa.Column('phone', sa.String(length=50), nullable=True),
+        sa.Column('status', sa.String(length=20), nullable=True),
+        sa.Column('notes', sa.String(), nullable=True),
+        sa.Column('side', sa.String(length=20), nullable=True),
+        sa.Column('is_vip', sa.Boolean(), nullable=True),
+        sa.Column('is_child', sa.Boolean(), nullable=True),
+        sa.Column('table_no', sa.Integer(), nullable=True),
+        sa.Column('table_id', sa.Integer(), nullable=True),
+        sa.Column('table_seat', sa.Integer(), nullable=True),
+    ],
+    'sponsor_gift_archive': [
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('guest_id', sa.Integer(), nullable=False),
+        sa.Column('amount', sa.Float(), nullable=True),
+        sa.Column('notes', sa.String(length=255), nullable=True),
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+    ],
+    'expense_archive': [
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+        sa.Column('category', sa.String(length=100), nullable=False),
+        sa.Column('item', sa.String(length=100), nullable=False),
+        sa.Column('quantity', sa.Float(), nullable=True),
+        sa.Column('unit_price', sa.Float(), nullable=True),
+        sa.Column('total', sa.Float(), nullable=True),
+        sa.Column('notes', sa.String(length=200), nullable=True),
+        sa.Column('plan', sa.Float(), nullable=True),
+        sa.Column('fact', sa.Float(), nullable=True),
+        sa.Column('prepayment', sa.Float(), nullable=True),
+        sa.Column('difference', sa.Float(), nullable=True),
+    ],
+    'task_archive': [
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('description', sa.String(length=200), nullable=False),
+        sa.Column('is_done', sa.Boolean(), nullable=True),
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+    ],
+}
+
+
+def upgrade():
+    with op.batch_alter_table('wedding') as batch_op:
+        batch_op.add_column(sa.Column('archived_at', sa.DateTime(), nullable=True))
+        batch_op.add_column(sa.Column('restored_at', sa.DateTime(), nullable=True))
+        batch_op.create_index('ix_wedding_archived_at', ['archived_at'])
+
+    for name, columns in ARCHIVE.items():
+        op.create_table(name, *columns, sa.PrimaryKeyConstraint('id'))
+        src = name[:-len('_archive')]
+        op.create_index(f'ix_{src}_archive_wedding_id', name, ['wedding_id'])
+
+
+def downgrade():
+    for name in reversed(list(ARCHIVE)):
+        src = name[:-len('_archive')]
+        op.drop_index(f'ix_{src}_archive_wedding_id', table_name=name)
+        op.drop_table(name)
+    with op.batch_alter_table('wedding') as batch_op:
+        batch_op.drop_index('ix_wedding_archived_at')
+        batch_op.drop_column('restored_at')
+        batch_op.drop_column('archived_at')
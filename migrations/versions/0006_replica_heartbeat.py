@@ -0,0 +1,29 @@
+"""replica_heartbeat: отметка времени для замера отставания реплики
+
+Revision ID: 0006_replica_heartbeat
+Revises: 0005_wedding_archive
+Create Date: 2026-10-19 20:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0006_replica_heartbeat'
+down_revision = '0005_wedding_archive'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'replica_heartbeat',
+        sa.Column('id', sa.Integer(), autoincrement=False, nullable=False),
+        sa.Column('at', sa.DateTime(), nullable=False),
+        sa.PrimaryKeyConstraint('id'),
+    )
+
+
+def downgrade():
+    op.drop_table('replica_heartbeat')
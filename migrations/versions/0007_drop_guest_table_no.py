@@ -0,0 +1,91 @@
+"""рассадка одной схемой: guest.table_no -> guest.table_id, колонка удалена
+
+Revision ID: 0007_drop_guest_table_no
+Revises: 0006_replica_heartbeat
+Create Date: 2026-10-19 21:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0007_drop_guest_table_no'
+down_revision = '0006_replica_heartbeat'
+branch_labels = None
+depends_on = None
+
+
+def _table(name):
+    return sa.table(
+        name,
+        sa.column('id', sa.Integer), sa.column('wedding_id', sa.Integer),
+        sa.column('name', sa.String), sa.column('seats', sa.Integer), sa.column('order', sa.Integer),
+    )
+
+
+def _guest(name):
+    return sa.table(
+        name,
+        sa.column('id', sa.Integer), sa.column('wedding_id', sa.Integer),
+        sa.column('table_no', sa.Integer), sa.column('table_id', sa.Integer),
+    )
+
+
+TABLE, TABLE_ARCHIVE = _table('table'), _table('table_archive')
+GUEST, GUEST_ARCHIVE = _guest('guest'), _guest('guest_archive')
+
+
+def _convert(conn, tables, guests, archived):
+    """Номер стола = позиция стола свадьбы (order, id) с 1; недостающие столы создаём."""
+    rows = conn.execute(
+        sa.select(guests.c.id, guests.c.wedding_id, guests.c.table_no)
+        .where(guests.c.table_no.isnot(None), guests.c.table_no > 0, guests.c.table_id.is_(None))
+        .order_by(guests.c.wedding_id, guests.c.id)
+    ).all()
+    by_wedding = {}
+    for gid, wid, no in rows:
+        by_wedding.setdefault(wid, []).append((gid, no))
+
+    for wid, items in by_wedding.items():
+        ids = list(conn.scalars(
+            sa.select(tables.c.id).where(tables.c.wedding_id == wid).order_by(tables.c['order'], tables.c.id)
+        ))
+        need = max(no for _, no in items)
+        while len(ids) < need:
+            n = len(ids) + 1
+            values = dict(wedding_id=wid, name=f'Стол {n}', seats=12, order=n - 1)
+            # id берём из последовательности горячей таблицы — restore потом не столкнётся
+            new_id = conn.execute(sa.insert(TABLE).values(**values).returning(TABLE.c.id)).scalar_one()
+            if archived:
+                conn.execute(sa.delete(TABLE).where(TABLE.c.id == new_id))
+                conn.execute(sa.insert(TABLE_ARCHIVE).values(id=new_id, **values))
+            ids.append(new_id)
+        for gid, no in items:
+            conn.execute(sa.update(guests).where(guests.c.id == gid).values(table_id=ids[no - 1]))
+
+
+def upgrade():
+    conn = op.get_bind()
+    _convert(conn, TABLE, GUEST, archived=False)
+    _convert(conn, TABLE_ARCHIVE, GUEST_ARCHIVE, archived=True)
+
+    with op.batch_alter_table('guest') as batch_op:
+        batch_op.drop_column('table_no')
+    with op.batch_alter_table('guest_archive') as batch_op:
+        batch_op.drop_column('table_no')
+
+
+def downgrade():
+    with op.batch_alter_table('guest_archive') as batch_op:
+        batch_op.add_column(sa.Column('table_no', sa.Integer(), nullable=True))
+    with op.batch_alter_table('guest') as batch_op:
+        batch_op.add_column(sa.Column('table_no', sa.Integer(), nullable=True))
+
+    # номер стола обратно из позиции стола (только горячие свадьбы)
+    conn = op.get_bind()
+    counter = {}
+    rows = conn.execute(sa.select(TABLE.c.id, TABLE.c.wedding_id).order_by(TABLE.c.wedding_id, TABLE.c['order'], TABLE.c.id))
+    for tid, wid in rows.all():
+        counter[wid] = counter.get(wid, 0) + 1
+        conn.execute(sa.update(GUEST).where(GUEST.c.table_id == tid).values(table_no=counter[wid]))
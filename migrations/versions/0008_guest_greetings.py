@@ -0,0 +1,52 @@
+"""guest.greeting_ru/greeting_uz: готовые приветствия приглашения
+
+Revision ID: 0008_guest_greetings
+Revises: 0007_drop_guest_table_no
+Create Date: 2026-10-19 22:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+import declension
+
+
+# revision identifiers, used by Alembic.
+revision = '0008_guest_greetings'
+down_revision = '0007_drop_guest_table_no'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(conn, name):
+    t = sa.table(
+        name,
+        sa.column('id', sa.Integer), sa.column('name', sa.String), sa.column('family_name', sa.String),
+        sa.column('greeting_ru', sa.String), sa.column('greeting_uz', sa.String),
+    )
+    rows = conn.execute(sa.select(t.c.id, t.c.name, t.c.family_name)).all()
+    params = []
+    for gid, guest_name, family_name in rows:
+        ru, uz = declension.greetings(guest_name, family_name)
+        params.append({'gid': gid, 'ru': ru, 'uz': uz})
+    if params:
+        conn.execute(
+            sa.update(t).where(t.c.id == sa.bindparam('gid'))
+            .values(greeting_ru=sa.bindparam('ru'), greeting_uz=sa.bindparam('uz')),
+            params,
+        )
+
+
+def upgrade():
+    for name in ('guest', 'guest_archive'):
+        with op.batch_alter_table(name) as batch_op:
+            batch_op.add_column(sa.Column('greeting_ru', sa.String(length=200), nullable=True))
+            batch_op.add_column(sa.Column('greeting_uz', sa.String(length=200), nullable=True))
+        _backfill(op.get_bind(), name)
+
+
+def downgrade():
+    for name in ('guest_archive', 'guest'):
+        with op.batch_alter_table(name) as batch_op:
+            batch_op.drop_column('greeting_uz')
+            batch_op.drop_column('greeting_ru')
@@ -0,0 +1,34 @@
+"""invitation_template: свой шаблон приглашения свадьбы
+
+Revision ID: 0009_invitation_template
+Revises: 0008_guest_greetings
+Create Date: 2026-10-19 23:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0009_invitation_template'
+down_revision = '0008_guest_greetings'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table(
+        'invitation_template',
+        sa.Column('id', sa.Integer(), nullable=False),
+        sa.Column('wedding_id', sa.Integer(), nullable=False),
+        sa.Column('version', sa.Integer(), server_default='1', nullable=False),
+        sa.Column('spec', sa.String(), nullable=False),
+        sa.Column('updated_at', sa.DateTime(), nullable=False),
+        sa.ForeignKeyConstraint(['wedding_id'], ['wedding.id']),
+        sa.PrimaryKeyConstraint('id'),
+        sa.UniqueConstraint('wedding_id'),
+    )
+
+
+def downgrade():
+    op.drop_table('invitation_template')
@@ -0,0 +1,41 @@
+"""task.position: порядок задач в чек-листе
+
+Revision ID: 0010_task_position
+Revises: 0009_invitation_template
+Create Date: 2026-10-20 10:00:00
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0010_task_position'
+down_revision = '0009_invitation_template'
+branch_labels = None
+depends_on = None
+
+
+def _backfill(conn, name):
+    """Прежний порядок (по id) -> position 0..n-1 внутри свадьбы."""
+    t = sa.table(name, sa.column('id', sa.Integer), sa.column('wedding_id', sa.Integer),
+                 sa.column('position', sa.Integer))
+    other = t.alias('other')
+    conn.execute(sa.update(t).values(position=(
+        sa.select(sa.func.count()).select_from(other)
+        .where(other.c.wedding_id == t.c.wedding_id, other.c.id < t.c.id)
+        .scalar_subquery()
+    )))
+
+
+def upgrade():
+    for name in ('task', 'task_archive'):
+        with op.batch_alter_table(name) as batch_op:
+            batch_op.add_column(sa.Column('position', sa.Integer(), nullable=False, server_default='0'))
+        _backfill(op.get_bind(), name)
+
+
+def downgrade():
+    for name in ('task_archive', 'task'):
+        with op.batch_alter_table(name) as batch_op:
+            batch_op.drop_column('position')
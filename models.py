@@ -1,14 +1,21 @@
 # models.py
 from flask_sqlalchemy import SQLAlchemy
 from sqlalchemy import (
-    Column, Integer, String, Boolean, ForeignKey, Float, Date, event, Index
+    Column, Integer, String, Boolean, ForeignKey, Float, Date, DateTime, event, Index, select, func,
+    bindparam, inspect,
 )
-from sqlalchemy.orm import relationship, backref
+from sqlalchemy.orm import relationship, backref, object_session
+from sqlalchemy.sql.expression import false as sa_false
 from sqlalchemy.ext.hybrid import hybrid_property
 from flask_login import UserMixin
-from werkzeug.security import generate_password_hash, check_password_hash
+from datetime import datetime
 
-db = SQLAlchemy()
+import finance_calc
+import declension
+import passwords
+from db_routing import RoutingSession
+
+db = SQLAlchemy(session_options={"class_": RoutingSession})
 
 # =========================
 # Users / Auth
@@ -24,10 +31,10 @@ class User(db.Model, UserMixin):
     weddings = relationship('Wedding', back_populates='user', cascade="all, delete-orphan")
 
     def set_password(self, raw: str) -> None:
-        self.password_hash = generate_password_hash(raw)
+        self.password_hash = passwords.hash_password(raw)
 
     def check_password(self, raw: str) -> bool:
-        return check_password_hash(self.password_hash, raw)
+        return passwords.verify(self.password_hash, raw)
 
     def __repr__(self):
         return f"<User {self.id} {self.email} admin={self.is_admin}>"
@@ -46,7 +53,22 @@ class Wedding(db.Model):
 
     budget = Column(Float)
 
-    tasks    = relationship('Task',    back_populates='wedding', cascade="all, delete-orphan")
+    # версия данных свадьбы: растёт при любом изменении самой свадьбы или её
+    # расходов/гостей/столов/задач/подарков (см. listener’ы ниже) — для ETag/кэша
+    version = Column(Integer, nullable=False, default=1, server_default="1")
+
+    # бегущая сумма «израсходовано» (fact, иначе total) и состояние бюджета
+    # ok / warn (>= 80%) / over (>= 100%) — ведутся listener’ами расходов
+    spent_total  = Column(Float, nullable=False, default=0, server_default="0")
+    budget_state = Column(String(10), nullable=False, default="ok", server_default="ok", index=True)
+
+    # архив (archive.py): гости/расходы/задачи/столы/подарки перенесены в *_archive;
+    # restored_at — когда свадьбу вернули по запросу (архиватор её какое-то время не трогает)
+    archived_at = Column(DateTime, nullable=True, index=True)
+    restored_at = Column(DateTime, nullable=True)
+
+    tasks    = relationship('Task',    back_populates='wedding', cascade="all, delete-orphan",
+                            order_by='[Task.position, Task.id]')
     expenses = relationship('Expense', backref='wedding',       cascade="all, delete-orphan")
     guests   = relationship('Guest',   backref='wedding',       cascade="all, delete-orphan")
 
@@ -60,34 +82,41 @@ class Wedding(db.Model):
     # БЫЛО: sponsors = relationship('SponsorGift', backref='wedding', ...)
     sponsors = relationship('SponsorGift', back_populates='wedding', cascade="all, delete-orphan")
 
+    # лимиты по категориям и алерты бюджета (см. «Бюджет» ниже)
+    budget_caps   = relationship('BudgetCap',   backref='wedding', cascade="all, delete-orphan")
+    budget_alerts = relationship('BudgetAlert', backref='wedding', cascade="all, delete-orphan",
+                                 order_by="BudgetAlert.id.desc()")
+
+    # свой шаблон приглашения (invitation_templates.py); нет — шаблон по умолчанию
+    invitation_template = relationship('InvitationTemplate', backref='wedding', uselist=False,
+                                       cascade="all, delete-orphan")
+
+
+    # ===== агрегаты по расходам (правила — finance_calc) =====
+    @property
+    def finance(self) -> dict:
+        return finance_calc.figures_of(self.expenses)
 
-    # ===== агрегаты по расходам =====
     @hybrid_property
     def total_expenses(self) -> float:
         """Итог по расходам: берём fact если задан, иначе total."""
-        s = 0.0
-        for e in self.expenses:
-            if e.fact is not None:
-                s += e.fact or 0
-            else:
-                s += e.total or 0
-        return s
+        return self.finance["spent"]
 
     @hybrid_property
     def plan_sum(self) -> float:
-        return sum((e.plan or 0) for e in self.expenses)
+        return self.finance["plan"]
 
     @hybrid_property
     def fact_sum(self) -> float:
-        return sum(((e.fact if e.fact is not None else (e.total or 0)) or 0) for e in self.expenses)
+        return self.finance["spent"]
 
     @hybrid_property
     def prepayment_sum(self) -> float:
-        return sum((e.prepayment or 0) for e in self.expenses)
+        return self.finance["prepayment"]
 
     @hybrid_property
     def difference_sum(self) -> float:
-        return sum((e.difference or 0) for e in self.expenses)
+        return self.finance["difference"]
 
     @hybrid_property
     def persons_sum(self) -> int:
@@ -97,6 +126,11 @@ class Wedding(db.Model):
     def __repr__(self):
         return f"<Wedding {self.id}: {self.name}>"
 
+# список свадеб пользователя (index): WHERE user_id ORDER BY date DESC NULLS LAST.
+# В SQLite NULL и так идут последними при DESC, а NULLS LAST в индексе не поддерживается.
+Index("ix_wedding_user_date", Wedding.user_id, Wedding.date.desc().nullslast()).ddl_if(dialect="postgresql")
+Index("ix_wedding_user_date", Wedding.user_id, Wedding.date.desc()).ddl_if(dialect="sqlite")
+
 # =========================
 # Seating (Рассадка)
 # =========================
@@ -141,21 +175,15 @@ class Expense(db.Model):
     def __repr__(self):
         return f"<Expense {self.id} {self.category}/{self.item}>"
 
+Index("ix_expense_wedding_category", Expense.wedding_id, Expense.category)
+
 # автоподсчёт total и difference перед сохранением
 @event.listens_for(Expense, "before_insert")
 @event.listens_for(Expense, "before_update")
 def expense_autocalc(_mapper, _connection, target: Expense):
-    # total = quantity * unit_price
-    if (target.quantity is not None) and (target.unit_price is not None):
-        try:
-            target.total = (target.quantity or 0) * (target.unit_price or 0)
-        except Exception:
-            pass
-
-    # difference = fact - plan (если fact не задан, берём total)
-    p = target.plan or 0
-    f = target.fact if target.fact is not None else (target.total or 0)
-    target.difference = (f or 0) - (p or 0)
+    # total = quantity * unit_price (или unit_price), difference = (fact или total) - plan
+    target.total = finance_calc.calc_total(target.quantity, target.unit_price)
+    target.difference = finance_calc.calc_difference(target.total, target.plan, target.fact)
 
 # =========================
 # Guests
@@ -178,13 +206,14 @@ class Guest(db.Model):
     is_vip   = Column(Boolean, default=False)
     is_child = Column(Boolean, default=False)
 
-    # старая схема (оставлена для совместимости)
-    table_no = Column(Integer)
-
-    # новая схема рассадки
+    # рассадка (seating.py); номер стола в списке гостей — позиция стола
     table_id   = Column(Integer, ForeignKey("table.id"), nullable=True, index=True)
     table_seat = Column(Integer)            # позиция за столом (опционально)
 
+    # готовые приветствия приглашения (declension.py), пересчёт — при смене имени/фамилии
+    greeting_ru = Column(String(200))
+    greeting_uz = Column(String(200))
+
     table = relationship("Table", backref=backref("guests", lazy="dynamic"))
 
     @hybrid_property
@@ -198,7 +227,22 @@ class Guest(db.Model):
         return f"<Guest {self.id} {self.display_name()} ({self.persons}p)>"
 
 Index("ix_guest_wedding_status", Guest.wedding_id, Guest.status)
-Index("ix_guest_table", Guest.table_id)
+# рассадка: гости стола и гости без стола (частичный индекс)
+Index("ix_guest_wedding_table", Guest.wedding_id, Guest.table_id)
+Index(
+    "ix_guest_wedding_unassigned", Guest.wedding_id, Guest.id,
+    postgresql_where=Guest.table_id.is_(None),
+    sqlite_where=Guest.table_id.is_(None),
+)
+
+# приветствия считаем при записи, а не на каждой странице каждого экспорта
+@event.listens_for(Guest, "before_insert")
+@event.listens_for(Guest, "before_update")
+def guest_greetings(_mapper, _connection, target: Guest):
+    attrs = inspect(target).attrs
+    if (target.greeting_ru is None or attrs.name.history.has_changes()
+            or attrs.family_name.history.has_changes()):
+        target.greeting_ru, target.greeting_uz = declension.greetings(target.name, target.family_name)
 
 # =========================
 # Tasks
@@ -207,6 +251,8 @@ class Task(db.Model):
     id           = Column(Integer, primary_key=True)
     description  = Column(String(200), nullable=False)
     is_done      = Column(Boolean, default=False)
+    # порядок в чек-листе (перетаскивание, tasks.reorder); новые — в конец
+    position     = Column(Integer, nullable=False, default=0, server_default="0")
 
     wedding_id   = Column(Integer, ForeignKey('wedding.id'), nullable=False, index=True)
     wedding      = relationship("Wedding", back_populates="tasks")
@@ -214,6 +260,8 @@ class Task(db.Model):
     def __repr__(self):
         return f"<Task {self.id} done={self.is_done}>"
 
+Index("ix_task_wedding_done", Task.wedding_id, Task.is_done)
+
 # =========================
 # Sponsors / Gifts
 # =========================
@@ -231,3 +279,323 @@ class SponsorGift(db.Model):
 
     def __repr__(self):
         return f"<SponsorGift {self.id} +{self.amount or 0} from guest {self.guest_id}>"
+
+
+# =========================
+# Реплика: отметка для замера отставания (db_routing)
+# =========================
+class ReplicaHeartbeat(db.Model):
+    __tablename__ = "replica_heartbeat"
+    id = Column(Integer, primary_key=True, autoincrement=False)
+    at = Column(DateTime, nullable=False)
+
+
+# =========================
+# Архив старых свадеб
+# =========================
+def _archive_table(model):
+    """Копия таблицы модели без FK и умолчаний: строки переносятся как есть."""
+    src = model.__table__
+    table = db.Table(
+        f"{src.name}_archive",
+        *[Column(c.name, c.type, primary_key=c.primary_key, autoincrement=False, nullable=c.nullable)
+          for c in src.columns],
+    )
+    Index(f"ix_{src.name}_archive_wedding_id", table.c.wedding_id)
+    return table
+
+
+# порядок восстановления (родители раньше детей); архивация удаляет в обратном
+ARCHIVED_MODELS = (Table, Guest, SponsorGift, Expense, Task)
+ARCHIVE_TABLES = {model: _archive_table(model) for model in ARCHIVED_MODELS}
+
+
+# =========================
+# Бюджет: лимиты по категориям и алерты
+# =========================
+class BudgetCap(db.Model):
+    """Лимит на категорию расходов; spent — бегущая сумма по категории."""
+    id         = Column(Integer, primary_key=True)
+    wedding_id = Column(Integer, ForeignKey('wedding.id'), nullable=False)
+    category   = Column(String(100), nullable=False)
+    cap        = Column(Float, nullable=False)
+    spent      = Column(Float, nullable=False, default=0, server_default="0")
+    exceeded   = Column(Boolean, nullable=False, default=False, server_default=sa_false())
+
+Index("ux_budget_cap_wedding_category", BudgetCap.wedding_id, BudgetCap.category, unique=True)
+
+
+class BudgetAlert(db.Model):
+    """Срабатывание порога. Открыт, пока resolved_at пустой."""
+    id          = Column(Integer, primary_key=True)
+    wedding_id  = Column(Integer, ForeignKey('wedding.id'), nullable=False)
+    kind        = Column(String(20), nullable=False)    # warn / over / category
+    category    = Column(String(100))                   # для kind='category'
+    spent       = Column(Float, nullable=False)
+    limit       = Column(Float, nullable=False)
+    created_at  = Column(DateTime, nullable=False, default=datetime.utcnow)
+    resolved_at = Column(DateTime)
+
+Index("ix_budget_alert_wedding_open", BudgetAlert.wedding_id, BudgetAlert.resolved_at)
+
+
+# =========================
+# Приглашения: шаблон свадьбы (invitation_templates.py)
+# =========================
+class InvitationTemplate(db.Model):
+    """Разметка приглашения (JSON). version растёт при каждом сохранении — ключ кэша плана."""
+    id         = Column(Integer, primary_key=True)
+    wedding_id = Column(Integer, ForeignKey('wedding.id'), nullable=False, unique=True)
+    version    = Column(Integer, nullable=False, default=1, server_default="1")
+    spec       = Column(String, nullable=False)
+    updated_at = Column(DateTime, nullable=False, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# =========================
+# Отчёты: предрасчитанный куб (reports.py)
+# =========================
+class ReportCube(db.Model):
+    """Суммы расходов по (свадьба, категория) + измерения месяц/планировщик.
+
+    Без FK на wedding: строки удалённых свадеб чистит refresh_cube().
+    """
+    __tablename__ = "report_cube"
+
+    wedding_id = Column(Integer, primary_key=True)
+    category   = Column(String(100), primary_key=True)   # '' если категория пустая
+    user_id    = Column(Integer)
+    ym         = Column(Integer)                         # год*100 + месяц даты свадьбы, NULL — без даты
+
+    count      = Column(Integer, nullable=False, default=0)
+    plan       = Column(Float, nullable=False, default=0)
+    fact       = Column(Float, nullable=False, default=0)
+    prepayment = Column(Float, nullable=False, default=0)
+    total      = Column(Float, nullable=False, default=0)
+    spent      = Column(Float, nullable=False, default=0)
+    difference = Column(Float, nullable=False, default=0)
+
+Index("ix_report_cube_ym", ReportCube.ym)
+Index("ix_report_cube_user", ReportCube.user_id)
+
+
+class ReportCubeState(db.Model):
+    """С какой версии свадьбы посчитаны её строки куба."""
+    __tablename__ = "report_cube_state"
+
+    wedding_id = Column(Integer, primary_key=True)
+    version    = Column(Integer, nullable=False)
+
+
+# =========================
+# Версия свадьбы (ETag / кэш)
+# =========================
+_VERSIONED_CHILDREN = (Expense, Guest, Table, Task, SponsorGift)
+_PENDING_BUMPS = "wedding_version_bumps"
+
+
+def _remember_bump(target):
+    sess = object_session(target)
+    if sess is None:
+        return
+    ids = sess.info.setdefault(_PENDING_BUMPS, set())
+    if target.wedding_id is not None:
+        ids.add(target.wedding_id)
+    # ребёнка перенесли в другую свадьбу — старая тоже поменялась
+    hist = db.inspect(target).attrs.wedding_id.history
+    ids.update(x for x in (hist.deleted or ()) if x is not None)
+
+
+for _cls in _VERSIONED_CHILDREN:
+    for _evt in ("after_insert", "after_update", "after_delete"):
+        event.listen(_cls, _evt, lambda _m, _c, target: _remember_bump(target))
+
+
+@event.listens_for(Wedding, "before_update")
+def wedding_version_autobump(_mapper, _connection, target: Wedding):
+    # меняются собственные поля свадьбы (не просто коллекции детей)
+    sess = object_session(target)
+    if sess is not None and sess.is_modified(target, include_collections=False):
+        target.version = Wedding.version + 1
+
+
+@event.listens_for(db.session, "after_flush")
+def wedding_version_flush(session, _flush_context):
+    """Один UPDATE на все затронутые за flush свадьбы."""
+    ids = session.info.pop(_PENDING_BUMPS, None)
+    if ids:
+        _bump_versions(session, ids)
+
+
+def _bump_versions(session, ids):
+    session.connection().execute(
+        Wedding.__table__.update()
+        .where(Wedding.__table__.c.id.in_(sorted(ids)))
+        .values(version=Wedding.__table__.c.version + 1)
+    )
+    # загруженные в сессию объекты перечитают version при следующем обращении
+    for wid in ids:
+        w = session.identity_map.get(session.identity_key(Wedding, wid))
+        if w is not None:
+            session.expire(w, ["version"])
+
+
+def touch_wedding(wedding_id: int) -> None:
+    """Ручной bump для bulk-UPDATE/DELETE, которые обходят ORM-события."""
+    _bump_versions(db.session, {wedding_id})
+
+
+# =========================
+# Бюджет: бегущие суммы и алерты
+# =========================
+# Расход меняется -> в session.info копится дельта «израсходовано» по
+# (свадьба, категория); в after_flush она одним UPDATE прибавляется к
+# Wedding.spent_total и BudgetCap.spent, затем пороги проверяются только
+# у затронутых свадеб. Полный пересчёт — recalc_budget() (bulk-операции, сиды).
+BUDGET_WARN = 0.8
+BUDGET_OVER = 1.0
+_BUDGET_STATES = ("ok", "warn", "over")
+_PENDING_SPENT = "budget_spent_deltas"
+_PENDING_RECHECK = "budget_recheck"
+
+
+def budget_state_for(budget, spent) -> str:
+    if not budget or budget <= 0:
+        return "ok"
+    if spent >= budget * BUDGET_OVER:
+        return "over"
+    if spent >= budget * BUDGET_WARN:
+        return "warn"
+    return "ok"
+
+
+def _committed(target, attr):
+    hist = db.inspect(target).attrs[attr].history
+    return hist.deleted[0] if hist.deleted else getattr(target, attr)
+
+
+def _remember_spent(target, new: bool, old: bool):
+    sess = object_session(target)
+    if sess is None:
+        return
+    deltas = sess.info.setdefault(_PENDING_SPENT, {})
+    if old:
+        key = (_committed(target, "wedding_id"), _committed(target, "category"))
+        spent = finance_calc.calc_spent(_committed(target, "total"), _committed(target, "fact"))
+        deltas[key] = deltas.get(key, 0.0) - spent
+    if new:
+        key = (target.wedding_id, target.category)
+        deltas[key] = deltas.get(key, 0.0) + finance_calc.calc_spent(target.total, target.fact)
+
+
+event.listen(Expense, "after_insert", lambda _m, _c, target: _remember_spent(target, new=True, old=False))
+event.listen(Expense, "after_update", lambda _m, _c, target: _remember_spent(target, new=True, old=True))
+event.listen(Expense, "after_delete", lambda _m, _c, target: _remember_spent(target, new=False, old=True))
+
+
+@event.listens_for(Wedding, "after_update")
+def wedding_budget_changed(_mapper, _connection, target: Wedding):
+    if db.inspect(target).attrs.budget.history.has_changes():
+        sess = object_session(target)
+        sess.info.setdefault(_PENDING_RECHECK, set()).add(target.id)
+
+
+@event.listens_for(db.session, "after_flush")
+def budget_flush(session, _flush_context):
+    deltas = {k: d for k, d in (session.info.pop(_PENDING_SPENT, None) or {}).items() if d}
+    ids = session.info.pop(_PENDING_RECHECK, set()) | {wid for wid, _ in deltas}
+    if not ids:
+        return
+    conn = session.connection()
+    w, c = Wedding.__table__, BudgetCap.__table__
+    if deltas:
+        per_wedding = {}
+        for (wid, _cat), d in deltas.items():
+            per_wedding[wid] = per_wedding.get(wid, 0.0) + d
+        conn.execute(
+            w.update().where(w.c.id == bindparam("wid")).values(spent_total=w.c.spent_total + bindparam("d")),
+            [{"wid": wid, "d": d} for wid, d in per_wedding.items()],
+        )
+        conn.execute(
+            c.update().where(c.c.wedding_id == bindparam("wid"), c.c.category == bindparam("cat"))
+            .values(spent=c.c.spent + bindparam("d")),
+            [{"wid": wid, "cat": cat, "d": d} for (wid, cat), d in deltas.items()],
+        )
+    evaluate_budget(conn, ids)
+    _expire_budget(session, ids)
+
+
+def evaluate_budget(connection, wedding_ids) -> None:
+    """Сравнить бегущие суммы с порогами; сменить состояние и записать/закрыть алерты."""
+    w, c, a = Wedding.__table__, BudgetCap.__table__, BudgetAlert.__table__
+    ids = sorted(wedding_ids)
+    now = datetime.utcnow()
+    rank = _BUDGET_STATES.index
+
+    rows = connection.execute(
+        select(w.c.id, w.c.budget, w.c.spent_total, w.c.budget_state).where(w.c.id.in_(ids))
+    ).all()
+    for wid, budget, spent, state in rows:
+        new = budget_state_for(budget, spent)
+        if new == state:
+            continue
+        connection.execute(w.update().where(w.c.id == wid).values(budget_state=new))
+        if rank(new) > rank(state):
+            limit = budget * (BUDGET_OVER if new == "over" else BUDGET_WARN)
+            connection.execute(a.insert().values(wedding_id=wid, kind=new, spent=spent, limit=limit, created_at=now))
+        else:
+            connection.execute(
+                a.update()
+                .where(a.c.wedding_id == wid, a.c.resolved_at.is_(None), a.c.kind.in_(_BUDGET_STATES[rank(new) + 1:]))
+                .values(resolved_at=now)
+            )
+
+    caps = connection.execute(
+        select(c.c.id, c.c.wedding_id, c.c.category, c.c.cap, c.c.spent, c.c.exceeded).where(c.c.wedding_id.in_(ids))
+    ).all()
+    for cap_id, wid, category, cap, spent, exceeded in caps:
+        now_exceeded = spent > cap
+        if now_exceeded == bool(exceeded):
+            continue
+        connection.execute(c.update().where(c.c.id == cap_id).values(exceeded=now_exceeded))
+        if now_exceeded:
+            connection.execute(a.insert().values(wedding_id=wid, kind="category", category=category,
+                                                 spent=spent, limit=cap, created_at=now))
+        else:
+            connection.execute(
+                a.update()
+                .where(a.c.wedding_id == wid, a.c.kind == "category", a.c.category == category,
+                       a.c.resolved_at.is_(None))
+                .values(resolved_at=now)
+            )
+
+
+def recalc_budget(connection, wedding_ids=None) -> None:
+    """Полный пересчёт сумм (после bulk-операций, сидов, импорта) и проверка порогов."""
+    w, c = Wedding.__table__, BudgetCap.__table__
+    spent = finance_calc.sql_columns()["spent"]
+    by_wedding = (select(func.coalesce(func.sum(spent), 0))
+                  .where(Expense.wedding_id == w.c.id).scalar_subquery())
+    by_category = (select(func.coalesce(func.sum(spent), 0))
+                   .where(Expense.wedding_id == c.c.wedding_id, Expense.category == c.c.category)
+                   .scalar_subquery())
+    upd_w, upd_c = w.update().values(spent_total=by_wedding), c.update().values(spent=by_category)
+    if wedding_ids is not None:
+        upd_w = upd_w.where(w.c.id.in_(list(wedding_ids)))
+        upd_c = upd_c.where(c.c.wedding_id.in_(list(wedding_ids)))
+    connection.execute(upd_w)
+    connection.execute(upd_c)
+    if wedding_ids is None:
+        wedding_ids = [wid for (wid,) in connection.execute(select(w.c.id))]
+    ids = list(wedding_ids)
+    for i in range(0, len(ids), 1000):
+        evaluate_budget(connection, ids[i:i + 1000])
+
+
+def _expire_budget(session, ids):
+    for wid in ids:
+        wed = session.identity_map.get(session.identity_key(Wedding, wid))
+        if wed is not None:
+            session.expire(wed, ["spent_total", "budget_state", "budget_alerts", "budget_caps"])
+    for obj in list(session.identity_map.values()):
+        if isinstance(obj, BudgetCap) and obj.wedding_id in ids:
+            session.expire(obj, ["spent", "exceeded"])
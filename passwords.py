@@ -0,0 +1,45 @@
+# passwords.py
+"""
+Хэши паролей с настраиваемой ценой.
+
+PASSWORD_HASH_METHOD — строка метода werkzeug: "scrypt:32768:8:1"
+(по умолчанию werkzeug, ~32 МБ и десятки мс на проверку),
+"scrypt:16384:8:1", "pbkdf2:sha256:600000" и т.п. Цена проверки — это
+CPU воркера на каждый вход; замер — `python -m bench.login`.
+
+Хэш хранит свой метод в префиксе ("scrypt:32768:8:1$соль$хэш"), поэтому
+смена настройки ничего не ломает: старые хэши проверяются по-старому, а
+при удачном входе пароль перехэшируется новым методом (needs_rehash).
+"""
+from __future__ import annotations
+
+from functools import lru_cache
+
+from flask import current_app, has_app_context
+from werkzeug.security import generate_password_hash, check_password_hash
+
+DEFAULT_METHOD = "scrypt:32768:8:1"
+
+
+def method() -> str:
+    if has_app_context():
+        return current_app.config.get("PASSWORD_HASH_METHOD") or DEFAULT_METHOD
+    return DEFAULT_METHOD
+
+
+@lru_cache(maxsize=16)
+def _prefix(method_: str) -> str:
+    """Полный префикс, который метод пишет в хэш ("pbkdf2" -> "pbkdf2:sha256:1000000")."""
+    return generate_password_hash("", method_).split("$", 1)[0]
+
+
+def hash_password(raw: str) -> str:
+    return generate_password_hash(raw, method())
+
+
+def verify(stored: str, raw: str) -> bool:
+    return check_password_hash(stored, raw)
+
+
+def needs_rehash(stored: str) -> bool:
+    return stored.split("$", 1)[0] != _prefix(method())
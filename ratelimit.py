@@ -0,0 +1,65 @@
+# ratelimit.py
+"""
+Скользящее окно попыток в памяти процесса (вход: по IP и по email).
+
+Ключ -> deque времён попыток за последние window секунд. Проверка и
+запись — O(1) амортизированно под одной блокировкой; ключи без свежих
+попыток вычищаются, когда их становится больше max_keys. Счётчики у
+каждого воркера свои: при N воркерах реальный порог до N * limit —
+для защиты CPU от перебора этого достаточно.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from collections import deque
+
+
+class SlidingWindowLimiter:
+    def __init__(self, limit: int, window: float, max_keys: int = 10000, clock=time.monotonic):
+        self.limit = limit
+        self.window = window
+        self.max_keys = max_keys
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._hits: dict[str, deque] = {}
+
+    def _trim(self, q: deque, now: float) -> None:
+        edge = now - self.window
+        while q and q[0] <= edge:
+            q.popleft()
+
+    def retry_after(self, key: str) -> float:
+        """0 — можно; иначе через сколько секунд освободится место в окне."""
+        now = self._clock()
+        with self._lock:
+            q = self._hits.get(key)
+            if not q:
+                return 0.0
+            self._trim(q, now)
+            if len(q) < self.limit:
+                return 0.0
+            return q[0] + self.window - now
+
+    def add(self, key: str) -> None:
+        now = self._clock()
+        with self._lock:
+            q = self._hits.get(key)
+            if q is None:
+                if len(self._hits) >= self.max_keys:
+                    self._prune(now)
+                q = self._hits[key] = deque()
+            self._trim(q, now)
+            q.append(now)
+            # больше limit хранить незачем — окно и так закрыто
+            while len(q) > self.limit:
+                q.popleft()
+
+    def reset(self, key: str) -> None:
+        with self._lock:
+            self._hits.pop(key, None)
+
+    def _prune(self, now: float) -> None:
+        edge = now - self.window
+        for key in [k for k, q in self._hits.items() if not q or q[-1] <= edge]:
+            del self._hits[key]
@@ -0,0 +1,261 @@
+# reports.py
+"""
+Сводные финансовые отчёты по всем свадьбам: категории, месяцы, планировщики,
+план/факт. Всё считается в базе (GROUP BY + оконные функции).
+
+Источник фактов — строки (свадьба, категория) с измерениями user_id и ym
+(год*100+месяц даты свадьбы):
+    live — подзапрос по expense JOIN wedding;
+    cube — таблица report_cube, пересчитывается инкрементально: только
+           свадьбы, чья Wedding.version ушла вперёд (refresh_cube). Гоняет
+           его cron (`flask --app app report-cube`, раз в минуту-пять), а
+           не запрос отчёта — отчёт только читает, куб отстаёт на период cron.
+Зерно куба — (свадьба, категория) с ym как колонкой: у расхода нет своей
+даты, месяц — это месяц свадьбы, так что помесячные отчёты — GROUP BY ym
+по кубу, а variance по свадьбам берётся из того же куба.
+Отчёты поверх обоих источников одинаковые; архивные свадьбы (archive.py)
+не входят ни в один.
+"""
+from __future__ import annotations
+
+import threading
+from dataclasses import dataclass
+from datetime import date
+
+from sqlalchemy import func, select, insert, delete, literal, Integer, Float, cast, extract, or_
+from sqlalchemy.dialects import postgresql, sqlite
+
+import finance_calc
+from models import db, Wedding, Expense, User, ReportCube, ReportCubeState
+
+REPORTS = ("totals", "by_category", "by_month", "by_planner", "variance")
+_REFRESH_CHUNK = 500
+# refresh_cube: потоки процесса — по очереди; воркеры на Postgres — advisory lock
+_REFRESH_LOCK = threading.Lock()
+_REFRESH_LOCK_KEY = 0x63756265   # 'cube'
+
+
+@dataclass
+class Filters:
+    date_from: int | None = None     # ym, включительно
+    date_to: int | None = None
+    user_id: int | None = None
+    category: str | None = None
+    limit: int = 20                  # строк в variance
+
+    @classmethod
+    def from_args(cls, args) -> "Filters":
+        def ym(value):
+            # "2025-03" / "2025-03-14" -> 202503
+            if not value:
+                return None
+            parts = value.split("-")
+            try:
+                return int(parts[0]) * 100 + (int(parts[1]) if len(parts) > 1 else 1)
+            except ValueError:
+                return None
+
+        return cls(
+            date_from=ym(args.get("from")),
+            date_to=ym(args.get("to")),
+            user_id=args.get("user_id", type=int),
+            category=args.get("category") or None,
+            limit=min(args.get("limit", 20, type=int), 500),
+        )
+
+
+# ----------------------------
+# Источники фактов
+# ----------------------------
+def _ym_expr():
+    return cast(extract("year", Wedding.date), Integer) * 100 + cast(extract("month", Wedding.date), Integer)
+
+
+def _live_facts(wedding_ids=None):
+    cols = finance_calc.sql_columns()
+    stmt = (
+        select(
+            Expense.wedding_id.label("wedding_id"),
+            func.coalesce(Expense.category, literal("")).label("category"),
+            Wedding.user_id.label("user_id"),
+            _ym_expr().label("ym"),
+            func.count(Expense.id).label("count"),
+            *[func.sum(expr).label(name) for name, expr in cols.items()],
+        )
+        .join(Wedding, Wedding.id == Expense.wedding_id)
+        # архивные свадьбы (archive.py) не считаем ни здесь, ни в кубе
+        .where(Wedding.archived_at.is_(None))
+        .group_by(Expense.wedding_id, func.coalesce(Expense.category, literal("")), Wedding.user_id, _ym_expr())
+    )
+    if wedding_ids is not None:
+        stmt = stmt.where(Expense.wedding_id.in_(wedding_ids))
+    return stmt
+
+
+def _facts(source: str):
+    if source == "cube":
+        return ReportCube.__table__.alias("f")
+    return _live_facts().subquery("f")
+
+
+def _filtered(stmt, f, flt: Filters):
+    if flt.date_from is not None:
+        stmt = stmt.where(f.c.ym >= flt.date_from)
+    if flt.date_to is not None:
+        stmt = stmt.where(f.c.ym <= flt.date_to)
+    if flt.user_id is not None:
+        stmt = stmt.where(f.c.user_id == flt.user_id)
+    if flt.category is not None:
+        stmt = stmt.where(f.c.category == flt.category)
+    return stmt
+
+
+def _sums(f):
+    return [func.coalesce(func.sum(f.c[name]), 0).label(name) for name in ("count",) + finance_calc.SUMS]
+
+
+def _rows(stmt):
+    rows = [dict(r) for r in db.session.execute(stmt).mappings()]
+    for r in rows:
+        for k, v in r.items():
+            if isinstance(v, date):
+                r[k] = v.isoformat()
+    return rows
+
+
+# ----------------------------
+# Отчёты
+# ----------------------------
+def report_totals(f, flt):
+    stmt = _filtered(select(func.count(func.distinct(f.c.wedding_id)).label("weddings"), *_sums(f)), f, flt)
+    return _rows(stmt)[0]
+
+
+def report_by_category(f, flt):
+    spent = func.sum(f.c.spent)
+    stmt = (
+        select(f.c.category, func.count(func.distinct(f.c.wedding_id)).label("weddings"), *_sums(f),
+               (spent / func.nullif(func.sum(spent).over(), 0)).label("share"))
+        .group_by(f.c.category)
+        .order_by(spent.desc())
+    )
+    return _rows(_filtered(stmt, f, flt))
+
+
+def report_by_month(f, flt):
+    spent = func.sum(f.c.spent)
+    stmt = (
+        select(f.c.ym, func.count(func.distinct(f.c.wedding_id)).label("weddings"), *_sums(f),
+               func.sum(spent).over(order_by=f.c.ym).label("cumulative_spent"))
+        .where(f.c.ym.is_not(None))
+        .group_by(f.c.ym)
+        .order_by(f.c.ym)
+    )
+    rows = _rows(_filtered(stmt, f, flt))
+    for r in rows:
+        r["month"] = f"{r['ym'] // 100:04d}-{r['ym'] % 100:02d}"
+    return rows
+
+
+def report_by_planner(f, flt):
+    # сначала агрегат по user_id, имена — JOIN уже к свёрнутым строкам
+    spent = func.sum(f.c.spent)
+    agg = _filtered(
+        select(f.c.user_id, func.count(func.distinct(f.c.wedding_id)).label("weddings"), *_sums(f),
+               func.rank().over(order_by=spent.desc()).label("rank"))
+        .group_by(f.c.user_id), f, flt,
+    ).subquery("p")
+    stmt = (
+        select(agg, User.email, User.name)
+        .outerjoin(User, User.id == agg.c.user_id)
+        .order_by(agg.c.rank)
+    )
+    return _rows(stmt)
+
+
+def report_variance(f, flt):
+    """План/факт по свадьбам: самые большие перерасходы сверху."""
+    plan, spent = func.sum(f.c.plan), func.sum(f.c.spent)
+    variance = spent - plan
+    agg = _filtered(
+        select(f.c.wedding_id, plan.label("plan"), spent.label("spent"), variance.label("variance"),
+               func.rank().over(order_by=variance.desc()).label("rank"),
+               cast(func.percent_rank().over(order_by=variance), Float).label("percentile"))
+        .group_by(f.c.wedding_id), f, flt,
+    ).order_by(variance.desc()).limit(flt.limit).subquery("v")
+    stmt = (
+        select(agg, Wedding.name, Wedding.date, Wedding.budget,
+               (agg.c.spent - func.coalesce(Wedding.budget, 0)).label("over_budget"))
+        .join(Wedding, Wedding.id == agg.c.wedding_id)
+        .order_by(agg.c.rank)
+    )
+    return _rows(stmt)
+
+
+_BUILDERS = {
+    "totals": report_totals,
+    "by_category": report_by_category,
+    "by_month": report_by_month,
+    "by_planner": report_by_planner,
+    "variance": report_variance,
+}
+
+
+def build(flt: Filters, source: str = "live", reports=REPORTS) -> dict:
+    f = _facts(source)
+    return {name: _BUILDERS[name](f, flt) for name in reports}
+
+
+# ----------------------------
+# Куб
+# ----------------------------
+def _upsert_state(rows: list[dict]):
+    """INSERT … ON CONFLICT в report_cube_state — гонка двух пересчётов не роняет запрос."""
+    pg = db.session.get_bind(ReportCubeState.__mapper__).dialect.name == "postgresql"
+    stmt = (postgresql.insert if pg else sqlite.insert)(ReportCubeState)
+    db.session.execute(stmt.on_conflict_do_update(index_elements=["wedding_id"],
+                                                  set_={"version": stmt.excluded.version}), rows)
+
+
+def refresh_cube() -> int:
+    """Пересчитать строки куба для изменившихся свадеб. Возвращает их число.
+
+    Пересчёты идут по очереди: в процессе — под _REFRESH_LOCK, между
+    воркерами на Postgres — под pg_advisory_xact_lock; второй после первого
+    уже не видит устаревших свадеб.
+    """
+    with _REFRESH_LOCK:
+        try:
+            n = _refresh_cube()
+            db.session.commit()
+        except BaseException:
+            db.session.rollback()
+            raise
+    return n
+
+
+def _refresh_cube() -> int:
+    if db.session.get_bind(ReportCubeState.__mapper__).dialect.name == "postgresql":
+        db.session.execute(select(func.pg_advisory_xact_lock(_REFRESH_LOCK_KEY)))
+
+    # удалённые и архивные свадьбы
+    live = select(Wedding.id).where(Wedding.archived_at.is_(None))
+    db.session.execute(delete(ReportCube).where(ReportCube.wedding_id.not_in(live)))
+    db.session.execute(delete(ReportCubeState).where(ReportCubeState.wedding_id.not_in(live)))
+
+    stale = db.session.execute(
+        select(Wedding.id, Wedding.version)
+        .outerjoin(ReportCubeState, ReportCubeState.wedding_id == Wedding.id)
+        .where(Wedding.archived_at.is_(None),
+               or_(ReportCubeState.version.is_(None), ReportCubeState.version != Wedding.version))
+    ).all()
+
+    cube_cols = ["wedding_id", "category", "user_id", "ym", "count", *finance_calc.SUMS]
+    for i in range(0, len(stale), _REFRESH_CHUNK):
+        chunk = stale[i:i + _REFRESH_CHUNK]
+        ids = [wid for wid, _ in chunk]
+        db.session.execute(delete(ReportCube).where(ReportCube.wedding_id.in_(ids)))
+        db.session.execute(insert(ReportCube).from_select(cube_cols, _live_facts(ids)))
+        # версия взята до пересчёта: если свадьбу успели изменить — догоним в следующий раз
+        _upsert_state([{"wedding_id": wid, "version": v} for wid, v in chunk])
+    return len(stale)
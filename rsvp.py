@@ -0,0 +1,208 @@
+# rsvp.py
+"""
+Публичный RSVP по QR из приглашения.
+
+Токен — подписанный itsdangerous [guest_id, wedding_id, персон в приглашении,
+последний день приёма ответов] (toordinal; день свадьбы + RSVP_CLOSE_AFTER_DAYS,
+без даты — RSVP_TOKEN_DAYS от выпуска). И подпись, и срок проверяются без
+базы: архивируются свадьбы старше ARCHIVE_AFTER_DAYS, их токены к тому времени
+давно истекли — 410 «приём закрыт». Токены старого формата (без срока, уже
+напечатаны в приглашениях) по-прежнему принимаются, но для них — SELECT
+свадьбы: удалена или в архиве — тоже 410. Ответы гостей копятся в памяти процесса
+(последний ответ гостя побеждает) и пишутся пачкой: раз в RSVP_FLUSH_SECONDS
+или при RSVP_FLUSH_MAX ответах — одна транзакция, один executemany UPDATE.
+Так волна сканирований после рассылки держит одно соединение, а не сотни.
+Цена — до RSVP_FLUSH_SECONDS задержки и потеря буфера при падении процесса.
+"""
+from __future__ import annotations
+
+import atexit
+import threading
+import time
+from datetime import date, datetime, timedelta
+
+from flask import Blueprint, current_app, render_template, request, abort, url_for
+from itsdangerous import URLSafeSerializer, BadSignature
+from sqlalchemy import select, update, bindparam
+
+from models import db, Guest, Wedding
+from events import publish
+import metrics
+
+rsvp_bp = Blueprint("rsvp_bp", __name__, url_prefix="/rsvp")
+
+STATUSES = ("confirmed", "declined")
+
+
+# ----------------------------
+# Токены
+# ----------------------------
+def _serializer() -> URLSafeSerializer:
+    return URLSafeSerializer(current_app.config["SECRET_KEY"], salt="rsvp")
+
+
+def _last_day(wedding_id: int) -> int:
+    """Последний день приёма ответов (date.toordinal)."""
+    wedding = db.session.get(Wedding, wedding_id)   # одна на все приглашения — из identity map
+    day = wedding.date if wedding is not None else None
+    if day is None:
+        return (date.today() + timedelta(days=current_app.config["RSVP_TOKEN_DAYS"])).toordinal()
+    if isinstance(day, datetime):
+        day = day.date()
+    return (day + timedelta(days=current_app.config["RSVP_CLOSE_AFTER_DAYS"])).toordinal()
+
+
+def make_token(guest: Guest) -> str:
+    return _serializer().dumps([guest.id, guest.wedding_id, guest.family_count or 0,
+                                _last_day(guest.wedding_id)])
+
+
+def rsvp_url(guest: Guest) -> str:
+    return url_for("rsvp_bp.rsvp_form", token=make_token(guest), _external=True)
+
+
+def read_token(token: str):
+    """(guest_id, wedding_id, persons, последний день или None — старый токен) или 404 — без базы."""
+    try:
+        payload = _serializer().loads(token)
+        if len(payload) == 3:
+            payload = [*payload, None]
+        guest_id, wedding_id, persons, last_day = payload
+    except (BadSignature, ValueError, TypeError):
+        abort(404)
+    return guest_id, wedding_id, persons, last_day
+
+
+# ----------------------------
+# Буфер записей
+# ----------------------------
+class RsvpBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._pending: dict[int, dict] = {}
+        self._wake = threading.Event()
+        self._thread = None
+        self._app = None
+
+    def add(self, app, guest_id: int, wedding_id: int, status: str, family_count: int | None):
+        with self._lock:
+            self._pending[guest_id] = {"gid": guest_id, "wid": wedding_id,
+                                       "status": status, "family_count": family_count}
+            size = len(self._pending)
+            if self._thread is None:
+                # поток создаётся в самом воркере (после fork)
+                self._app = app
+                self._thread = threading.Thread(target=self._run, name="rsvp-flush", daemon=True)
+                self._thread.start()
+        if size >= app.config["RSVP_FLUSH_MAX"]:
+            self._wake.set()
+
+    def _run(self):
+        while True:
+            self._wake.wait(self._app.config["RSVP_FLUSH_SECONDS"])
+            self._wake.clear()
+            try:
+                self.flush()
+            except Exception:
+                self._app.logger.exception("rsvp flush failed")
+
+    def flush(self) -> int:
+        with self._lock:
+            batch, self._pending = list(self._pending.values()), {}
+        if not batch:
+            return 0
+        with self._app.app_context():
+            try:
+                self._write(batch)
+            except Exception:
+                db.session.rollback()
+                # вернуть в буфер, не затирая более свежие ответы
+                with self._lock:
+                    for row in batch:
+                        self._pending.setdefault(row["gid"], row)
+                raise
+            finally:
+                db.session.remove()
+        metrics.incr("rsvp.flushed", len(batch))
+        metrics.incr("rsvp.flushes")
+        return len(batch)
+
+    @staticmethod
+    def _write(batch):
+        g = Guest.__table__
+        with_count = [r for r in batch if r["family_count"] is not None]
+        status_only = [r for r in batch if r["family_count"] is None]
+        # wedding_id в WHERE — ответ не может задеть гостя чужой свадьбы
+        where = (g.c.id == bindparam("gid")) & (g.c.wedding_id == bindparam("wid"))
+        conn = db.session.connection()
+        if with_count:
+            conn.execute(update(g).where(where).values(status=bindparam("status"),
+                                                       family_count=bindparam("family_count")), with_count)
+        if status_only:
+            conn.execute(update(g).where(where).values(status=bindparam("status")), status_only)
+        # bulk UPDATE мимо ORM-событий — версии свадеб поднимаем сами
+        w = Wedding.__table__
+        conn.execute(update(w).where(w.c.id.in_({r["wid"] for r in batch})).values(version=w.c.version + 1))
+        for r in batch:
+            publish(r["wid"], "rsvp", {"guest_id": r["gid"], "status": r["status"],
+                                       "family_count": r["family_count"]})
+        db.session.commit()
+
+
+buffer = RsvpBuffer()
+
+
+@atexit.register
+def _flush_on_exit():
+    if buffer._app is not None:
+        try:
+            buffer.flush()
+        except Exception:
+            pass
+
+
+# ----------------------------
+# Endpoints
+# ----------------------------
+def _closed(wedding_id: int, last_day: int | None):
+    """Приём ответов закрыт: срок токена вышел (без базы) или, для старого токена,
+    свадьба удалена / в архиве (archive.py) — 410, а не «принят»."""
+    if last_day is not None:
+        closed = date.today().toordinal() > last_day
+    else:
+        row = db.session.execute(select(Wedding.archived_at).where(Wedding.id == wedding_id)).first()
+        closed = row is None or row.archived_at is not None
+    if closed:
+        metrics.incr("rsvp.closed")
+        return render_template("rsvp.html", closed=True), 410
+    return None
+
+
+@rsvp_bp.route("/<token>")
+def rsvp_form(token):
+    guest_id, wedding_id, persons, last_day = read_token(token)
+    closed = _closed(wedding_id, last_day)
+    if closed is not None:
+        return closed
+    return render_template("rsvp.html", token=token, persons=persons, done=False)
+
+
+@rsvp_bp.route("/<token>", methods=["POST"])
+def rsvp_submit(token):
+    guest_id, wedding_id, persons, last_day = read_token(token)
+    closed = _closed(wedding_id, last_day)
+    if closed is not None:
+        return closed
+    status = request.form.get("status")
+    if status not in STATUSES:
+        abort(400)
+    family_count = None
+    if persons:
+        # семья может прийти в меньшем составе, но не больше приглашённых
+        try:
+            family_count = max(1, min(int(request.form.get("family_count") or persons), persons))
+        except ValueError:
+            family_count = persons
+    buffer.add(current_app._get_current_object(), guest_id, wedding_id, status, family_count)
+    metrics.incr("rsvp.accepted")
+    return render_template("rsvp.html", token=token, persons=persons, done=True, status=status), 202
@@ -0,0 +1,213 @@
+# seating.py
+"""
+Рассадка — единственное место, где пишутся Guest.table_id / table_seat
+и столы свадьбы. Им пользуются и список гостей, и страница рассадки.
+
+Номер стола в списке гостей — позиция стола в рассадке (Table.order, id),
+с 1; номер на один больше последнего создаёт новый стол, дальше —
+SeatingError (номер из формы не должен наплодить тысячи столов). Изменения уходят в
+SSE (events.publish) после commit. commit делает вызывающий view.
+"""
+from __future__ import annotations
+
+from math import ceil
+
+from sqlalchemy import select, func, case
+
+from models import db, Wedding, Guest, Table, touch_wedding
+from events import publish
+import writebehind
+
+DEFAULT_SEATS = 12
+
+
+class SeatingError(ValueError):
+    """Неверный ввод рассадки — текст показываем пользователю."""
+
+
+# ----------------------------
+# Столы
+# ----------------------------
+def tables_of(wedding_id: int) -> list[Table]:
+    return Table.query.filter_by(wedding_id=wedding_id).order_by(Table.order, Table.id).all()
+
+
+def table_numbers(wedding_id: int) -> dict[int, int]:
+    """{table_id: номер с 1} одним SELECT."""
+    ids = db.session.scalars(
+        select(Table.id).where(Table.wedding_id == wedding_id).order_by(Table.order, Table.id)
+    )
+    return {tid: n for n, tid in enumerate(ids, start=1)}
+
+
+def add_table(wedding: Wedding, seats: int = DEFAULT_SEATS, name: str | None = None) -> Table:
+    n = Table.query.filter_by(wedding_id=wedding.id).count() + 1
+    t = Table(wedding_id=wedding.id, name=name or f"Стол {n}", seats=seats, order=n - 1)
+    db.session.add(t)
+    db.session.flush()
+    publish(wedding.id, "reset")
+    return t
+
+
+def table_for_number(wedding_id: int, number: int | None) -> Table | None:
+    """Стол по номеру из списка гостей; следующий за последним номер — новый стол."""
+    if not number or number < 1:
+        return None
+    tables = tables_of(wedding_id)
+    if number > len(tables) + 1:
+        raise SeatingError(f"нет стола №{number}: столов {len(tables)}, новый — №{len(tables) + 1}")
+    if number == len(tables) + 1:
+        t = Table(wedding_id=wedding_id, name=f"Стол {number}", seats=DEFAULT_SEATS, order=len(tables))
+        db.session.add(t)
+        db.session.flush()
+        publish(wedding_id, "reset")
+        tables.append(t)
+    return tables[number - 1]
+
+
+def delete_table(table: Table) -> None:
+    Guest.query.filter_by(table_id=table.id).update({Guest.table_id: None, Guest.table_seat: None})
+    db.session.delete(table)
+    publish(table.wedding_id, "reset")
+
+
+# ----------------------------
+# Гости
+# ----------------------------
+def occupancy(table_ids) -> dict[int, dict]:
+    """{table_id: {table_id, persons, seats}} одним агрегатом."""
+    tids = [tid for tid in set(table_ids) if tid]
+    if not tids:
+        return {}
+    # пустой стол после outer join даёт одну строку с Guest.id IS NULL — это 0 персон
+    persons = case((Guest.id.is_(None), 0), else_=func.coalesce(Guest.family_count, 1))
+    rows = db.session.execute(
+        select(Table.id, Table.seats, func.coalesce(func.sum(persons), 0))
+        .outerjoin(Guest, Guest.table_id == Table.id)
+        .where(Table.id.in_(tids))
+        .group_by(Table.id, Table.seats)
+    )
+    return {tid: {"table_id": tid, "persons": int(persons), "seats": seats} for tid, seats, persons in rows}
+
+
+def assign(guest: Guest, table_id: int | None, seat: int | None = None) -> list[dict]:
+    """Посадить гостя (None — снять со стола). Возвращает заполненность старого и нового столов."""
+    if table_id is not None:
+        owner = db.session.scalar(select(Table.wedding_id).where(Table.id == table_id))
+        if owner != guest.wedding_id:
+            raise ValueError("table does not belong to the guest's wedding")
+    old_table_id = guest.table_id
+    guest.table_id = table_id
+    guest.table_seat = seat if table_id is not None else None
+    db.session.flush()
+
+    occ = occupancy([old_table_id, table_id])
+    publish(guest.wedding_id, "assign", {
+        "guest_id": guest.id, "table_id": table_id, "persons": guest.family_count or 1,
+        "tables": list(occ.values()),
+    })
+    empty = {"table_id": None, "persons": 0, "seats": 0}
+    return [occ.get(old_table_id, empty), occ.get(table_id, empty)]
+
+
+@writebehind.applier("assign")
+def assign_many(wedding_id: int, moves: list[dict]) -> list[dict]:
+    """
+    Пачка пересадок одной свадьбы (writebehind): {guest_id, table_id, seat,
+    from_table_id?}. Гости и столы — по одному SELECT, один flush, одна
+    заполненность на все столы. from_table_id — где гость был у клиента;
+    не совпало с базой (с учётом предыдущих ходов пачки) — конфликт.
+    """
+    # FOR UPDATE: параллельная транзакция (другой воркер) ждёт нас и видит уже новый стол
+    guests = {g.id: g for g in Guest.query.filter(
+        Guest.id.in_({m["guest_id"] for m in moves}), Guest.wedding_id == wedding_id
+    ).with_for_update()}
+    valid = set(db.session.scalars(select(Table.id).where(
+        Table.wedding_id == wedding_id, Table.id.in_({m["table_id"] for m in moves if m["table_id"]})
+    )))
+    results, done = [], []
+    for m in moves:
+        g = guests.get(m["guest_id"])
+        if g is None:
+            results.append({"ok": False, "error": "not found"})
+        elif m["table_id"] is not None and m["table_id"] not in valid:
+            results.append({"ok": False, "error": "bad table"})
+        elif "from_table_id" in m and m["from_table_id"] != g.table_id:
+            results.append({"ok": False, "conflict": True, "guest_id": g.id, "table_id": g.table_id})
+        else:
+            done.append((len(results), g, g.table_id))
+            g.table_id = m["table_id"]
+            g.table_seat = m.get("seat") if m["table_id"] is not None else None
+            results.append(None)
+    db.session.flush()
+
+    occ = occupancy([t for _, g, old in done for t in (old, g.table_id)])
+    empty = {"table_id": None, "persons": 0, "seats": 0}
+    for i, g, old in done:
+        tables = [occ.get(old, empty), occ.get(g.table_id, empty)]
+        publish(wedding_id, "assign", {
+            "guest_id": g.id, "table_id": g.table_id, "persons": g.family_count or 1,
+            "tables": [t for t in tables if t["table_id"] is not None],
+        })
+        results[i] = {"ok": True, "updated": tables}
+    return results
+
+
+def assign_number(guest: Guest, number: int | None) -> None:
+    """Номер стола из списка гостей; пишем только если стол действительно меняется."""
+    table = table_for_number(guest.wedding_id, number)
+    table_id = table.id if table else None
+    if table_id != guest.table_id:
+        assign(guest, table_id)
+
+
+def auto_seat(wedding: Wedding, seats: int | None = None) -> None:
+    """
+    Жадная рассадка: группы по убыванию размера, каждая — за наименее
+    заполненный стол, где помещается; не помещается — новый стол.
+    Отказавшиеся гости мест не занимают.
+    """
+    tables = tables_of(wedding.id)
+    if not tables:
+        tables = [add_table(wedding, seats or DEFAULT_SEATS)]
+    seats = seats or tables[0].seats
+
+    guests = list(wedding.guests)
+    groups = sorted((g for g in guests if g.status != "declined"),
+                    key=lambda g: (g.family_count or 1), reverse=True)
+
+    total_persons = sum((g.family_count or 1) for g in groups)
+    need = ceil(max(1, total_persons) / seats)
+    while len(tables) < need:
+        t = Table(wedding_id=wedding.id, name=f"Стол {len(tables) + 1}", seats=seats, order=len(tables))
+        db.session.add(t)
+        tables.append(t)
+    db.session.flush()
+
+    target_of = {}
+    capacity = {t.id: 0 for t in tables}
+    for g in groups:
+        p = g.family_count or 1
+        target = next((t for t in sorted(tables, key=lambda x: capacity[x.id]) if capacity[t.id] + p <= t.seats), None)
+        if target is None:
+            target = Table(wedding_id=wedding.id, name=f"Стол {len(tables) + 1}", seats=seats, order=len(tables))
+            db.session.add(target)
+            db.session.flush()
+            tables.append(target)
+            capacity[target.id] = 0
+        target_of[g.id] = target.id
+        capacity[target.id] += p
+
+    # одна запись на гостя, и только если место меняется
+    for g in guests:
+        tid = target_of.get(g.id)
+        if g.table_id != tid or (tid is None and g.table_seat is not None):
+            g.table_id = tid
+            g.table_seat = None
+    publish(wedding.id, "reset")
+
+
+def clear(wedding_id: int) -> None:
+    Guest.query.filter_by(wedding_id=wedding_id).update({Guest.table_id: None, Guest.table_seat: None})
+    touch_wedding(wedding_id)  # bulk UPDATE обходит ORM-события
+    publish(wedding_id, "reset")
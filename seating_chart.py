@@ -0,0 +1,185 @@
+# seating_chart.py
+"""
+Схема рассадки для площадки (PDF, A4 альбомно): столы с названием,
+заполненностью и гостями (семья — с числом персон).
+
+Данные — один снимок: UNION ALL «столы LEFT JOIN гости» и «гости без стола»,
+так схема согласована, даже если рассадку правят в этот момент. Отказавшиеся
+гости в схему не попадают. Блоки столов идут колонками (4 на лист), длинный
+стол переносится в следующую колонку. Шрифты — из кэша процесса (invitations).
+"""
+from __future__ import annotations
+
+from io import BytesIO
+
+from sqlalchemy import select, union_all, null, func, literal
+
+from models import db, Wedding, Guest, Table
+from invitations import add_fonts
+
+PAGE_W, PAGE_H = 297, 210
+MARGIN = 10
+COLUMNS = 4
+GAP = 5
+COL_W = (PAGE_W - 2 * MARGIN - (COLUMNS - 1) * GAP) / COLUMNS
+HEADER_H = 7
+LINE_H = 4.4
+BLOCK_GAP = 4
+TOP = 30  # под заголовком листа
+
+
+# ----------------------------
+# Снимок
+# ----------------------------
+def snapshot(wedding_id: int):
+    """[(стол | None, [гости])]: столы по порядку, «без стола» — последним."""
+    t, g = Table.__table__, Guest.__table__
+    not_declined = func.coalesce(g.c.status, "") != "declined"
+    guest_cols = (g.c.id.label("guest_id"), g.c.name, g.c.family_name, g.c.family_count)
+    seated = (
+        select(t.c.id.label("table_id"), t.c.name.label("table_name"), t.c.seats,
+               t.c.order.label("table_order"), *guest_cols)
+        .select_from(t.outerjoin(g, (g.c.table_id == t.c.id) & not_declined))
+        .where(t.c.wedding_id == wedding_id)
+    )
+    unseated = (
+        select(null().label("table_id"), literal(None).label("table_name"), null().label("seats"),
+               null().label("table_order"), *guest_cols)
+        .where(g.c.wedding_id == wedding_id, g.c.table_id.is_(None), not_declined)
+    )
+    tables: dict = {}
+    for r in db.session.execute(union_all(seated, unseated)).mappings():
+        key = r["table_id"]
+        if key not in tables:
+            tables[key] = ({"id": key, "name": r["table_name"], "seats": r["seats"] or 0,
+                            "order": r["table_order"] or 0} if key is not None else None, [])
+        if r["guest_id"] is not None:
+            tables[key][1].append(r)
+
+    out = sorted((v for k, v in tables.items() if k is not None), key=lambda v: (v[0]["order"], v[0]["id"]))
+    for _, guests in out:
+        guests.sort(key=lambda r: r["guest_id"])
+    if None in tables:
+        out.append((None, sorted(tables[None][1], key=lambda r: r["guest_id"])))
+    return out
+
+
+def _persons(r) -> int:
+    return r["family_count"] or 1
+
+
+def _label(r) -> str:
+    return r["family_name"] or r["name"] or "Без имени"
+
+
+# ----------------------------
+# Вёрстка
+# ----------------------------
+class _Flow:
+    """Колонки на листе: курсор (колонка, y), новый лист по заполнении."""
+
+    def __init__(self, pdf, title: str, subtitle: str):
+        self.pdf, self.title, self.subtitle = pdf, title, subtitle
+        self.col, self.y = COLUMNS, PAGE_H  # первая же вставка откроет лист
+
+    def _page(self):
+        pdf = self.pdf
+        pdf.add_page()
+        pdf.set_xy(MARGIN, MARGIN)
+        pdf.set_font("Playfair", "I", 18)
+        pdf.set_text_color(60, 45, 35)
+        pdf.cell(PAGE_W - 2 * MARGIN, 9, self.title)
+        pdf.set_xy(MARGIN, MARGIN + 10)
+        pdf.set_font("Montserrat", "", 9)
+        pdf.set_text_color(110, 110, 110)
+        pdf.cell(PAGE_W - 2 * MARGIN, 5, self.subtitle)
+        pdf.set_xy(MARGIN, PAGE_H - MARGIN)
+        pdf.cell(PAGE_W - 2 * MARGIN, 4, f"стр. {pdf.page_no()}", align="R")
+        self.col, self.y = 0, TOP
+
+    def room(self) -> float:
+        return PAGE_H - MARGIN - 4 - self.y
+
+    def next_column(self):
+        self.col += 1
+        self.y = TOP
+        if self.col >= COLUMNS:
+            self._page()
+
+    @property
+    def x(self) -> float:
+        return MARGIN + self.col * (COL_W + GAP)
+
+
+def _draw_block(flow: _Flow, title: str, badge: str, over: bool, guests):
+    pdf = flow.pdf
+    rows = list(guests) or [None]
+    first = True
+    while rows:
+        # в колонку влезает хотя бы заголовок и одна строка — иначе следующая
+        if flow.col >= COLUMNS or flow.room() < HEADER_H + LINE_H:
+            flow.next_column()
+        fit = max(1, int((flow.room() - HEADER_H - 1) // LINE_H))
+        part, rows = rows[:fit], rows[fit:]
+        h = HEADER_H + len(part) * LINE_H + 1
+        x, y = flow.x, flow.y
+
+        pdf.set_fill_color(253, 236, 242) if not over else pdf.set_fill_color(254, 226, 226)
+        pdf.rect(x, y, COL_W, HEADER_H, style="F")
+        pdf.set_draw_color(220, 200, 210)
+        pdf.rect(x, y, COL_W, h)
+        pdf.set_xy(x + 2, y + 1)
+        pdf.set_font("Montserrat", "B", 10)
+        pdf.set_text_color(60, 45, 35)
+        pdf.cell(COL_W - 22, 5, title if first else f"{title} (продолжение)")
+        pdf.set_text_color(190, 40, 40) if over else pdf.set_text_color(40, 120, 80)
+        pdf.cell(18, 5, badge, align="R")
+
+        pdf.set_font("Montserrat", "", 8.5)
+        pdf.set_text_color(70, 70, 70)
+        yy = y + HEADER_H + 0.5
+        for r in part:
+            pdf.set_xy(x + 2, yy)
+            if r is None:
+                pdf.cell(COL_W - 4, LINE_H, "—")
+            else:
+                pdf.cell(COL_W - 12, LINE_H, _label(r))
+                pdf.cell(8, LINE_H, str(_persons(r)), align="R")
+            yy += LINE_H
+        flow.y = y + h + BLOCK_GAP
+        first = False
+
+
+def gen_seating_chart_pdf(wedding: Wedding) -> BytesIO:
+    from fpdf import FPDF
+
+    data = snapshot(wedding.id)
+    seated = sum(_persons(r) for t, guests in data if t is not None for r in guests)
+    free = sum(_persons(r) for t, guests in data if t is None for r in guests)
+    n_tables = sum(1 for t, _ in data if t is not None)
+
+    pdf = FPDF(format="A4", orientation="L", unit="mm")
+    pdf.set_auto_page_break(False)
+    pdf.set_line_width(0.2)
+    add_fonts(pdf)
+
+    title = f"Рассадка — {wedding.name}"
+    parts = [wedding.date.strftime("%d.%m.%Y")] if wedding.date else []
+    parts += [f"столов: {n_tables}", f"за столами: {seated} перс."]
+    if free:
+        parts.append(f"без стола: {free} перс.")
+    flow = _Flow(pdf, title, " · ".join(parts))
+
+    for t, guests in data:
+        if t is None:
+            _draw_block(flow, "Без стола", str(free), False, guests)
+            continue
+        persons = sum(_persons(r) for r in guests)
+        _draw_block(flow, t["name"] or f"Стол {t['id']}", f"{persons}/{t['seats']}",
+                    persons > t["seats"], guests)
+    if flow.col >= COLUMNS:
+        flow.next_column()  # пустая свадьба — хотя бы лист с заголовком
+
+    bio = BytesIO(bytes(pdf.output()))
+    bio.seek(0)
+    return bio
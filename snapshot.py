@@ -0,0 +1,364 @@
+# snapshot.py
+"""
+Снимок свадьбы целиком: резервная копия и клонирование.
+
+Формат — gzip JSON Lines, читается и пишется потоком:
+
+    {"format": "wedding-snapshot", "version": 1, "created_at": "...", "wedding": {...}}
+    {"kind": "table", "columns": ["id", "name", "seats", "order"]}
+    [17, "Стол 1", 12, 0]
+    ...
+    {"kind": "guest", "columns": [...]}
+    ...
+    {"end": true, "counts": {"table": 20, "guest": 2000, ...}}
+
+Строка данных — массив значений в порядке columns (без wedding_id), так
+файл в разы меньше, чем с ключами. Разделы идут от родителей к детям
+(столы -> гости -> подарки), поэтому импорт однопроходный: старые id
+столов и гостей переводятся в новые по мере вставки. Колонки, которых нет
+в текущей схеме, пропускаются, недостающие получают умолчания — старый
+снимок читается новой версией приложения. Без строки end (файл обрезан)
+импорт откатывается.
+
+Загрузка файла ограничена MAX_CONTENT_LENGTH, раздел — SNAPSHOT_MAX_ROWS
+строками, строка файла — MAX_LINE байтами после распаковки: маленький
+gzip-«бомба» не превратится в миллионы строк в одной транзакции.
+
+Импорт вставляет пачками по BATCH строк (INSERT ... VALUES на пачку,
+для столов и гостей — с RETURNING id), всё в одной транзакции. Клон —
+тот же импорт, но записи идут из SELECT напрямую, без файла:
+на свадьбу с 2000 гостей — десяток запросов.
+
+    flask --app app export-wedding 12 wedding12.jsonl.gz
+    flask --app app import-wedding wedding12.jsonl.gz --user-id 3
+"""
+from __future__ import annotations
+
+import gzip
+import io
+import json
+import zlib
+from datetime import date, datetime
+
+from flask import (Blueprint, Response, abort, current_app, flash, redirect, request,
+                   stream_with_context, url_for)
+from flask_login import current_user, login_required
+from sqlalchemy import Date, DateTime, insert, select
+from sqlalchemy.exc import IntegrityError
+from werkzeug.exceptions import RequestEntityTooLarge
+
+import declension
+import finance_calc
+import metrics
+from models import (db, Wedding, Table, Guest, SponsorGift, Expense, Task, BudgetCap,
+                    InvitationTemplate, ARCHIVE_TABLES, recalc_budget)
+
+snapshot_bp = Blueprint("snapshot_bp", __name__, url_prefix="/wedding")
+
+FORMAT = "wedding-snapshot"
+FORMAT_VERSION = 1
+BATCH = 1000
+MAX_LINE = 1024 * 1024   # байт на строку JSON после распаковки
+WEDDING_FIELDS = ("name", "date", "budget")
+
+# раздел -> (модель, колонки, которые не переносим, {FK: раздел})
+KINDS = (
+    ("table", Table, (), {}),
+    ("guest", Guest, (), {"table_id": "table"}),
+    ("sponsor_gift", SponsorGift, (), {"guest_id": "guest"}),
+    ("expense", Expense, (), {}),
+    ("task", Task, (), {}),
+    ("budget_cap", BudgetCap, ("spent", "exceeded"), {}),   # spent пересчитывается
+    ("invitation_template", InvitationTemplate, ("version", "updated_at"), {}),
+)
+_BY_KIND = {kind: (model, skip, refs) for kind, model, skip, refs in KINDS}
+# на эти разделы ссылаются другие — их новые id нужны при вставке
+_REFERENCED = {ref for *_, refs in KINDS for ref in refs.values()}
+
+
+class SnapshotError(ValueError):
+    """Снимок не читается или не той версии — текст показываем пользователю."""
+
+
+# ----------------------------
+# Экспорт
+# ----------------------------
+def _source(model, wedding: Wedding):
+    """Таблица, где сейчас лежат строки свадьбы (архивная — в *_archive)."""
+    if wedding.archived_at is not None and model in ARCHIVE_TABLES:
+        return ARCHIVE_TABLES[model]
+    return model.__table__
+
+
+def records(wedding: Wedding):
+    """Снимок как поток записей: заголовок, (columns, строки...) на раздел, end."""
+    yield {
+        "format": FORMAT, "version": FORMAT_VERSION,
+        "created_at": datetime.utcnow().isoformat(timespec="seconds"),
+        "wedding": {f: getattr(wedding, f) for f in WEDDING_FIELDS},
+    }
+    counts = {}
+    for kind, model, skip, _refs in KINDS:
+        src = _source(model, wedding)
+        cols = [c for c in src.columns if c.name != "wedding_id" and c.name not in skip]
+        yield {"kind": kind, "columns": [c.name for c in cols]}
+        result = db.session.execute(
+            select(*cols).where(src.c.wedding_id == wedding.id).order_by(src.c.id)
+            .execution_options(yield_per=BATCH)
+        )
+        n = 0
+        for row in result:
+            yield list(row)
+            n += 1
+        counts[kind] = n
+    yield {"end": True, "counts": counts}
+
+
+def _default(value):
+    if isinstance(value, (date, datetime)):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} не сериализуется")
+
+
+def dump(wedding: Wedding, chunk: int = 64 * 1024):
+    """Поток gzip-байтов снимка (для Response и файла)."""
+    enc = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"), default=_default)
+    gz = zlib.compressobj(6, zlib.DEFLATED, 31)   # 31 — формат gzip
+    buf = []
+    size = 0
+    for rec in records(wedding):
+        line = enc.encode(rec) + "\n"
+        buf.append(line)
+        size += len(line)
+        if size >= chunk:
+            out = gz.compress("".join(buf).encode("utf-8"))
+            buf, size = [], 0
+            if out:
+                yield out
+    yield gz.compress("".join(buf).encode("utf-8")) + gz.flush()
+    metrics.incr("snapshot.export")
+
+
+# ----------------------------
+# Импорт
+# ----------------------------
+def parse(fileobj):
+    """gzip JSON Lines -> поток записей."""
+    try:
+        with io.TextIOWrapper(gzip.GzipFile(fileobj=fileobj), encoding="utf-8") as text:
+            # readline с пределом: одна гигантская строка не распаковывается в память целиком
+            for n, line in enumerate(iter(lambda: text.readline(MAX_LINE + 1), ""), start=1):
+                if len(line) > MAX_LINE:
+                    raise SnapshotError(f"строка {n}: длиннее {MAX_LINE // 1024} КБ")
+                if line.strip():
+                    try:
+                        yield json.loads(line)
+                    except ValueError as e:
+                        raise SnapshotError(f"строка {n}: {e}") from None
+    except (OSError, EOFError) as e:   # не gzip / обрезан
+        raise SnapshotError(f"файл повреждён: {e}") from None
+
+
+def _decoder(column):
+    if isinstance(column.type, DateTime):
+        return lambda v: datetime.fromisoformat(v) if isinstance(v, str) else v
+    if isinstance(column.type, Date):
+        return lambda v: date.fromisoformat(v[:10]) if isinstance(v, str) and v else v
+    return None
+
+
+class _Section:
+    """Раздел снимка в процессе вставки: колонки, перевод id, текущая пачка."""
+
+    def __init__(self, kind: str, columns: list[str]):
+        if kind not in _BY_KIND:
+            raise SnapshotError(f"неизвестный раздел {kind!r}")
+        self.kind = kind
+        self.model, skip, self.refs = _BY_KIND[kind]
+        table = self.model.__table__
+        # (позиция в строке, колонка) — только то, что есть в текущей схеме
+        self.columns = [(i, table.c[name]) for i, name in enumerate(columns)
+                        if name in table.c and name not in ("id", "wedding_id") and name not in skip]
+        self.decoders = {c.name: d for _, c in self.columns if (d := _decoder(c)) is not None}
+        self.id_pos = columns.index("id") if "id" in columns else None
+        self.rows, self.old_ids = [], []
+        self.count = 0
+        self.seen = 0   # строк раздела в файле, включая пропущенные
+
+
+def _row(section: _Section, values: list, wedding_id: int, ids: dict) -> dict | None:
+    row = {"wedding_id": wedding_id}
+    for i, col in section.columns:
+        v = values[i] if i < len(values) else None
+        dec = section.decoders.get(col.name)
+        row[col.name] = dec(v) if dec and v is not None else v
+    for fk, ref in section.refs.items():
+        if row.get(fk) is not None:
+            row[fk] = ids[ref].get(row[fk])
+            if row[fk] is None and not section.model.__table__.c[fk].nullable:
+                return None   # ссылка в никуда (битый снимок) — строку пропускаем
+    return row
+
+
+def _prepare(kind: str, rows: list[dict]) -> list[dict]:
+    """Производные поля, которые обычно ставят ORM-listener'ы (bulk INSERT их обходит)."""
+    if kind == "expense":
+        finance_calc.apply_to_rows(rows)
+    elif kind == "guest":
+        for r in rows:
+            if r.get("greeting_ru") is None:
+                r["greeting_ru"], r["greeting_uz"] = declension.greetings(r.get("name"), r.get("family_name"))
+    return rows
+
+
+def _insert_ids(table, rows: list[dict]) -> list[int]:
+    """Новые id в порядке rows — по ним старые id снимка переводятся в новые."""
+    if db.session.get_bind().dialect.name == "sqlite":
+        # sort_by_parameter_order на SQLite вырождается в INSERT на строку, а rowid
+        # там раздаются по порядку VALUES — возвращённые id достаточно отсортировать
+        return sorted(db.session.execute(insert(table).returning(table.c.id), rows).scalars())
+    # Postgres: порядок RETURNING у многострочного INSERT не гарантирован —
+    # SQLAlchemy сопоставляет строки с параметрами сам (insertmanyvalues)
+    return list(db.session.execute(
+        insert(table).returning(table.c.id, sort_by_parameter_order=True), rows
+    ).scalars())
+
+
+def _flush(section: _Section, ids: dict) -> None:
+    if not section.rows:
+        return
+    rows = _prepare(section.kind, section.rows)
+    table = section.model.__table__
+    try:
+        if section.kind in _REFERENCED:
+            ids[section.kind].update(zip(section.old_ids, _insert_ids(table, rows)))
+        else:
+            db.session.execute(insert(table), rows)
+    except IntegrityError as e:
+        # нет обязательной колонки и т.п. — битый файл, а не 500
+        raise SnapshotError(f"{section.kind}: {e.orig}") from None
+    section.count += len(rows)
+    section.rows, section.old_ids = [], []
+
+
+def load(recs, user_id: int | None, name: str | None = None) -> Wedding:
+    """Новая свадьба из потока записей. commit делает вызывающий; ошибка — SnapshotError."""
+    max_rows = current_app.config["SNAPSHOT_MAX_ROWS"]
+    recs = iter(recs)
+    header = next(recs, None)
+    if not isinstance(header, dict) or header.get("format") != FORMAT:
+        raise SnapshotError("это не снимок свадьбы")
+    if header.get("version", 0) > FORMAT_VERSION:
+        raise SnapshotError(f"снимок версии {header['version']}, поддерживается до {FORMAT_VERSION}")
+
+    fields = header.get("wedding") or {}
+    wedding = Wedding(
+        name=(name or fields.get("name") or "Свадьба")[:100],
+        date=_decoder(Wedding.__table__.c.date)(fields.get("date")),
+        budget=fields.get("budget"),
+        user_id=user_id,
+    )
+    db.session.add(wedding)
+    db.session.flush()
+
+    ids = {kind: {} for kind in _REFERENCED}
+    section, counts, ended = None, {}, False
+    for rec in recs:
+        if isinstance(rec, list):
+            if section is None:
+                raise SnapshotError("строка данных до заголовка раздела")
+            section.seen += 1
+            if section.seen > max_rows:
+                raise SnapshotError(f"{section.kind}: больше {max_rows} строк")
+            row = _row(section, rec, wedding.id, ids)
+            if row is None:
+                continue
+            section.rows.append(row)
+            if section.id_pos is not None and section.kind in _REFERENCED:
+                section.old_ids.append(rec[section.id_pos])
+            if len(section.rows) >= BATCH:
+                _flush(section, ids)
+        elif isinstance(rec, dict) and "kind" in rec:
+            if section is not None:
+                _flush(section, ids)
+                counts[section.kind] = section.count
+            section = _Section(rec["kind"], list(rec.get("columns") or []))
+            if section.kind in _REFERENCED and section.id_pos is None:
+                raise SnapshotError(f"{section.kind}: нет колонки id")
+        elif isinstance(rec, dict) and rec.get("end"):
+            ended = True
+            break
+        else:
+            raise SnapshotError("неизвестная запись")
+    if section is not None:
+        _flush(section, ids)
+        counts[section.kind] = section.count
+    if not ended:
+        raise SnapshotError("снимок обрезан (нет строки end)")
+
+    # потраченное по категориям и состояние бюджета — как после bulk-операций
+    recalc_budget(db.session.connection(), [wedding.id])
+    metrics.incr("snapshot.import")
+    metrics.incr("snapshot.rows", sum(counts.values()))
+    return wedding
+
+
+def clone_wedding(wedding: Wedding, user_id: int | None, name: str | None = None) -> Wedding:
+    """Копия свадьбы со всеми разделами: записи из SELECT сразу в INSERT, без файла."""
+    return load(records(wedding), user_id, name or f"{wedding.name} (копия)"[:100])
+
+
+# ----------------------------
+# Маршруты
+# ----------------------------
+def _own_wedding(wedding_id: int) -> Wedding:
+    """Админ — любая свадьба, пользователь — только своя."""
+    w = Wedding.query.get_or_404(wedding_id)
+    if not current_user.is_admin and w.user_id != current_user.id:
+        abort(403)
+    return w
+
+
+@snapshot_bp.get("/<int:wedding_id>/snapshot")
+@login_required
+def export_snapshot(wedding_id):
+    wedding = _own_wedding(wedding_id)
+    filename = f"wedding-{wedding.id}-{date.today().isoformat()}.jsonl.gz"
+    return Response(
+        stream_with_context(dump(wedding)),
+        mimetype="application/gzip",
+        headers={"Content-Disposition": f'attachment; filename="{filename}"'},
+    )
+
+
+@snapshot_bp.post("/<int:wedding_id>/clone")
+@login_required
+def clone(wedding_id):
+    wedding = _own_wedding(wedding_id)
+    new = clone_wedding(wedding, current_user.id, (request.form.get("name") or "").strip() or None)
+    db.session.commit()
+    flash(f'Создана копия «{new.name}»', 'success')
+    return redirect(url_for("wedding_pages.view_wedding", wedding_id=new.id))
+
+
+@snapshot_bp.post("/snapshot/import")
+@login_required
+def import_snapshot():
+    try:
+        file = request.files.get("file")
+    except RequestEntityTooLarge:
+        limit = current_app.config["MAX_CONTENT_LENGTH"] // (1024 * 1024)
+        flash(f'Снимок не загружен: файл больше {limit} МБ', 'error')
+        return redirect(url_for("index"))
+    if file is None or not file.filename:
+        flash('Выберите файл снимка', 'error')
+        return redirect(url_for("index"))
+    try:
+        wedding = load(parse(file.stream), current_user.id, (request.form.get("name") or "").strip() or None)
+    except SnapshotError as e:
+        db.session.rollback()
+        flash(f'Снимок не загружен: {e}', 'error')
+        return redirect(url_for("index"))
+    db.session.commit()
+    flash(f'Свадьба «{wedding.name}» загружена из снимка', 'success')
+    return redirect(url_for("wedding_pages.view_wedding", wedding_id=wedding.id))
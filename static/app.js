@@ -0,0 +1,25 @@
+// динамическая генерация пузырей
+document.addEventListener('DOMContentLoaded', () => {
+  const root = document.querySelector('.bg-decor');
+  if (!root) return;
+
+  const count = Math.min(48, Math.max(24, Math.floor(window.innerWidth / 20)));
+  for (let i = 0; i < count; i++) {
+    const b = document.createElement('div');
+    b.className = 'bubble';
+
+    const size = rand(28, 78);
+    const left = rand(0, 100);
+    const sway = rand(8, 18);
+    const dur  = rand(18, 34);
+    const delay = rand(-dur, 6);
+
+    b.style.setProperty('--size',  size + 'px');
+    b.style.setProperty('--left',  left + '%');
+    b.style.setProperty('--sway',  sway + 'vw');
+    b.style.setProperty('--dur',   dur + 's');
+    b.style.setProperty('--delay', delay + 's');
+    root.appendChild(b);
+  }
+  function rand(min, max){ return Math.random() * (max - min) + min }
+});
@@ -1,17 +1,29 @@
 # svodnaya.py
-from flask import Blueprint, render_template
-from models import Wedding, Expense  # Импортируй из своей модели!
-from sqlalchemy import func
+import time
+from dataclasses import asdict
+
+from flask import Blueprint, render_template, request, jsonify, current_app
+from flask_login import login_required, current_user
+from models import Wedding
+import finance_calc
+import reports
+from db_routing import replica_read
 
 svodnaya_bp = Blueprint('svodnaya_bp', __name__, url_prefix='/svodnaya')
 
 @svodnaya_bp.route('/')
+@replica_read
 def svodnaya():
-    # Для каждой свадьбы посчитать сумму расходов
-    weddings = Wedding.query.all()
+    # Для каждой свадьбы посчитать сумму расходов; архив (archive.py) — только по ?archived=1
+    q = Wedding.query
+    if request.args.get("archived") != "1":
+        q = q.filter(Wedding.archived_at.is_(None))
+    weddings = q.all()
+    figures = finance_calc.wedding_figures(w.id for w in weddings if w.archived_at is None)
     wedding_data = []
     for w in weddings:
-        total = sum(e.total or 0 for e in w.expenses)
+        # у архивных расходы в expense_archive — бегущая сумма со свадьбы
+        total = figures[w.id]["spent"] if w.archived_at is None else w.spent_total
         wedding_data.append({
             'id': w.id,
             'name': w.name,
@@ -19,3 +31,32 @@ def svodnaya():
             'total': total
         })
     return render_template('svodnaya.html', weddings=wedding_data)
+
+
+@svodnaya_bp.route('/report')
+@login_required
+@replica_read
+def report():
+    """
+    JSON-отчёт по всем свадьбам.
+    ?from=2025-01&to=2025-12&user_id=&category=&limit=20&reports=by_month,variance&live=1
+    Планировщик видит только свои свадьбы. Только чтение: куб досчитывает
+    `flask --app app report-cube` по cron, не запрос.
+    """
+    flt = reports.Filters.from_args(request.args)
+    if not current_user.is_admin:
+        flt.user_id = current_user.id
+    wanted = [r for r in (request.args.get('reports') or '').split(',') if r in reports.REPORTS]
+
+    source = 'live'
+    if current_app.config.get('REPORTS_CUBE') and not request.args.get('live'):
+        source = 'cube'
+
+    t0 = time.perf_counter()
+    data = reports.build(flt, source, wanted or reports.REPORTS)
+    data['meta'] = {
+        'source': source,
+        'filters': asdict(flt),
+        'ms': round((time.perf_counter() - t0) * 1000, 2),
+    }
+    return jsonify(data)
@@ -0,0 +1,149 @@
+# task_templates.py
+"""
+Шаблоны чек-листа задач: стандартный набор, которым засевается свадьба.
+
+Шаблон — кортеж разделов (название, задачи); в свадьбу задачи ложатся в
+этом порядке (Task.position) после уже существующих. Засев — один
+многострочный INSERT (tasks.seed_tasks); задачи, которые уже есть в
+свадьбе (без учёта регистра), повторно не добавляются.
+"""
+from __future__ import annotations
+
+TEMPLATES = {
+    "standard": ("Стандартная свадьба", (
+        ("За 12–9 месяцев", (
+            "Определить бюджет свадьбы",
+            "Согласовать дату с родителями",
+            "Составить черновой список гостей",
+            "Выбрать стиль и цветовую гамму",
+            "Забронировать ресторан / зал",
+            "Подать заявление в ЗАГС",
+            "Выбрать фотографа",
+            "Выбрать видеографа",
+            "Выбрать ведущего (тамаду)",
+            "Забронировать музыкантов / DJ",
+            "Решить, нужен ли свадебный организатор",
+            "Обсудить с семьями хатм-қуръон и утренний плов",
+        )),
+        ("За 8–6 месяцев", (
+            "Выбрать платье невесты",
+            "Выбрать костюм жениха",
+            "Заказать сарпо и подарки родне",
+            "Выбрать декоратора",
+            "Согласовать меню с рестораном",
+            "Заказать свадебный торт",
+            "Выбрать флориста",
+            "Забронировать транспорт (кортеж)",
+            "Забронировать гостиницу для иногородних гостей",
+            "Спланировать свадебное путешествие",
+            "Проверить загранпаспорта и визы",
+            "Выбрать кольца",
+        )),
+        ("За 5–3 месяца", (
+            "Утвердить список гостей",
+            "Заказать приглашения",
+            "Разослать приглашения",
+            "Выбрать стилиста и визажиста",
+            "Пробный макияж и причёска",
+            "Выбрать обувь и аксессуары",
+            "Составить сценарий вечера с ведущим",
+            "Выбрать первый танец",
+            "Записаться на уроки танца",
+            "Заказать звук и свет",
+            "Заказать фотозону",
+            "Заказать бонбоньерки для гостей",
+            "Оформить свадебный сайт / чат для гостей",
+            "Решить вопрос с детьми на свадьбе (няня, детская зона)",
+        )),
+        ("За 2 месяца", (
+            "Собрать подтверждения от гостей (RSVP)",
+            "Напомнить тем, кто не ответил",
+            "Первая примерка платья",
+            "Примерка костюма жениха",
+            "Согласовать тайминг с фотографом и видеографом",
+            "Согласовать декор зала",
+            "Заказать номер для новобрачных",
+            "Купить подарки родителям",
+            "Подготовить выкуп невесты",
+            "Согласовать программу никоҳ",
+        )),
+        ("За месяц", (
+            "Составить рассадку гостей",
+            "Распечатать карточки рассадки",
+            "Окончательное меню и количество персон",
+            "Финальная примерка платья",
+            "Забрать кольца",
+            "Подтвердить всех подрядчиков",
+            "Составить план дня по минутам",
+            "Раздать план дня помощникам и подрядчикам",
+            "Подготовить оплату подрядчикам (конверты)",
+            "Собрать тревожный чемоданчик невесты",
+            "Маникюр и педикюр",
+            "Подготовить речь / благодарность родителям",
+        )),
+        ("За неделю", (
+            "Передать ресторану окончательное число гостей",
+            "Передать рассадку ресторану",
+            "Проверить доставку торта и цветов",
+            "Подтвердить транспорт и маршрут",
+            "Собрать вещи для путешествия",
+            "Забрать платье и костюм",
+            "Вручить помощникам список ответственных",
+            "Внести остаток оплат по договорам",
+        )),
+        ("День свадьбы", (
+            "Позавтракать",
+            "Причёска и макияж",
+            "Сборы жениха",
+            "Выкуп",
+            "Регистрация в ЗАГСе",
+            "Фотосессия",
+            "Банкет",
+            "Передать подарки на хранение",
+            "Рассчитаться с подрядчиками",
+        )),
+        ("После свадьбы", (
+            "Забрать подарки и вещи из ресторана",
+            "Вернуть арендованные вещи",
+            "Сдать платье в химчистку",
+            "Поблагодарить гостей",
+            "Оставить отзывы подрядчикам",
+            "Получить фото и видео",
+            "Сменить документы (если меняется фамилия)",
+        )),
+    )),
+    "small": ("Скромная свадьба", (
+        ("Подготовка", (
+            "Определить бюджет свадьбы",
+            "Подать заявление в ЗАГС",
+            "Составить список гостей",
+            "Забронировать ресторан / зал",
+            "Выбрать фотографа",
+            "Выбрать платье невесты",
+            "Выбрать костюм жениха",
+            "Выбрать кольца",
+            "Разослать приглашения",
+            "Собрать подтверждения от гостей (RSVP)",
+            "Согласовать меню с рестораном",
+            "Заказать свадебный торт",
+            "Составить рассадку гостей",
+            "Составить план дня",
+        )),
+        ("После свадьбы", (
+            "Поблагодарить гостей",
+            "Получить фото",
+        )),
+    )),
+}
+
+
+def choices() -> list[tuple[str, str, int]]:
+    """[(ключ, название, задач)] для формы засева."""
+    return [(key, title, sum(len(items) for _, items in sections))
+            for key, (title, sections) in TEMPLATES.items()]
+
+
+def descriptions(key: str) -> list[str]:
+    """Задачи шаблона по порядку; KeyError — нет такого шаблона."""
+    _title, sections = TEMPLATES[key]
+    return [d for _, items in sections for d in items]
@@ -1,23 +1,60 @@
-from flask import Blueprint, render_template, request, redirect, url_for
-from models import db, Wedding, Task
+from flask import Blueprint, render_template, request, redirect, url_for, flash, jsonify
+from sqlalchemy import select, insert, update, delete, func, case, not_
+from models import db, Wedding, Task, touch_wedding
+from http_cache import etag_by_wedding
+import task_templates
+import writebehind
 
 tasks_bp = Blueprint('tasks_bp', __name__, url_prefix='/tasks')
 
 @tasks_bp.route('/<int:wedding_id>')
+@etag_by_wedding
 def task_list(wedding_id):
     wedding = Wedding.query.get_or_404(wedding_id)
-    return render_template('tasks.html', wedding=wedding)
+    return render_template('tasks.html', wedding=wedding, templates=task_templates.choices())
+
+def _next_position(wedding_id):
+    return db.session.scalar(
+        select(func.coalesce(func.max(Task.position) + 1, 0)).where(Task.wedding_id == wedding_id)
+    )
 
 @tasks_bp.route('/<int:wedding_id>/add', methods=['POST'])
 def add_task(wedding_id):
     description = request.form['description']
     if description.strip():
-        db.session.add(Task(description=description, wedding_id=wedding_id))
+        db.session.add(Task(description=description, wedding_id=wedding_id, position=_next_position(wedding_id)))
         db.session.commit()
     return redirect(url_for('tasks_bp.task_list', wedding_id=wedding_id))
 
+@writebehind.applier("task_done")
+def toggle_many(wedding_id, ops):
+    """Пачка переключений (writebehind): {task_id, was?}; was — состояние, которое видел клиент."""
+    tasks = {t.id: t for t in Task.query.filter(
+        Task.id.in_({o["task_id"] for o in ops}), Task.wedding_id == wedding_id
+    ).with_for_update()}
+    results = []
+    for o in ops:
+        t = tasks.get(o["task_id"])
+        if t is None:
+            results.append({"ok": False, "error": "not found"})
+        elif "was" in o and bool(t.is_done) != o["was"]:
+            results.append({"ok": False, "conflict": True, "task_id": t.id, "is_done": bool(t.is_done)})
+        else:
+            t.is_done = not t.is_done
+            results.append({"ok": True, "task_id": t.id, "is_done": t.is_done})
+    return results
+
 @tasks_bp.route('/<int:wedding_id>/done/<int:task_id>', methods=['POST'])
 def toggle_done(wedding_id, task_id):
+    if request.is_json:
+        # AJAX: через буфер записи свадьбы (склейка в одну транзакцию, проверка конфликта)
+        op = {"task_id": task_id}
+        was = (request.get_json(silent=True) or {}).get("was")
+        if was is not None:
+            op["was"] = bool(was)
+        result, batch = writebehind.submit(wedding_id, "task_done", op)
+        status = 200 if result["ok"] else 202 if result.get("pending") else 409 if result.get("conflict") else 404
+        return jsonify({**result, "batch": batch, **_summary(wedding_id)}), status
     task = Task.query.get_or_404(task_id)
     task.is_done = not task.is_done
     db.session.commit()
@@ -29,3 +66,122 @@ def delete_task(wedding_id, task_id):
     db.session.delete(task)
     db.session.commit()
     return redirect(url_for('tasks_bp.task_list', wedding_id=wedding_id))
+
+
+# ----------------------------
+# Шаблоны и пакетные операции
+# ----------------------------
+# bulk INSERT/UPDATE/DELETE обходят ORM-события — версию свадьбы двигаем сами
+def seed_tasks(wedding_id: int, descriptions) -> int:
+    """Задачи в конец чек-листа одним многострочным INSERT; уже имеющиеся пропускаем."""
+    have = {d.strip().lower() for d in db.session.scalars(
+        select(Task.description).where(Task.wedding_id == wedding_id)
+    )}
+    start = _next_position(wedding_id)
+    rows = []
+    for d in descriptions:
+        key = d.strip().lower()
+        if key and key not in have:
+            have.add(key)
+            rows.append({"wedding_id": wedding_id, "description": d.strip()[:200],
+                         "is_done": False, "position": start + len(rows)})
+    if rows:
+        db.session.execute(insert(Task).values(rows))
+        touch_wedding(wedding_id)
+    return len(rows)
+
+
+def _summary(wedding_id: int) -> dict:
+    total, done = db.session.execute(
+        select(func.count(Task.id), func.count(case((Task.is_done.is_(True), 1))))
+        .where(Task.wedding_id == wedding_id)
+    ).one()
+    return {"total": total, "done": done}
+
+
+def _ids():
+    """Список id из JSON {"ids": [...]}; None — мусор на входе."""
+    data = request.get_json(force=True, silent=True) or {}
+    try:
+        return [int(x) for x in data.get("ids") or []], data
+    except (TypeError, ValueError):
+        return None, data
+
+
+@tasks_bp.post('/<int:wedding_id>/seed')
+def seed_template(wedding_id):
+    Wedding.query.get_or_404(wedding_id)
+    key = request.form.get('template') or (request.get_json(silent=True) or {}).get('template')
+    try:
+        descriptions = task_templates.descriptions(key)
+    except KeyError:
+        if request.is_json:
+            return jsonify({"ok": False, "error": "unknown template"}), 400
+        flash('Нет такого шаблона', 'error')
+        return redirect(url_for('tasks_bp.task_list', wedding_id=wedding_id))
+    added = seed_tasks(wedding_id, descriptions)
+    db.session.commit()
+    if request.is_json:
+        return jsonify({"ok": True, "added": added, **_summary(wedding_id)})
+    flash(f'Добавлено задач из шаблона: {added}', 'success')
+    return redirect(url_for('tasks_bp.task_list', wedding_id=wedding_id))
+
+
+@tasks_bp.post('/<int:wedding_id>/bulk/done')
+def bulk_done(wedding_id):
+    """{"ids": [...], "done": true|false} — одним UPDATE; без done — переключить каждую."""
+    ids, data = _ids()
+    if ids is None:
+        return jsonify({"ok": False, "error": "bad id"}), 400
+    done = data.get("done")
+    value = not_(func.coalesce(Task.is_done, False)) if done is None else bool(done)
+    updated = 0
+    if ids:
+        updated = db.session.execute(
+            update(Task).where(Task.wedding_id == wedding_id, Task.id.in_(ids))
+            .values(is_done=value).execution_options(synchronize_session=False)
+        ).rowcount
+    if updated:
+        touch_wedding(wedding_id)
+    db.session.commit()
+    states = dict(db.session.execute(
+        select(Task.id, Task.is_done).where(Task.wedding_id == wedding_id, Task.id.in_(ids))
+    ).all()) if ids else {}
+    return jsonify({"ok": True, "updated": updated, "tasks": states, **_summary(wedding_id)})
+
+
+@tasks_bp.post('/<int:wedding_id>/bulk/delete')
+def bulk_delete(wedding_id):
+    """{"ids": [...]} — одним DELETE; чужие id молча пропускаются."""
+    ids, _data = _ids()
+    if ids is None:
+        return jsonify({"ok": False, "error": "bad id"}), 400
+    deleted = 0
+    if ids:
+        deleted = db.session.execute(
+            delete(Task).where(Task.wedding_id == wedding_id, Task.id.in_(ids))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    if deleted:
+        touch_wedding(wedding_id)
+    db.session.commit()
+    return jsonify({"ok": True, "deleted": deleted, **_summary(wedding_id)})
+
+
+@tasks_bp.post('/<int:wedding_id>/reorder')
+def reorder(wedding_id):
+    """{"ids": [...]} в новом порядке -> position 0..n-1 одним UPDATE ... CASE."""
+    ids, _data = _ids()
+    if ids is None or len(set(ids)) != len(ids):
+        return jsonify({"ok": False, "error": "bad id"}), 400
+    updated = 0
+    if ids:
+        updated = db.session.execute(
+            update(Task).where(Task.wedding_id == wedding_id, Task.id.in_(ids))
+            .values(position=case({tid: pos for pos, tid in enumerate(ids)}, value=Task.id))
+            .execution_options(synchronize_session=False)
+        ).rowcount
+    if updated:
+        touch_wedding(wedding_id)
+    db.session.commit()
+    return jsonify({"ok": True, "updated": updated})
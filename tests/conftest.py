@@ -0,0 +1,82 @@
+# tests/conftest.py
+"""
+Общее приложение для тестов: одна база на сессию, засеянная bench.datagen.
+
+DATABASE_URL читается при импорте app, поэтому база одна на весь прогон.
+По умолчанию — временная SQLite; TEST_DATABASE_URL — своя (пустая!) база,
+например PostgreSQL:
+
+    TEST_DATABASE_URL=postgresql+psycopg://localhost/wm_test python -m pytest -q tests
+"""
+import os
+import sys
+import tempfile
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+@pytest.fixture(scope="session")
+def seed():
+    """Засевает базу (до импорта app) и возвращает сводку bench.datagen.generate."""
+    tmp = None
+    url = os.getenv("TEST_DATABASE_URL")
+    if not url:
+        tmp = tempfile.NamedTemporaryFile(suffix=".db", delete=False)
+        tmp.close()
+        url = f"sqlite:///{tmp.name}"
+    os.environ["DATABASE_URL"] = url
+    os.environ["STARTUP_FAST"] = "1"
+    sys.path.insert(0, ROOT)
+    from sqlalchemy import create_engine
+    from bench.datagen import generate
+    engine = create_engine(url)
+    info = generate(engine, weddings=60, guests_mean=40, seed=7)
+    engine.dispose()
+    yield info
+    if tmp:
+        os.unlink(tmp.name)
+
+
+@pytest.fixture(scope="session")
+def app(seed):
+    from app import app as flask_app, ensure_db_and_seed_admin
+    flask_app.config["SQLALCHEMY_ENGINE_OPTIONS"] = {}
+    with flask_app.app_context():
+        ensure_db_and_seed_admin()
+    yield flask_app
+
+
+@pytest.fixture
+def owner_client(app, seed):
+    """Клиент, вошедший владельцем «эталонной» свадьбы (не админ)."""
+    c = app.test_client()
+    r = c.post("/auth/login", data={"email": seed["showcase_owner"], "password": seed["password"]})
+    assert r.status_code == 302
+    return c
+
+
+@pytest.fixture
+def admin_client(app, seed):
+    c = app.test_client()
+    r = c.post("/auth/login", data={"email": "admin@bench.local", "password": seed["password"]})
+    assert r.status_code == 302
+    return c
+
+
+@pytest.fixture
+def sql(app):
+    """Все SQL за тест: список (statement, params) в порядке выполнения."""
+    from sqlalchemy import event
+    from models import db
+    with app.app_context():
+        engine = db.engine
+    seen = []
+
+    def hook(conn, cursor, statement, params, context, executemany):
+        seen.append((statement, params))
+
+    event.listen(engine, "before_cursor_execute", hook)
+    yield seen
+    event.remove(engine, "before_cursor_execute", hook)
@@ -0,0 +1,42 @@
+# tests/test_archive.py
+"""
+Архивная свадьба: GET только читает, данные возвращает явный POST restore.
+
+    python -m pytest -q tests
+"""
+
+
+def test_archived_wedding_is_read_only_until_restored(app, seed, owner_client):
+    import archive
+    from models import db, User, Wedding, Guest
+    with app.app_context():
+        # своя свадьба владельца — остальные тесты пользуются «эталонной»
+        owner_id = db.session.get(Wedding, seed["showcase_wedding_id"]).user_id
+        w = Wedding(name="Архивная", user_id=owner_id)
+        w.guests = [Guest(name=f"Гость {i}") for i in range(3)]
+        db.session.add(w)
+        db.session.commit()
+        wid = w.id
+        archive.archive_weddings([wid])
+        other = db.session.scalar(db.select(User.email).where(User.id != owner_id, User.is_admin.is_(False)))
+
+    def archived():
+        with app.app_context():
+            return db.session.get(Wedding, wid).archived_at is not None
+
+    r = owner_client.get(f"/wedding/{wid}/guests")
+    assert r.status_code == 200 and "Восстановить из архива" in r.get_data(as_text=True)
+    assert archived()
+    r = owner_client.post(f"/wedding/{wid}/guests/add", data={"name": "Новый"})
+    assert r.status_code == 302 and archived()
+
+    c = app.test_client()
+    c.post("/auth/login", data={"email": other, "password": seed["password"]})
+    assert "Восстановить из архива" not in c.get(f"/wedding/{wid}").get_data(as_text=True)
+    assert c.post(f"/wedding/{wid}/restore").status_code == 403
+    assert archived()
+
+    assert owner_client.post(f"/wedding/{wid}/restore").status_code == 302
+    assert not archived()
+    with app.app_context():
+        assert db.session.scalar(db.select(db.func.count()).where(Guest.wedding_id == wid)) == 3
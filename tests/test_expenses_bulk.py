@@ -0,0 +1,30 @@
+# tests/test_expenses_bulk.py
+"""
+Доступ к массовой правке расходов: только админ или владелец свадьбы.
+
+    python -m pytest -q tests
+"""
+
+
+def _bulk(client, wedding_id):
+    return client.post(f"/wedding/{wedding_id}/expenses/bulk", json={"insert": [], "update": [], "delete": []})
+
+
+def test_anonymous_is_sent_to_login(app, seed):
+    r = _bulk(app.test_client(), seed["showcase_wedding_id"])
+    assert r.status_code in (302, 401)
+
+
+def test_other_planner_gets_403(app, seed):
+    from models import db, User, Wedding
+    with app.app_context():
+        owner_id = db.session.get(Wedding, seed["showcase_wedding_id"]).user_id
+        other = db.session.scalar(db.select(User.email).where(User.id != owner_id, User.is_admin.is_(False)))
+    c = app.test_client()
+    c.post("/auth/login", data={"email": other, "password": seed["password"]})
+    assert _bulk(c, seed["showcase_wedding_id"]).status_code == 403
+
+
+def test_owner_and_admin_pass(seed, owner_client, admin_client):
+    assert _bulk(owner_client, seed["showcase_wedding_id"]).status_code == 200
+    assert _bulk(admin_client, seed["showcase_wedding_id"]).status_code == 200
@@ -0,0 +1,24 @@
+# tests/test_http_cache.py
+"""
+304 по ETag страницы свадьбы отдаётся только тому, кто её видит.
+
+    python -m pytest -q tests
+"""
+
+
+def test_foreign_etag_does_not_bypass_access_check(app, seed, owner_client):
+    from models import db, User, Wedding
+    wid = seed["showcase_wedding_id"]
+    r = owner_client.get(f"/wedding/{wid}")
+    assert r.status_code == 200 and r.headers["ETag"]
+    assert owner_client.get(f"/wedding/{wid}", headers={"If-None-Match": r.headers["ETag"]}).status_code == 304
+
+    with app.app_context():
+        owner_id = db.session.get(Wedding, wid).user_id
+        other = db.session.scalar(db.select(User.email).where(User.id != owner_id, User.is_admin.is_(False)))
+    c = app.test_client()
+    c.post("/auth/login", data={"email": other, "password": seed["password"]})
+    # подобранный ETag чужой свадьбы не даёт 304: страницу (и доступ) решает view
+    for client in (c, app.test_client()):
+        r = client.get(f"/wedding/{wid}", headers={"If-None-Match": "*"})
+        assert r.status_code != 304 and "ETag" not in r.headers
@@ -0,0 +1,62 @@
+# tests/test_indexes.py
+"""
+Горячие запросы страниц идут по своим индексам (EXPLAIN настоящих SQL приложения).
+
+Запросы не пересобираются руками: тест открывает страницу, ловит SQL с параметрами
+и отдаёт ровно его в EXPLAIN. Ожидания — по диалекту: планировщик SQLite берёт
+составной ix_guest_wedding_table и для table_id IS NULL, поэтому частичный
+ix_guest_wedding_unassigned проверяется только на PostgreSQL (TEST_DATABASE_URL).
+
+    python -m pytest -q tests
+"""
+import json
+import re
+
+import pytest
+
+# (страница, фрагменты SQL запроса, {диалект: индекс}); None — на диалекте не проверяем
+CASES = [
+    ("/", ("FROM wedding WHERE wedding.user_id", "wedding.archived_at IS NULL", "ORDER BY wedding.date"),
+     {"sqlite": "ix_wedding_user_date", "postgresql": "ix_wedding_user_date"}),
+    ("/?budget=warn", ("FROM wedding WHERE wedding.user_id", "wedding.archived_at IS NULL",
+                       "wedding.budget_state =", "ORDER BY wedding.date"),
+     {"sqlite": "ix_wedding_user_date", "postgresql": "ix_wedding_user_date"}),
+    ("/", ("FROM task WHERE task.wedding_id IN", "GROUP BY task.wedding_id"),
+     {"sqlite": "ix_task_wedding_done", "postgresql": "ix_task_wedding_done"}),
+    ("/wedding/{wid}/seating", ("FROM guest WHERE guest.wedding_id", "guest.table_id IS NULL"),
+     {"sqlite": None, "postgresql": "ix_guest_wedding_unassigned"}),
+    ("/wedding/{wid}/seating", ("FROM guest WHERE guest.wedding_id", "guest.table_id IS NOT NULL"),
+     {"sqlite": "ix_guest_wedding_table", "postgresql": "ix_guest_wedding_table"}),
+    ("/finance/{wid}", ("expense.category FROM expense WHERE expense.wedding_id",),
+     {"sqlite": "ix_expense_wedding_id", "postgresql": "ix_expense_wedding_id"}),
+    ("/finance/{wid}", ("FROM sponsor_gift WHERE sponsor_gift.wedding_id",),
+     {"sqlite": "ix_sponsor_gift_wedding_id", "postgresql": "ix_sponsor_gift_wedding_id"}),
+]
+
+
+def _explain(conn, statement, params) -> str:
+    if conn.dialect.name == "sqlite":
+        return "\n".join(r[-1] for r in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", params))
+    plan = conn.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", params).scalar()
+    return json.dumps(plan)
+
+
+@pytest.mark.parametrize("path, needles, expected", CASES,
+                         ids=[f"{p} {n[-1]}" for p, n, _ in CASES])
+def test_hot_query_uses_index(app, seed, sql, owner_client, path, needles, expected):
+    from models import db
+    with app.app_context():
+        dialect = db.engine.dialect.name
+    index = expected.get(dialect)
+    if index is None:
+        pytest.skip(f"на {dialect} не проверяем")
+
+    r = owner_client.get(path.format(wid=seed["showcase_wedding_id"]))
+    assert r.status_code == 200
+    found = [(s, p) for s, p in sql if all(n in " ".join(s.split()) for n in needles)]
+    assert len(found) == 1, f"ожидали один запрос с {needles}, нашли {len(found)}"
+
+    with app.app_context(), db.engine.connect() as conn:
+        plan = _explain(conn, *found[0])
+    assert re.search(rf"\b{index}\b", plan), plan
+    assert "Seq Scan" not in plan, plan
@@ -0,0 +1,36 @@
+# tests/test_invitation_fonts.py
+"""
+Кэш шрифтов приглашений (invitations._add_font) даёт тот же PDF, что публичный add_font.
+
+    python -m pytest -q tests
+"""
+import os
+from datetime import datetime, timezone
+
+
+def _pdf(fonts) -> bytes:
+    from fpdf import FPDF
+    pdf = FPDF()
+    pdf.set_creation_date(datetime(2020, 1, 1, tzinfo=timezone.utc))
+    fonts(pdf)
+    pdf.add_page()
+    pdf.set_font("Playfair", "I", 20)
+    pdf.cell(text="Азиз ва Малика — Ўзбек тўйи")
+    pdf.set_font("Montserrat", "B", 12)
+    pdf.cell(text="Hello")
+    return bytes(pdf.output())
+
+
+def test_cached_fonts_match_public_add_font(app):
+    import fpdf
+    import invitations
+
+    def public(pdf):
+        for family, style, fname in invitations.FONTS:
+            pdf.add_font(family, style, os.path.join(invitations.FONT_DIR, fname))
+
+    # обновили fpdf2 — сначала перепроверить копию TTFFont и поднять FPDF2_PINNED
+    assert fpdf.__version__ == invitations.FPDF2_PINNED
+    expected = _pdf(public)
+    assert _pdf(invitations.add_fonts) == expected
+    assert _pdf(invitations.add_fonts) == expected   # вторая копия из кэша
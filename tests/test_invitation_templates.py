@@ -0,0 +1,45 @@
+# tests/test_invitation_templates.py
+"""
+Кэш планов приглашений (invitation_templates.plan_for).
+
+    python -m pytest -q tests
+"""
+import json
+
+
+def _spec(venue: str) -> str:
+    from invitation_templates import default_spec
+    spec = default_spec()
+    spec["vars"]["venue"] = venue
+    return json.dumps(spec, ensure_ascii=False)
+
+
+def test_reset_then_other_wedding_gets_its_own_plan(app):
+    from models import db, Wedding, InvitationTemplate
+    from invitation_templates import plan_for
+
+    with app.app_context():
+        a, b = Wedding(name="A"), Wedding(name="B")
+        db.session.add_all([a, b])
+        db.session.commit()
+        a_id, b_id = a.id, b.id
+
+    c = app.test_client()
+    c.post(f"/invitations/{a_id}/template", data={"spec": _spec("Зал А")})
+    with app.app_context():
+        a_tpl = db.session.scalar(db.select(InvitationTemplate).filter_by(wedding_id=a_id))
+        a_key = (a_tpl.id, a_tpl.version)
+        assert "Зал А" in repr(plan_for(a_id))   # план A — в кэше
+
+    c.post(f"/invitations/{a_id}/template/reset")
+    c.post(f"/invitations/{b_id}/template", data={"spec": _spec("Зал Б")})
+
+    with app.app_context():
+        b_tpl = db.session.scalar(db.select(InvitationTemplate).filter_by(wedding_id=b_id))
+        if db.engine.dialect.name == "sqlite":
+            # SQLite отдал B освободившийся id и ту же version — ровно случай из кэша
+            assert (b_tpl.id, b_tpl.version) == a_key
+        plan_b = repr(plan_for(b_id))
+        assert "Зал Б" in plan_b and "Зал А" not in plan_b
+        # A после сброса — шаблон по умолчанию
+        assert "Мумтоз" in repr(plan_for(a_id))
@@ -0,0 +1,34 @@
+# tests/test_query_counts.py
+"""
+Число SQL-запросов горячих страниц не зависит от числа свадеб/столов (без N+1).
+
+    python -m pytest -q tests
+"""
+from sqlalchemy import func, select
+
+
+def _count(client, sql, path):
+    sql.clear()
+    r = client.get(path)
+    assert r.status_code == 200
+    return len(sql)
+
+
+def test_index_is_constant_in_weddings(app, sql, admin_client, owner_client):
+    from models import db, Wedding
+    with app.app_context():
+        assert db.session.scalar(select(func.count()).select_from(Wedding)) > 10
+    # админ видит все свадьбы, владелец — несколько, запросов столько же
+    assert _count(admin_client, sql, "/") == _count(owner_client, sql, "/") <= 10
+
+
+def test_seating_page_is_constant_in_tables(app, sql, admin_client):
+    from models import db, Table
+    with app.app_context():
+        per_wedding = db.session.execute(
+            select(Table.wedding_id, func.count()).group_by(Table.wedding_id).order_by(func.count())
+        ).all()
+    (few, n_few), (many, n_many) = per_wedding[0], per_wedding[-1]
+    assert n_many > n_few
+    n = _count(admin_client, sql, f"/wedding/{few}/seating")
+    assert _count(admin_client, sql, f"/wedding/{many}/seating") == n <= 10
@@ -1,7 +1,13 @@
 # wedding_pages.py
-from flask import Blueprint, render_template, request, redirect, url_for, jsonify
-from models import db, Wedding, Expense, Guest, Table
-from math import ceil
+from flask import Blueprint, render_template, request, redirect, url_for, jsonify, send_file, flash, abort
+from flask_login import login_required, current_user
+from sqlalchemy import func, select, insert, update, delete
+from models import db, Wedding, Expense, Guest, Table, touch_wedding, recalc_budget
+from http_cache import etag_by_wedding
+import seating
+import writebehind
+from db_routing import replica_read
+import finance_calc
 
 wedding_pages = Blueprint(
     "wedding_pages",
@@ -22,35 +28,62 @@ def _to_float(val):
     except (TypeError, ValueError):
         return None
 
-def _calc_total(quantity, unit_price):
-    """Старое правило total: qty*price если оба есть, иначе unit_price или 0."""
-    q = _to_float(quantity)
-    p = _to_float(unit_price)
-    if q is not None and p is not None:
-        return q * p
-    return p or 0.0
+def _table_number(val):
+    """Номер стола из формы гостя; пусто / мусор -> None (без стола)."""
+    try:
+        return int(val) if val else None
+    except (TypeError, ValueError):
+        return None
+
+def _seat_by_form(g, what):
+    """Стол по table_no из формы; неверный номер — откат всей правки и flash. False — не сохранили."""
+    try:
+        seating.assign_number(g, _table_number(request.form.get("table_no")))
+    except seating.SeatingError as e:
+        db.session.rollback()
+        flash(f"{what}: {e}", "error")
+        return False
+    return True
+
+def _expense_totals(wedding_id):
+    """Итоги по расходам свадьбы (finance_calc, один SELECT)."""
+    return finance_calc.wedding_figures([wedding_id])[wedding_id]
 
 # ======= ХАБ =======
 @wedding_pages.route("/<int:wedding_id>")
+@etag_by_wedding
 def view_wedding(wedding_id):
     """
     Хаб-страница: две большие карточки — Расходы и Гости + мини-статистика.
     """
     wedding = Wedding.query.get_or_404(wedding_id)
-    total_expenses = sum((e.total or 0) for e in wedding.expenses)
+    figures = _expense_totals(wedding_id)
     done_tasks = sum(1 for t in wedding.tasks if getattr(t, "is_done", False))
     return render_template(
         "wedding_overview.html",
         wedding=wedding,
-        total_expenses=total_expenses,
+        expenses_count=figures["count"],
+        total_expenses=figures["spent"],
         done_tasks=done_tasks,
     )
 
 # ======= РАСХОДЫ =======
 @wedding_pages.route("/<int:wedding_id>/expenses")
+@etag_by_wedding
 def wedding_expenses(wedding_id):
     wedding = Wedding.query.get_or_404(wedding_id)
-    return render_template("wedding_expenses.html", wedding=wedding)
+    # агрегаты — одним SELECT, строки таблицы берутся из кэша фрагментов
+    totals = _expense_totals(wedding_id)
+    return render_template(
+        "wedding_expenses.html",
+        wedding=wedding,
+        expenses_count=totals["count"],
+        sum_plan=totals["plan"],
+        sum_fact=totals["fact"],
+        sum_prepay=totals["prepayment"],
+        sum_total=totals["total"],
+        sum_difference=totals["difference"],
+    )
 
 @wedding_pages.route("/<int:wedding_id>/expenses/add", methods=["POST"])
 def add_expense(wedding_id):
@@ -71,7 +104,7 @@ def add_expense(wedding_id):
         item=item,
         quantity=quantity,
         unit_price=unit_price,
-        total=_calc_total(quantity, unit_price),
+        total=finance_calc.calc_total(quantity, unit_price),
         notes=notes,
         wedding_id=wedding_id,
     )
@@ -99,7 +132,7 @@ def edit_expense(expense_id):
     unit_price     = _to_float(request.form.get("unit_price"))
     exp.quantity   = quantity
     exp.unit_price = unit_price
-    exp.total      = _calc_total(quantity, unit_price)
+    exp.total      = finance_calc.calc_total(quantity, unit_price)
     exp.notes      = request.form.get("notes")
 
     # новые поля
@@ -125,11 +158,103 @@ def delete_expense(expense_id):
     db.session.commit()
     return redirect(url_for("wedding_pages.wedding_expenses", wedding_id=wid))
 
+# Массовое редактирование (таблица-«эксель»): один JSON-дифф вместо N форм
+_EXPENSE_FIELDS = ("category", "item", "quantity", "unit_price", "notes", "plan", "fact", "prepayment")
+_EXPENSE_NUMERIC = ("quantity", "unit_price", "plan", "fact", "prepayment")
+
+def _clean_expense_row(raw, base=None):
+    """Поля строки из JSON поверх текущих значений (для update) или пустых (для insert)."""
+    row = dict(base) if base else {f: None for f in _EXPENSE_FIELDS}
+    for f in _EXPENSE_FIELDS:
+        if f in raw:
+            row[f] = _to_float(raw[f]) if f in _EXPENSE_NUMERIC else (str(raw[f] or "").strip() or None)
+    row["category"] = row["category"] or ""
+    row["item"] = row["item"] or ""
+    return row
+
+@wedding_pages.post("/<int:wedding_id>/expenses/bulk")
+@login_required
+def expenses_bulk(wedding_id):
+    """
+    JSON: {"insert": [{...}], "update": [{"id": 1, ...}], "delete": [id, ...]}
+    В update можно передавать только изменённые поля. Всё применяется одной
+    транзакцией пачками INSERT/UPDATE/DELETE; в ответе — пересчитанные итоги.
+    """
+    w = Wedding.query.get_or_404(wedding_id)
+    # массовая правка расходов — только админ или владелец свадьбы
+    if not current_user.is_admin and w.user_id != current_user.id:
+        abort(403)
+    data = request.get_json(force=True) or {}
+    inserts = data.get("insert") or []
+    updates = data.get("update") or []
+    try:
+        delete_ids = {int(x) for x in (data.get("delete") or [])}
+        update_ids = {int(u["id"]) for u in updates}
+    except (KeyError, TypeError, ValueError):
+        return jsonify({"ok": False, "error": "bad id"}), 400
+
+    # текущие значения изменяемых строк — одним SELECT, заодно проверка принадлежности свадьбе
+    current = {}
+    if update_ids:
+        cols = [Expense.id] + [getattr(Expense, f) for f in _EXPENSE_FIELDS]
+        for r in db.session.execute(
+            select(*cols).where(Expense.id.in_(update_ids), Expense.wedding_id == wedding_id)
+        ).mappings():
+            current[r["id"]] = r
+    missing = update_ids - set(current)
+    if missing:
+        return jsonify({"ok": False, "error": "not found", "ids": sorted(missing)}), 404
+
+    # total и difference — по колонкам за один проход
+    new_rows = finance_calc.apply_to_rows([
+        {**_clean_expense_row(raw), "wedding_id": wedding_id} for raw in inserts
+    ])
+    changed_rows = finance_calc.apply_to_rows([
+        {**_clean_expense_row(raw, current[int(raw["id"])]), "id": int(raw["id"])} for raw in updates
+    ])
+
+    # bulk-операции обходят ORM-события (expense_autocalc, версия свадьбы) — всё посчитано выше
+    if new_rows:
+        db.session.execute(insert(Expense), new_rows)
+    if changed_rows:
+        db.session.execute(update(Expense), changed_rows)
+    deleted = 0
+    if delete_ids:
+        deleted = db.session.execute(
+            delete(Expense).where(Expense.id.in_(delete_ids), Expense.wedding_id == wedding_id)
+        ).rowcount
+    if new_rows or changed_rows or deleted:
+        touch_wedding(wedding_id)
+        recalc_budget(db.session.connection(), [wedding_id])
+    db.session.commit()
+
+    return jsonify({
+        "ok": True,
+        "inserted": len(new_rows),
+        "updated": len(changed_rows),
+        "deleted": deleted,
+        "totals": _expense_totals(wedding_id),
+    })
+
 # ======= ГОСТИ =======
 @wedding_pages.route("/<int:wedding_id>/guests")
+@etag_by_wedding
 def wedding_guests(wedding_id):
     wedding = Wedding.query.get_or_404(wedding_id)
-    return render_template("wedding_guests.html", wedding=wedding)
+    # агрегаты одним SELECT — строки таблицы берутся из кэша фрагментов
+    guests_count, total_persons, families_count = db.session.query(
+        func.count(Guest.id),
+        func.coalesce(func.sum(func.coalesce(func.nullif(Guest.family_count, 0), 1)), 0),
+        func.count(Guest.family_name),
+    ).filter(Guest.wedding_id == wedding_id).one()
+    return render_template(
+        "wedding_guests.html",
+        wedding=wedding,
+        guests_count=guests_count,
+        total_persons=total_persons,
+        families_count=families_count,
+        table_numbers=seating.table_numbers(wedding_id),
+    )
 
 @wedding_pages.route("/<int:wedding_id>/guests/add", methods=["POST"])
 def add_guest(wedding_id):
@@ -145,7 +270,6 @@ def add_guest(wedding_id):
     side = request.form.get("side") or None  # groom/bride/other/None
     is_vip = bool(request.form.get("is_vip"))
     is_child = bool(request.form.get("is_child"))
-    table_no = request.form.get("table_no")
 
     # имя можно не указывать, если есть семья
     if not name and not family_name:
@@ -157,11 +281,6 @@ def add_guest(wedding_id):
     except ValueError:
         family_count = None
 
-    try:
-        table_no = int(table_no) if table_no else None
-    except ValueError:
-        table_no = None
-
     g = Guest(
         wedding_id=wedding.id,
         name=name,
@@ -173,10 +292,11 @@ def add_guest(wedding_id):
         side=side,
         is_vip=is_vip,
         is_child=is_child,
-        table_no=table_no,
     )
     db.session.add(g)
-    db.session.commit()
+    db.session.flush()
+    if _seat_by_form(g, "Гость не сохранён"):
+        db.session.commit()
     return redirect(url_for("wedding_pages.wedding_guests", wedding_id=wedding.id))
 
 # === edit_guest: тоже поддерживаем новые поля ===
@@ -200,60 +320,25 @@ def edit_guest(guest_id):
     g.is_vip = bool(request.form.get("is_vip"))
     g.is_child = bool(request.form.get("is_child"))
 
-    tno = request.form.get("table_no")
-    try:
-        g.table_no = int(tno) if tno else None
-    except ValueError:
-        g.table_no = None
-
-    db.session.commit()
-    return redirect(url_for("wedding_pages.wedding_guests", wedding_id=g.wedding_id))
+    wedding_id = g.wedding_id
+    if _seat_by_form(g, "Изменения не сохранены"):
+        db.session.commit()
+    return redirect(url_for("wedding_pages.wedding_guests", wedding_id=wedding_id))
 
-# === ручная установка стола для одной записи ===
+# === ручная установка стола для одной записи (номер стола в рассадке) ===
 @wedding_pages.route("/guests/<int:guest_id>/set_table", methods=["POST"])
 def set_table(guest_id):
     g = Guest.query.get_or_404(guest_id)
-    tno = request.form.get("table_no")
-    try:
-        g.table_no = int(tno) if tno else None
-    except ValueError:
-        g.table_no = None
-    db.session.commit()
-    return redirect(url_for("wedding_pages.wedding_guests", wedding_id=g.wedding_id))
+    wedding_id = g.wedding_id
+    if _seat_by_form(g, "Стол не изменён"):
+        db.session.commit()
+    return redirect(url_for("wedding_pages.wedding_guests", wedding_id=wedding_id))
 
-# === автосборка рассадки по 12 мест ===
+# === авторассадка из списка гостей — тот же алгоритм, что на странице рассадки ===
 @wedding_pages.route("/<int:wedding_id>/guests/auto_seat", methods=["POST"])
 def auto_seat(wedding_id):
     wedding = Wedding.query.get_or_404(wedding_id)
-    TABLE = 12
-
-    guests = list(wedding.guests)
-
-    # Сначала семьи (с наибольшим количеством), потом одиночки
-    def size(g):
-        return g.family_count if (g.family_count and g.family_count > 0) else 1
-
-    families = [g for g in guests if g.family_name or (g.family_count and g.family_count > 1)]
-    singles  = [g for g in guests if g not in families]
-
-    families.sort(key=lambda g: size(g), reverse=True)
-
-    table_no = 1
-    used = 0
-
-    for grp in families + singles:
-        need = size(grp)
-        # если не помещается — переходим на следующий стол
-        if used + need > TABLE:
-            table_no += 1
-            used = 0
-        grp.table_no = table_no
-        used += need
-        # если ровно 12 — следующий стол
-        if used == TABLE:
-            table_no += 1
-            used = 0
-
+    seating.auto_seat(wedding)
     db.session.commit()
     return redirect(url_for("wedding_pages.wedding_guests", wedding_id=wedding.id))
 
@@ -270,18 +355,23 @@ def delete_guest(guest_id):
 # ======= РАССАДКА =======
 # --- Рассадка: страница ---
 @wedding_pages.route("/<int:wedding_id>/seating")
+@etag_by_wedding
+@replica_read
 def seating_page(wedding_id):
     wedding = Wedding.query.get_or_404(wedding_id)
 
     # сколько мест за столом хотим считать по умолчанию
     seats_per_table = 12
 
-    # общее число персон = суммы family_count (или 1 для одиночных)
-    total_persons = sum((g.family_count or 1) for g in wedding.guests)
+    # общее число персон = суммы family_count (или 1 для одиночных) — агрегатом в базе
+    total_persons = db.session.scalar(
+        select(func.coalesce(func.sum(func.coalesce(Guest.family_count, 1)), 0))
+        .where(Guest.wedding_id == wedding_id)
+    )
 
     # список столов
     # Если модель называется иначе (например SeatingTable), просто поменяй Table -> SeatingTable
-    tables = Table.query.filter_by(wedding_id=wedding_id).order_by(Table.id.asc()).all()
+    tables = seating.tables_of(wedding_id)
 
     # «минимально нужно столов»
     tables_needed = (total_persons + seats_per_table - 1) // seats_per_table if total_persons else 0
@@ -289,11 +379,12 @@ def seating_page(wedding_id):
     # гости без стола
     unassigned = Guest.query.filter_by(wedding_id=wedding_id, table_id=None).order_by(Guest.id.asc()).all()
 
-    # словарь: {table_id: [гости за этим столом в нужном порядке]}
-    tables_guests = {
-        t.id: Guest.query.filter_by(wedding_id=wedding_id, table_id=t.id).order_by(Guest.id.asc()).all()
-        for t in tables
-    }
+    # словарь: {table_id: [гости за этим столом в нужном порядке]} — один SELECT на все столы
+    tables_guests = {t.id: [] for t in tables}
+    seated = (Guest.query.filter(Guest.wedding_id == wedding_id, Guest.table_id.is_not(None))
+              .order_by(Guest.table_id.asc(), Guest.id.asc()))
+    for g in seated:
+        tables_guests.setdefault(g.table_id, []).append(g)
 
     return render_template(
         "wedding_seating.html",
@@ -307,12 +398,20 @@ def seating_page(wedding_id):
     )
 
 
+# PDF-схема рассадки для площадки
+@wedding_pages.route("/<int:wedding_id>/seating/chart.pdf")
+@replica_read
+def seating_chart_pdf(wedding_id):
+    from seating_chart import gen_seating_chart_pdf
+    wedding = Wedding.query.get_or_404(wedding_id)
+    return send_file(gen_seating_chart_pdf(wedding), mimetype="application/pdf",
+                     download_name=f"seating_{wedding_id}.pdf")
+
+
 @wedding_pages.post("/<int:wedding_id>/seating/new_table")
 def seating_new_table(wedding_id):
     wedding = Wedding.query.get_or_404(wedding_id)
-    n = (Table.query.filter_by(wedding_id=wedding_id).count() or 0) + 1
-    t = Table(wedding_id=wedding.id, name=f"Стол {n}", seats=int(request.form.get("seats", 12)), order=n-1)
-    db.session.add(t)
+    seating.add_table(wedding, seats=int(request.form.get("seats", seating.DEFAULT_SEATS)))
     db.session.commit()
     return redirect(url_for("wedding_pages.seating_page", wedding_id=wedding_id))
 
@@ -326,17 +425,14 @@ def seating_rename_table(wedding_id, table_id):
 @wedding_pages.post("/<int:wedding_id>/seating/delete_table/<int:table_id>")
 def seating_delete_table(wedding_id, table_id):
     t = Table.query.get_or_404(table_id)
-    # освобождаем гостей
-    for g in t.guests.all():
-        g.table_id = None
-        g.table_seat = None
-    db.session.delete(t)
+    # гости возвращаются в нераспределённые
+    seating.delete_table(t)
     db.session.commit()
     return redirect(url_for("wedding_pages.seating_page", wedding_id=wedding_id))
 
 @wedding_pages.post("/<int:wedding_id>/seating/clear")
 def seating_clear(wedding_id):
-    Guest.query.filter_by(wedding_id=wedding_id).update({Guest.table_id: None, Guest.table_seat: None})
+    seating.clear(wedding_id)
     db.session.commit()
     return redirect(url_for("wedding_pages.seating_page", wedding_id=wedding_id))
 
@@ -344,77 +440,31 @@ def seating_clear(wedding_id):
 @wedding_pages.post("/seating/assign")
 def seating_assign():
     data = request.get_json(force=True)
-    guest_id = int(data.get("guest_id"))
-    table_id = data.get("table_id")  # может быть None
-    seat = data.get("seat")
-
-    g = Guest.query.get_or_404(guest_id)
-    old_table_id = g.table_id
-    g.table_id = int(table_id) if table_id not in (None, "null", "") else None
-    g.table_seat = int(seat) if seat not in (None, "null", "") else None
-    db.session.commit()
-
-    def table_payload(tid):
-        if not tid:
-            return {"table_id": None, "persons": 0, "seats": 0}
-        t = Table.query.get(tid)
-        persons = sum((x.family_count or 1) for x in t.guests)
-        return {"table_id": t.id, "current_persons": persons, "seats": t.seats}
 
-    return jsonify({
-        "ok": True,
-        "updated": [table_payload(old_table_id), table_payload(g.table_id)]
-    })
+    def _id(key):
+        val = data.get(key)
+        return int(val) if val not in (None, "null", "") else None
 
-# Авторассадка (жадный алгоритм по убыванию группы)
+    try:
+        move = {"guest_id": int(data.get("guest_id")), "table_id": _id("table_id"), "seat": _id("seat")}
+        if "from_table_id" in data:  # откуда тащили — для проверки конфликта
+            move["from_table_id"] = _id("from_table_id")
+    except (TypeError, ValueError):
+        return jsonify({"ok": False, "error": "bad id"}), 400
+
+    wedding_id = db.session.scalar(select(Guest.wedding_id).where(Guest.id == move["guest_id"]))
+    if wedding_id is None:
+        return jsonify({"ok": False, "error": "not found"}), 404
+    # с WRITE_COALESCE_MS > 0 пересадки свадьбы склеиваются в одну транзакцию
+    result, batch = writebehind.submit(wedding_id, "assign", move)
+    # pending — COMMIT пачки не дождались (202, повтор безопасен), см. writebehind
+    status = 200 if result["ok"] else 202 if result.get("pending") else 409 if result.get("conflict") else 400
+    return jsonify({**result, "batch": batch}), status
+
+# Авторассадка (жадный алгоритм по убыванию группы, seating.auto_seat)
 @wedding_pages.post("/<int:wedding_id>/seating/auto")
 def seating_auto(wedding_id):
     wedding = Wedding.query.get_or_404(wedding_id)
-    tables = Table.query.filter_by(wedding_id=wedding_id).order_by(Table.order, Table.id).all()
-    if not tables:
-        t = Table(wedding_id=wedding.id, name="Стол 1", seats=12, order=0)
-        db.session.add(t)
-        db.session.commit()
-        tables = [t]
-
-    seats = tables[0].seats
-    # очистим
-    for g in wedding.guests:
-        g.table_id = None
-        g.table_seat = None
-
-    # семьи/гости по размеру
-    groups = sorted(list(wedding.guests), key=lambda g: (g.family_count or 1), reverse=True)
-
-    # считаем сколько столов нужно минимум
-    total_persons = sum((g.family_count or 1) for g in groups)
-    need = ceil(max(1, total_persons) / seats)
-    while len(tables) < need:
-        t = Table(wedding_id=wedding.id, name=f"Стол {len(tables)+1}", seats=seats, order=len(tables))
-        db.session.add(t)
-        db.session.flush()
-        tables.append(t)
-
-    # заполняем
-    capacity = {t.id: 0 for t in tables}
-    for g in groups:
-        p = g.family_count or 1
-        # выбираем стол с наименьшей заполненностью, где поместится
-        target = None
-        for t in sorted(tables, key=lambda x: capacity[x.id]):
-            if capacity[t.id] + p <= t.seats:
-                target = t
-                break
-        if not target:
-            # нет места — создаём новый стол
-            new = Table(wedding_id=wedding.id, name=f"Стол {len(tables)+1}", seats=seats, order=len(tables))
-            db.session.add(new)
-            db.session.flush()
-            tables.append(new)
-            capacity[new.id] = 0
-            target = new
-        g.table_id = target.id
-        capacity[target.id] += p
-
+    seating.auto_seat(wedding)
     db.session.commit()
     return redirect(url_for("wedding_pages.seating_page", wedding_id=wedding_id))
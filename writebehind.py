@@ -0,0 +1,190 @@
+# writebehind.py
+"""
+Склейка мелких записей свадьбы в одну транзакцию (group commit).
+
+AJAX-действия (перетащить гостя за стол, отметить задачу) шлются
+очередями по несколько в секунду, и каждое платило свой COMMIT — на Neon
+это десятки мс сетевой задержки, запросы стоят друг за другом. С
+WRITE_COALESCE_MS > 0 действие не пишется сразу, а встаёт в буфер своей
+свадьбы:
+
+  * первый запрос в пустой буфер — лидер: ждёт окно WRITE_COALESCE_MS
+    (или пока буфер не наберёт WRITE_COALESCE_MAX операций), забирает всё
+    накопленное и применяет одной транзакцией в своей сессии;
+  * остальные запросы этого окна просто ждут; ответ клиенту уходит
+    только после COMMIT — «сохранено» значит сохранено;
+  * пачка, набравшая WRITE_COALESCE_MAX операций, закрывается — следующий
+    запрос начинает новую;
+  * пачки одной свадьбы применяются строго по очереди создания, следующая
+    копится, пока пишется предыдущая.
+
+Ждать окно имеет смысл, только если в процессе параллельно идут другие
+запросы: gunicorn --worker-class gthread --threads N (как и для SSE,
+events.py) или gevent. На sync-воркере (wsgi.multithread = False, без
+gevent) склеивать не с кем — операция пишется сразу, без окна.
+
+Фолловер, не дождавшийся COMMIT за WRITE_COALESCE_TIMEOUT, отвечает 202
+{"ok": None, "pending": True}: операция, скорее всего, ещё запишется, но
+итога этот ответ не несёт и идентификатора для опроса нет. Клиент должен
+перечитать состояние: рассадка получает событие assign (events.py), список
+задач перезагружается. Повтор тоже безопасен — он несёт то же «что видел
+клиент» и, если первая уже прошла, получит 409 с текущим значением.
+
+Конфликты: операция несёт то, что видел клиент (стол, откуда тащили
+гостя; было ли дело отмечено). Если в базе — с учётом операций раньше в
+той же пачке — уже другое, операция не применяется, клиент получает 409
+и текущее значение; остальные операции пачки проходят.
+
+WRITE_COALESCE_MS = 0 (по умолчанию) — каждая операция своей транзакцией,
+тем же кодом. Буфер — в памяти процесса: у каждого воркера свой, между
+воркерами конфликты ловит та же проверка по базе.
+
+Метрики: writebehind.batch_size, writebehind.flush_ms, writebehind.wait_ms
+(metrics.observe), счётчики writebehind.ops / .conflicts / .batches /
+.pending / .unthreaded.
+"""
+from __future__ import annotations
+
+import threading
+import time
+from dataclasses import dataclass, field
+
+from flask import current_app, request
+
+from models import db
+import metrics
+
+# вид операции -> applier(wedding_id, [payload, ...]) -> [результат, ...];
+# applier пишет в db.session без commit, результат — dict с "ok"
+_APPLIERS: dict = {}
+
+
+def applier(kind: str):
+    """Регистрирует применение пачки операций вида kind (seating.py, tasks.py)."""
+    def deco(fn):
+        _APPLIERS[kind] = fn
+        return fn
+    return deco
+
+
+@dataclass
+class _Batch:
+    seq: int
+    ops: list = field(default_factory=list)
+    full: threading.Event = field(default_factory=threading.Event)
+    done: threading.Event = field(default_factory=threading.Event)
+    results: list | None = None
+    error: BaseException | None = None
+
+
+def apply(wedding_id: int, ops: list) -> list[dict]:
+    """Одна транзакция на пачку [(kind, payload)]; результаты — в порядке ops."""
+    t0 = time.perf_counter()
+    results: list = [None] * len(ops)
+    by_kind: dict = {}
+    for i, (kind, _payload) in enumerate(ops):
+        by_kind.setdefault(kind, []).append(i)
+    try:
+        for kind, idxs in by_kind.items():
+            for i, res in zip(idxs, _APPLIERS[kind](wedding_id, [ops[i][1] for i in idxs])):
+                results[i] = res
+        db.session.commit()
+    except BaseException:
+        db.session.rollback()
+        raise
+    metrics.observe("writebehind.flush_ms", (time.perf_counter() - t0) * 1000)
+    metrics.observe("writebehind.batch_size", len(ops))
+    conflicts = sum(1 for r in results if r.get("conflict"))
+    metrics.incr("writebehind.batches")
+    metrics.incr("writebehind.ops", len(ops))
+    if conflicts:
+        metrics.incr("writebehind.conflicts", conflicts)
+    return results
+
+
+def _concurrent() -> bool:
+    """Идут ли в процессе параллельные запросы (потоки или gevent) — иначе окно ждать некому."""
+    if request.environ.get("wsgi.multithread"):
+        return True
+    try:
+        from gevent import monkey
+    except ImportError:
+        return False
+    return monkey.is_module_patched("threading")
+
+
+class WriteBuffer:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._turn_changed = threading.Condition(self._lock)
+        self._open: dict[int, _Batch] = {}
+        # по свадьбе: номер следующей пачки и пачки, чья очередь писать
+        self._next_seq: dict[int, int] = {}
+        self._turn: dict[int, int] = {}
+
+    def submit(self, wedding_id: int, kind: str, payload: dict) -> tuple[dict, int]:
+        """(результат операции, размер пачки). Возвращается после COMMIT или по таймауту
+        с {"ok": None, "pending": True} — тогда клиент перечитывает состояние."""
+        cfg = current_app.config
+        window = cfg["WRITE_COALESCE_MS"] / 1000
+        if window <= 0:
+            return apply(wedding_id, [(kind, payload)])[0], 1
+        if not _concurrent():
+            metrics.incr("writebehind.unthreaded")
+            return apply(wedding_id, [(kind, payload)])[0], 1
+
+        t0 = time.perf_counter()
+        with self._lock:
+            batch = self._open.get(wedding_id)
+            leader = batch is None
+            if leader:
+                seq = self._next_seq.get(wedding_id, 0)
+                self._next_seq[wedding_id] = seq + 1
+                batch = self._open[wedding_id] = _Batch(seq)
+            pos = len(batch.ops)
+            batch.ops.append((kind, payload))
+            if len(batch.ops) >= cfg["WRITE_COALESCE_MAX"]:
+                # полная — закрываем, следующий запрос станет лидером новой
+                del self._open[wedding_id]
+                batch.full.set()
+
+        if leader:
+            batch.full.wait(window)
+            self._flush(wedding_id, batch)
+        elif not batch.done.wait(cfg["WRITE_COALESCE_TIMEOUT"]):
+            # лидер ещё пишет — операция в пачке и, скорее всего, запишется
+            metrics.incr("writebehind.pending")
+            return {"ok": None, "pending": True}, len(batch.ops)
+
+        metrics.observe("writebehind.wait_ms", (time.perf_counter() - t0) * 1000)
+        if batch.error is not None:
+            raise RuntimeError("write-behind: пачка не записана") from batch.error
+        return batch.results[pos], len(batch.ops)
+
+    def _flush(self, wedding_id: int, batch: _Batch) -> None:
+        with self._turn_changed:
+            while self._turn.get(wedding_id, 0) != batch.seq:
+                self._turn_changed.wait()
+            # пачку закрываем только теперь: пока ждали предыдущую, в неё ещё добавляли
+            if self._open.get(wedding_id) is batch:
+                del self._open[wedding_id]
+        try:
+            batch.results = apply(wedding_id, batch.ops)
+        except BaseException as e:
+            batch.error = e
+            raise
+        finally:
+            batch.done.set()
+            with self._turn_changed:
+                self._turn[wedding_id] = batch.seq + 1
+                if self._turn[wedding_id] == self._next_seq[wedding_id]:
+                    # очередь свадьбы пуста — счётчики не копим
+                    del self._turn[wedding_id], self._next_seq[wedding_id]
+                self._turn_changed.notify_all()
+
+
+buffer = WriteBuffer()
+
+
+def submit(wedding_id: int, kind: str, payload: dict) -> tuple[dict, int]:
+    return buffer.submit(wedding_id, kind, payload)